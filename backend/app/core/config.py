@@ -14,7 +14,117 @@ class Settings(BaseSettings):
     GEOFENCE_ALERT_DISTANCE_M: float = 50.0 
     INACTIVITY_THRESHOLD_SECONDS: int = 1800 
     AUTH_API_KEY: str = "dev-secret" # Default fallback for dev
-    
+
+    # Device Attestation (Replay Window + Persisted Nonce State)
+    NONCE_WINDOW_SIZE: int = 64 # Out-of-order tolerance (packets)
+    DEVICE_STORE_PATH: str = "device_store.json"
+    DEVICE_STORE_FLUSH_SECONDS: float = 5.0
+    DEVICE_KEY_MASTER: str = "" # If set, unknown devices get HMAC(master, device_id) keys
+    ATTESTATION_CHUNK_SIZE: int = 512 # Packets per HMAC worker job
+    MAX_BATCH_PACKETS: int = 5000
+
+    # Anti-DDoS (Bounded Tables)
+    RATE_LIMIT_PER_IP: int = 50        # req/sec per source IP
+    RATE_LIMIT_PER_DEVICE: int = 10    # packets/sec per attested device
+    RATE_LIMIT_TABLE_SIZE: int = 100_000 # Max tracked sources per table (LRU)
+
+    # Admission Control (Priority Lanes / Load Shedding)
+    ADMISSION_ROUTINE_INFLIGHT_LIMIT: int = 256 # Routine packets processed concurrently
+    ADMISSION_PENDING_LIMIT: int = 10_000     # Coalesced routine packets parked (1 per device)
+    ADMISSION_LOOP_LAG_MS: float = 100.0      # Event-loop lag that counts as overload
+
+    # Kalman Smoothing (Constant-Velocity Filter Bank)
+    KALMAN_GPS_ACCURACY_M: float = 8.0     # 1-sigma GPS error (consumer handset)
+    KALMAN_ACCEL_NOISE: float = 0.5        # 1-sigma unmodelled acceleration, m/s^2 (trekking)
+    KALMAN_INITIAL_SPEED_M_S: float = 3.0  # Velocity prior for a newly seen device
+
+    # Fleet Bot Scan (Batch Entropy Features + Coordinated Spoofing LSH)
+    BOT_SCAN_WINDOW: int = 32                # Raw fixes per device kept for the batch job
+    BOT_SCAN_INTERVAL_SECONDS: float = 30.0
+    BOT_CLUSTER_MIN_SIZE: int = 3            # Devices on one trajectory => coordinated
+    BOT_LSH_BANDS: int = 6
+    BOT_LSH_BITS_PER_BAND: int = 24
+
+    # Weather Context (Geohash Tile Cache)
+    WEATHER_PROVIDER: str = "file"          # "file" (offline stand-in) | "openweathermap"
+    WEATHER_API_KEY: str = ""
+    WEATHER_TILES_PATH: str = ""            # File provider; defaults to app/core/weather_tiles.json
+    WEATHER_TILE_PRECISION: int = 6         # Geohash chars (~1.2 x 0.6 km)
+    WEATHER_TTL_SECONDS: float = 600.0
+    WEATHER_STALE_SECONDS: float = 1800.0   # Served past TTL while a refresh runs
+    WEATHER_PREFETCH_SECONDS: float = 30.0
+    WEATHER_FETCH_CONCURRENCY: int = 8
+
+    # Fleet Re-scoring (risk drifts with time of day / weather for silent devices)
+    RISK_RESCORE_INTERVAL_SECONDS: float = 60.0
+
+    # Risk Rules (Declarative Weights, Hot-Reloaded)
+    RISK_RULES_PATH: str = ""                   # Defaults to app/core/risk_rules.json
+    RISK_RULES_RELOAD_CHECK_SECONDS: float = 2.0
+
+    # Alert Persistence (Write-Behind to Prahari_Alerts)
+    ALERT_FLUSH_SECONDS: float = 1.0
+    ALERT_TRANSACT_BATCH: int = 25      # Puts per TransactWriteItems call
+    ALERT_REHYDRATE_SEGMENTS: int = 4   # Parallel Scan workers on boot
+
+    # Alert Aggregation (Storm Suppression / Incident Clusters)
+    ALERT_CLUSTER_WINDOW_SECONDS: float = 300.0 # Alerts bucketed per zone + type + window
+    ALERT_CLUSTER_THRESHOLD: int = 5            # Devices notified individually before roll-up
+    ALERT_CLUSTER_FLUSH_SECONDS: float = 2.0    # Max roll-up rate per storming cluster
+    ALERT_CLUSTER_TTL_SECONDS: float = 1800.0
+    ALERT_DEVICE_RENOTIFY_SECONDS: float = 60.0 # Same alert_id, same severity (new alerts always pass)
+
+    # Permit Verification (Cache + Circuit Breaker)
+    PERMIT_TTL_SECONDS: float = 300.0         # Fresh; older entries are served while refreshing
+    PERMIT_GRACE_SECONDS: float = 86400.0     # Offline cache confidence MEDIUM -> LOW
+    PERMIT_CALL_TIMEOUT_SECONDS: float = 0.5
+    PERMIT_BREAKER_FAILURES: int = 3          # Consecutive failures that open the breaker
+    PERMIT_BREAKER_RESET_SECONDS: float = 30.0 # Open -> half-open probe
+    PERMIT_PREFETCH_BATCH: int = 100          # eth_calls per batched JSON-RPC request
+    PERMIT_BATCH_TIMEOUT_SECONDS: float = 5.0
+    PERMIT_PREFETCH_SECONDS: float = 240.0    # Re-sweep entries that would go stale before the next sweep
+    PERMIT_EVENT_POLL_SECONDS: float = 5.0    # PermitIssued / PermitRevoked / EmergencyAlert log poll
+
+    # Audit Anchoring (Merkle root per batch of governance actions)
+    AUDIT_ANCHOR_BATCH: int = 64              # Entries per root (anchor early when reached)
+    AUDIT_ANCHOR_SECONDS: float = 30.0        # Max time an entry stays provisional
+    AUDIT_CONFIRM_TIMEOUT_SECONDS: float = 30.0
+    AUDIT_RECEIPT_CAPACITY: int = 10000
+
+    # E-FIR Rendering (process pool + content-hash cache)
+    EFIR_WORKERS: int = 2
+    EFIR_MAX_PENDING: int = 32                # Renders queued or running; beyond -> 503
+    EFIR_CACHE_SIZE: int = 64                 # PDFs kept by content hash
+    EFIR_JOB_TTL_SECONDS: float = 3600.0      # Finished async jobs kept for download
+    EFIR_EXPORT_MAX_DEVICES: int = 500        # Reports per bulk export
+    EFIR_EXPORT_CONCURRENCY: int = 8          # Bulk renders in flight (leaves room for single E-FIRs)
+    EFIR_EXPORT_RETRY_SECONDS: float = 0.2    # Back-off when the render queue is full
+
+    # Device Event Log (E-FIR timeline source)
+    EVENT_LOG_MAX_PER_DEVICE: int = 1000
+    EVENT_LOG_SIGNAL_GAP_SECONDS: float = 300.0 # Silence between fixes recorded as a signal gap
+    EVENT_LOG_TIMELINE_HOURS: float = 24.0      # E-FIR timeline window before the last fix
+
+    # Evidence Store (content-addressed E-FIR blobs)
+    EVIDENCE_BACKEND: str = "disk"              # "disk" | "kubo"
+    EVIDENCE_STORE_PATH: str = "evidence_store"
+    EVIDENCE_CHUNK_SIZE: int = 262144           # Larger files are chunked (dedup unit)
+    EVIDENCE_CACHE_BYTES: int = 33554432        # Hot-blob LRU (32 MiB)
+    EVIDENCE_GC_SECONDS: float = 3600.0
+    EVIDENCE_GC_GRACE_SECONDS: float = 600.0    # Unpinned blocks younger than this survive GC
+    KUBO_API_URL: str = "http://127.0.0.1:5001"
+    KUBO_TIMEOUT_SECONDS: float = 10.0
+
+    # DR Snapshots (compressed base + delta chains in S3)
+    SNAPSHOT_BUCKET: str = "prahari-dr-snapshots"
+    SNAPSHOT_PREFIX: str = "positions"
+    SNAPSHOT_INTERVAL_SECONDS: float = 60.0     # One delta per interval (RPO)
+    SNAPSHOT_FULL_EVERY: int = 30               # Deltas per chain before a new base
+    SNAPSHOT_RETAIN_CHAINS: int = 3
+    SNAPSHOT_COMPRESSION_LEVEL: int = 6         # zlib
+    SNAPSHOT_MULTIPART_BYTES: int = 8388608     # Multipart upload above 8 MiB
+    SNAPSHOT_RESTORE_TIMEOUT_SECONDS: float = 15.0
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 settings = Settings()
@@ -1,21 +1,27 @@
 from app.models import SystemMode, CyberHudState
 from collections import defaultdict
+from app.services.alert_store import AlertStore
+from app.services.position_store import PositionStore
 
 # Shared In-Memory State for Prahari-AI Backend
 # This acts as a localized Redis replacement for the demo.
 
 # Latest known positions of all devices. 
-# Format: { "device_id": { ...TelemetryData... } }
-LATEST_POSITIONS = {}
+# Format: { "device_id": { ...TelemetryData... } }, writes tracked for DR deltas (see services/position_store.py)
+LATEST_POSITIONS = PositionStore()
 
-# Kalman Filter states
-KALMAN_STATES = {}
 # Biometric History for "Turing Test"
-BIOMETRIC_HISTORY = defaultdict(list)
+# Format: { "device_id": RollingStats } (see services/biometrics.py)
+BIOMETRIC_HISTORY = {}
 
 # Active Alerts Cache (Stateful Lifecycle)
-# Format: { "device_id_TYPE": { ...AlertData... } }
-LATEST_ALERTS = {}
+# Format: { "device_id_TYPE": { ...AlertData... } }, indexed by alert_id / device / status / severity
+# Change status / severity via LATEST_ALERTS.set_fields() (see services/alert_store.py)
+LATEST_ALERTS = AlertStore()
+
+# Incident Clusters (Alert Storm Aggregation)
+# Format: { "zone:TYPE:window_start": { ...cluster... } } (see services/alert_aggregator.py)
+INCIDENT_CLUSTERS = {}
 
 # Governance & Accountability Logs (V3.2)
 DECISION_HISTORY = [] # List[DecisionRecord]
@@ -49,7 +55,8 @@ SYSTEM_METRICS = {
     "mode": "NORMAL", # V3.2
     "merkle_root": "PENDING", # V4.1
     "chain_height": 150000,   # V4.1
-    "consensus_status": "LOCKED (2/3)" # V4.1
+    "consensus_status": "LOCKED (2/3)", # V4.1
+    "services": {"blockchain": "UNKNOWN"} # Updated by the permit circuit breaker
 }
 
 def hydrate_cache():
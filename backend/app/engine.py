@@ -4,94 +4,101 @@ from app.core.config import settings
 import boto3
 import time
 import datetime
+import numpy as np
 from decimal import Decimal
+from app.models import GeoPoint
+from app.services.geofence import check_geofence_breach, zone_hits_batch
+from app.services.weather import WEATHER
+from app.services.risk_rules import RISK_RULES, STATUSES
+
+def _local_hours(clock: np.ndarray) -> np.ndarray:
+    """Local wall-clock hour per epoch timestamp (UTC offset resolved once per distinct hour)."""
+    hour_buckets, inverse = np.unique(np.floor(clock / 3600.0), return_inverse=True)
+    offsets = np.array([time.localtime(b * 3600.0).tm_gmtoff for b in hour_buckets.tolist()], dtype=float)
+    return (np.floor((clock + offsets[inverse.reshape(-1)]) / 3600.0) % 24).astype(np.intp)
 
 # --- 2. The AI Engine: Weighted Logic & Kalman Filter ---
 
 class SentinelAI:
     @staticmethod
-    def calculate_risk(current: dict, all_states: dict) -> dict:
+    def calculate_risk(current: dict, now: float = None) -> dict:
         """
         Production Logic:
         Calculates a Risk Score (0-100) based on Spatial, Temporal, and Behavioral factors.
+        Weights come from the compiled rule set (app/core/risk_rules.json).
+        `now` is the evaluation clock for the night check (default: wall clock).
         Returns: { "score": int, "status": str, "factors": list }
         """
-        score = 0
-        factors = []
-        
-        # Extract fields from dict (FastAPI Pydantic dict())
+        plan = RISK_RULES.current()
         lat = current['location']['lat']
         lng = current['location']['lng']
-        speed = current.get('speed', 0.0)
-        
-        # A. Spatial Check (GeoJSON Polygons)
-        # We reuse our efficient geofence service
-        from app.services.geofence import check_geofence_breach, GeoPoint
-        
-        # Convert to GeoPoint for the service
-        gpoint = GeoPoint(lat=lat, lng=lng)
-        zone = check_geofence_breach(gpoint)
-        
-        if zone:
-            if zone.risk_level == "HIGH":
-                score += 50
-                factors.append("RED_ZONE_BREACH")
-            elif zone.risk_level == "MEDIUM":
-                score += 25
-                factors.append("WARN_ZONE_ENTRY")
-            
-        # B. Behavioral (Speed/Stagnation)
-        if speed < 0.1:
-            if zone:
-                score += 20
-                factors.append("STAGNATION_IN_RISK_ZONE")
-            else:
-                score += 5
-                
-        # C. Temporal Weighting
-        current_dt = datetime.datetime.now()
-        hour = current_dt.hour
-        if hour >= 18 or hour < 5:
-            if score > 0:
-                score = score * 1.2 # 20% risk multiplier at night
-                factors.append("NIGHT_MULTIPLIER")
-                
-        # D. Weather Context (Context-Aware AI Upgrade)
-        # In Tawang/Zero, weather is a major killer.
-        weather_condition = SentinelAI.get_weather_condition(lat, lng)
-        if weather_condition in ['Thunderstorm', 'Heavy Snow', 'Blizzard']:
-            score += 30
-            factors.append(f"SEVERE_WEATHER_WARNING: {weather_condition}")
-        elif weather_condition in ['Rain', 'Fog']:
-            score += 10
-            factors.append(f"WEATHER_ADVISORY: {weather_condition}")
 
-        # E. SOS Override
-        if current.get('is_panic', False):
-            return {"score": 100, "status": "CRITICAL", "factors": ["SOS_PANIC_BUTTON"]}
+        # Spatial context reuses the geofence service; weather is an in-memory tile hit
+        zone = check_geofence_breach(GeoPoint(lat=lat, lng=lng))
+        return plan.evaluate({
+            "zone_risk": zone.risk_level if zone else None,
+            "in_zone": zone is not None,
+            "speed": current.get('speed', 0.0),
+            "hour": datetime.datetime.fromtimestamp(time.time() if now is None else now).hour,
+            "weather": SentinelAI.get_weather_condition(lat, lng),
+            "panic": current.get('is_panic', False)
+        })
+
+    @staticmethod
+    def calculate_risk_batch(lats, lngs, speeds, is_panic, timestamps, zone_hits: tuple = None, now: float = None) -> dict:
+        """
+        Vectorized calculate_risk over columnar arrays (bulk ingestion, replays,
+        fleet re-scoring). Same compiled rule plan, same results.
+        zone_hits: (hits, zones) from zone_hits_batch, computed here if omitted.
+        now: evaluation clock for every row; None = each row's own timestamp (replays).
+        Returns {"score": int[], "status": int[] (index into STATUSES),
+                 "factors": bitmask[], "weather": int[], "conditions": [str], "plan": RulePlan}.
+        Use expand_risk() to turn row i into the scalar result dict.
+        """
+        plan = RISK_RULES.current()
+        lat = np.asarray(lats, dtype=float)
+        lng = np.asarray(lngs, dtype=float)
+        n = len(lat)
+
+        hits, zones = zone_hits if zone_hits is not None else zone_hits_batch(lat, lng)
+        clock = np.asarray(timestamps, dtype=float) if now is None else np.full(n, float(now))
+        # Weather: tile cache, one lookup per distinct tile
+        weather, conditions = WEATHER.conditions_at(lat, lng)
 
-        # Final Thresholds
-        score = min(score, 100)
-        status = "SAFE"
-        
-        if score >= 80: 
-            status = "CRITICAL"
-        elif score >= 50: 
-            status = "WARNING"
-        
-        return {"score": int(score), "status": status, "factors": factors}
+        score, status, factors = plan.evaluate_batch({
+            "hits": np.asarray(hits, dtype=np.intp),
+            "zones": zones,
+            "speed": np.asarray(speeds, dtype=float),
+            "hour": _local_hours(clock) if n else np.zeros(0, dtype=np.intp),
+            "weather": weather,
+            "conditions": conditions,
+            "panic": np.asarray(is_panic, dtype=bool)
+        })
+        return {
+            "score": score.astype(np.int64),
+            "status": status,
+            "factors": factors,
+            "weather": weather,
+            "conditions": conditions,
+            "plan": plan
+        }
+
+    @staticmethod
+    def expand_risk(batch: dict, i: int) -> dict:
+        """Row i of a calculate_risk_batch result as { "score", "status", "factors" }."""
+        condition = batch["conditions"][batch["weather"][i]]
+        return {
+            "score": int(batch["score"][i]),
+            "status": STATUSES[batch["status"][i]],
+            "factors": batch["plan"].expand_factors(int(batch["factors"][i]), condition)
+        }
 
     @staticmethod
     def get_weather_condition(lat, lng):
         """
-        Mocks a call to OpenWeatherMap API for demonstration.
+        In-memory geohash tile lookup (services/weather.py); never blocks on a provider.
         """
-        import random
-        # Simulate a localized storm near the Red Zone coordinates
-        if 27.585 < lat < 27.590 and 91.855 < lng < 91.865:
-            return random.choice(['Thunderstorm', 'Heavy Snow', 'Blizzard'])
-        
-        return "Clear Sky"
+        return WEATHER.condition_at(lat, lng)
 
 # Legacy Adapter to keep existing simple calls working if needed, 
 # or we refactor anomaly_detection.py to use this Class.
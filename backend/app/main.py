@@ -1,10 +1,12 @@
 from fastapi import FastAPI, Request, Response, Header, Body, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.core.config import settings
 from app.routers import telemetry
 from app.services.websocket import sio
 import socketio
-from collections import defaultdict
+from app.services.rate_limit import BoundedCounter
+from app.services.metrics import render_prometheus, ingestion_rates, latency_summary_ms
 
 from app.scheduler import monitor_dead_mans_switch
 import asyncio
@@ -32,6 +34,37 @@ async def startup_event():
     from app.services.integrity import init_integrity_monitor
     init_integrity_monitor()
 
+    # 1a. DR Restore (newest snapshot base + deltas -> LATEST_POSITIONS), then periodic deltas
+    from app.snapshots import SNAPSHOTS, run_snapshot_loop
+    await SNAPSHOTS.restore()
+    asyncio.create_task(run_snapshot_loop())
+
+    # 1b. Device Attestation State (Replay Windows survive restarts)
+    from app.services.identities import DEVICE_KEY_STORE, run_device_store_flush_loop
+    DEVICE_KEY_STORE.load()
+    asyncio.create_task(run_device_store_flush_loop())
+
+    # 1c. Alert Persistence (write-behind + background rehydrate of open alerts)
+    from app.services.alert_persistence import ALERT_WRITER, run_alert_persistence_loop
+    asyncio.create_task(ALERT_WRITER.rehydrate())
+    asyncio.create_task(run_alert_persistence_loop())
+
+    # 1d. Alert Storm Aggregation (rolled-up incident_cluster events)
+    from app.services.websocket import run_incident_cluster_loop
+    asyncio.create_task(run_incident_cluster_loop())
+
+    # 1e. Permit Cache Warm-up (batched prefetch + permit event invalidation)
+    from app.services.permits import run_permit_sync_loop
+    asyncio.create_task(run_permit_sync_loop())
+
+    # 1f. Audit Anchoring (one Merkle root per batch of governance actions)
+    from app.services.audit_anchor import run_audit_anchor_loop
+    asyncio.create_task(run_audit_anchor_loop())
+
+    # 1g. Evidence Store GC (unpinned content-addressed blobs)
+    from app.services.evidence_store import run_evidence_gc_loop
+    asyncio.create_task(run_evidence_gc_loop())
+
     # 2. Hydrate Cache (Fix Task A)
     # TEMPORARILY DISABLED - Blocking startup
     # from app.core.shared_state import hydrate_cache
@@ -65,11 +98,38 @@ async def startup_event():
 
     # asyncio.create_task(shredder_loop())
     
+    # 5b. Fleet-wide Bot Scan (Batch Turing Test + Coordinated Spoofing)
+    from app.services.bot_detection import run_fleet_bot_scan_loop
+    asyncio.create_task(run_fleet_bot_scan_loop())
+
+    # 5c. Weather Context Prefetch (keeps risk scoring in-memory)
+    from app.services.weather import run_weather_prefetch_loop
+    asyncio.create_task(run_weather_prefetch_loop())
+
+    # 5d. Fleet Re-scoring (Night / Weather drift for quiet devices)
+    from app.scheduler import run_fleet_rescoring_loop
+    asyncio.create_task(run_fleet_rescoring_loop())
+
     # 6. Observability Start
     SYSTEM_METRICS['start_time'] = time.time()
+    from app.services.admission import run_loop_lag_monitor
+    asyncio.create_task(run_loop_lag_monitor())
     
     print("OBSERVABILITY: System Health Monitor Started.")
 
+@fastapi_app.on_event("shutdown")
+async def shutdown_event():
+    from app.services.identities import DEVICE_KEY_STORE
+    DEVICE_KEY_STORE.flush()
+    from app.services.alert_persistence import ALERT_WRITER
+    await ALERT_WRITER.flush()
+    from app.services.audit_anchor import AUDIT_ANCHOR
+    await AUDIT_ANCHOR.flush()
+    from app.services.efir_renderer import EFIR_RENDERER
+    EFIR_RENDERER.shutdown()
+    from app.snapshots import SNAPSHOTS
+    await SNAPSHOTS.snapshot()
+
 # ... (Existing Endpoints)
 
 @fastapi_app.get("/api/v1/integrity/model")
@@ -87,6 +147,25 @@ async def get_merkle_proof(data: dict = Body(...)):
     # Here we simulate the proof path for whatever data is claimed.
     return generate_merkle_proof(data, [])
 
+@fastapi_app.get("/api/v1/forensics/bot-scan")
+async def get_bot_scan(refresh: bool = False):
+    """
+    Latest fleet-wide bot scan: flagged devices (with reasons) and coordinated trajectory clusters.
+    refresh=true runs a scan now instead of waiting for the next scheduled one.
+    """
+    from app.services.bot_detection import LATEST_BOT_SCAN, run_fleet_bot_scan
+    if refresh or not LATEST_BOT_SCAN:
+        return await run_fleet_bot_scan()
+    return LATEST_BOT_SCAN
+
+@fastapi_app.get("/api/v1/incidents/clusters")
+async def get_incident_clusters():
+    """
+    Active alert clusters (zone + type + time window) with member counts, newest first.
+    """
+    from app.services.alert_aggregator import ALERT_AGGREGATOR
+    return {"clusters": ALERT_AGGREGATOR.snapshot(), "stats": ALERT_AGGREGATOR.stats}
+
 @fastapi_app.post("/api/v1/forensics/verify")
 async def verify_forensics(
     file_hash: str = Body(..., embed=True),
@@ -118,14 +197,15 @@ async def get_system_health():
     
     # Dynamic Updates
     SYSTEM_METRICS['active_users'] = len(LATEST_POSITIONS)
-    SYSTEM_METRICS['alerts_active'] = len([a for a in LATEST_ALERTS.values() if a['status'] != 'RESOLVED'])
+    SYSTEM_METRICS['alerts_active'] = LATEST_ALERTS.active_count()
     if shared_state.SYSTEM_MODE == SystemMode.CYBER_LOCKDOWN:
         SYSTEM_METRICS['mode'] = "CYBER_LOCKDOWN 🛡️"
     
-    # Mock Ingestion Rate (until telemetry hook is fully wired)
-    # In prod, atomic counter in telemetry.py would drive this
-    if uptime > 0:
-        SYSTEM_METRICS['ingestion_rate'] = round((SYSTEM_METRICS['ingestion_count'] / uptime), 2)
+    # Sliding-Window Ingestion Rate (current load, not lifetime average)
+    rates = ingestion_rates()
+    SYSTEM_METRICS['ingestion_rate'] = rates['10s']
+    SYSTEM_METRICS['ingestion_rates'] = rates
+    SYSTEM_METRICS['stage_latency_ms'] = latency_summary_ms()
     
     return {
         "status": "HEALTHY" if shared_state.SYSTEM_MODE != SystemMode.CYBER_LOCKDOWN else "LOCKED",
@@ -133,22 +213,30 @@ async def get_system_health():
         "metrics": SYSTEM_METRICS,
         "services": {
             "database": "CONNECTED", # Assumed via successful reads
-            "blockchain": "CONNECTED",
+            "blockchain": SYSTEM_METRICS['services']['blockchain'],
             "websocket": "ACTIVE"
         }
     }
 
+@fastapi_app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Prometheus scrape target: per-stage latency quantiles, throughput, admission control.
+    """
+    SYSTEM_METRICS['active_users'] = len(LATEST_POSITIONS)
+    return PlainTextResponse(render_prometheus(SYSTEM_METRICS), media_type="text/plain; version=0.0.4")
+
 # --- CYBER SAFETY SENTINEL ---
 class CyberGuard:
     def __init__(self):
-        self.failures = defaultdict(int)
+        self.failures = BoundedCounter(capacity=settings.RATE_LIMIT_TABLE_SIZE)
         self.threshold = 5
         self.protected_paths = ["/api/v1/generate-efir", "/api/v1/alert/override", "/api/v1/system/mode"]
 
     def record_failure(self, ip: str):
-        self.failures[ip] += 1
-        print(f"CYBER_WATCH: Login Failure from {ip}. Count: {self.failures[ip]}")
-        if self.failures[ip] >= self.threshold:
+        count = self.failures.increment(ip)
+        print(f"CYBER_WATCH: Login Failure from {ip}. Count: {count}")
+        if count >= self.threshold:
             self.trigger_lockdown(ip)
 
     def is_locked_out(self, path: str) -> bool:
@@ -187,11 +275,7 @@ async def attest_alert(alert_id: str, x_node_id: str = Header("CHECKPOST_ALPHA",
     """
     Decentralized Alert Attestation (DAA)
     """
-    target = None
-    for alert in LATEST_ALERTS.values():
-        if alert['alert_id'] == alert_id:
-            target = alert
-            break
+    target = LATEST_ALERTS.get_by_id(alert_id)
     if not target: raise HTTPException(404, "Alert not found")
     
     if x_node_id not in target['attestors']:
@@ -200,6 +284,7 @@ async def attest_alert(alert_id: str, x_node_id: str = Header("CHECKPOST_ALPHA",
     # Consensus Logic (BFT-Lite)
     if len(target['attestors']) >= 1: # For demo, 1 external node is enough
         target['attestation_status'] = "ATTESTED"
+    LATEST_ALERTS.touch(LATEST_ALERTS.key_for_id(alert_id))
         
     return {"status": "attested", "total_signatures": len(target['attestors'])}
 
@@ -242,9 +327,10 @@ def root():
 
 # ... existing code ...
 from fastapi import Response, Header, HTTPException, Body
-from app.reports import generate_efir_pdf
+from app.services.efir_renderer import EFIR_RENDERER, RendererBusy
 from app.core.shared_state import LATEST_POSITIONS
-from app.services.identity import get_permit_info, log_audit_event
+from app.services.identity import log_audit_event
+from app.services.permits import PERMITS
 import time
 import hashlib
 
@@ -268,36 +354,24 @@ def log_governance_action(actor: str, role: str, action: str, justification: str
     print(f"TIMESTAMP : {time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())}")
     print(f"------------------------------------------------------------------\n")
 
-@fastapi_app.get("/api/v1/generate-efir/{device_id}")
-async def generate_efir(
-    device_id: str,
-    x_actor_id: str = Header("officer-001", alias="X-Actor-ID"),
-    x_role: str = Header(ROLE_SUPERVISOR, alias="X-Role"),
-    x_justification: str = Header(..., alias="X-Justification") # Require justification
-):
-    # 0. RBAC Governance Check
-    if x_role not in [ROLE_SUPERVISOR, ROLE_ADMIN]:
-        log_governance_action(x_actor_id, x_role, "GENERATE_EFIR_ATTEMPT", x_justification, device_id)
-        raise HTTPException(status_code=403, detail=f"Access Denied: Role '{x_role}' is not authorized to generate legal documents.")
+    # Device timeline entry (target is a device id or one of its alert ids)
+    from app.services.event_log import EVENT_LOG
+    EVENT_LOG.observe_operator(target, time.time(), actor, action, justification)
 
-    # 1. Fetch data from active trackers
-    tracker_state = LATEST_POSITIONS.get(device_id)
-    if not tracker_state:
-        # Fallback check if it's an alert? For now just fail.
-        return {"error": "Device not found in active tracking cache"}
-    
-    # 2. Enrich Data
+async def build_efir_incident(device_id: str, tracker_state: dict) -> tuple:
+    """Tracker state -> (did, incident_data) for the E-FIR template."""
     # Parse Permit ID from string "Verified Permit: #1234..."
     did = tracker_state.get('did', 'unknown')
-    permit_str = get_permit_info(did) 
+    permit_str = await PERMITS.get(did)
     import re
     match = re.search(r"Permit: (#\w+)", permit_str)
     permit_id = match.group(1) if match else "PENDING"
     
     # Mocking TXID (In real app, we would look up the TX history block)
-    tx_hash = "0x" + hashlib.sha256(f"{did}{time.time()}".encode()).hexdigest()
+    # Derived from the tracked state, so an unchanged incident renders to the same PDF (cache hit)
+    tx_hash = "0x" + hashlib.sha256(f"{did}{tracker_state.get('timestamp')}".encode()).hexdigest()
     
-    # 2b. Reconstruct Timeline (Legal Narrative)
+    # Reconstruct Timeline (Legal Narrative)
     from app.services.timeline import generate_chronology
     timeline_events = generate_chronology(device_id, tracker_state)
     
@@ -309,29 +383,230 @@ async def generate_efir(
         "factors": tracker_state.get('risk', {}).get('factors', ["Manual Request"]),
         "timeline": timeline_events # <--- Added for E-FIR V2
     }
-    
-    # 3. Generate PDF
-    pdf_buffer = generate_efir_pdf(incident_data)
-    pdf_content = pdf_buffer.getvalue()
-    
-    # 4. Decentralized Evidence Vault (IPFS + Blockchain)
+    return did, incident_data
+
+async def seal_efir(pdf_content: bytes, did: str, device_id: str, actor: str, role: str, justification: str) -> tuple:
+    """Decentralized Evidence Vault (IPFS + Blockchain). Returns (cid, audit receipt)."""
     from app.services.ipfs import upload_to_ipfs
     
-    # Upload to "Decentralized Web"
-    ipfs_cid = upload_to_ipfs(pdf_content)
+    # Upload to "Decentralized Web" (fsynced disk writes: off the event loop)
+    ipfs_cid = await asyncio.to_thread(upload_to_ipfs, pdf_content)
     print(f"DECENTRALIZED STORAGE: E-FIR Uploaded to IPFS. CID: {ipfs_cid}")
     
     # Internal Log
-    log_governance_action(x_actor_id, x_role, "GENERATE_EFIR", x_justification, device_id)
+    log_governance_action(actor, role, "GENERATE_EFIR", justification, device_id)
 
     # Blockchain Log (Anchoring the IPFS CID)
-    audit_tx = log_audit_event(x_actor_id, did, "GENERATED_EFIR", ipfs_cid)
-    print(f"BLOCKCHAIN CONFIRMATION: TXID: {audit_tx}")
+    audit_receipt = log_audit_event(actor, did, "GENERATED_EFIR", ipfs_cid)
+    print(f"BLOCKCHAIN RECEIPT: {audit_receipt} (provisional until the next Merkle anchor)")
+    return ipfs_cid, audit_receipt
+
+@fastapi_app.get("/api/v1/generate-efir/{device_id}")
+async def generate_efir(
+    device_id: str,
+    x_actor_id: str = Header("officer-001", alias="X-Actor-ID"),
+    x_role: str = Header(ROLE_SUPERVISOR, alias="X-Role"),
+    x_justification: str = Header(..., alias="X-Justification") # Require justification
+):
+    # 0. RBAC Governance Check
+    if x_role not in [ROLE_SUPERVISOR, ROLE_ADMIN]:
+        log_governance_action(x_actor_id, x_role, "GENERATE_EFIR_ATTEMPT", x_justification, device_id)
+        raise HTTPException(status_code=403, detail=f"Access Denied: Role '{x_role}' is not authorized to generate legal documents.")
+
+    # 1. Fetch data from active trackers
+    tracker_state = LATEST_POSITIONS.get(device_id)
+    if not tracker_state:
+        # Fallback check if it's an alert? For now just fail.
+        return {"error": "Device not found in active tracking cache"}
+    
+    # 2. Enrich Data
+    did, incident_data = await build_efir_incident(device_id, tracker_state)
+    
+    # 3. Generate PDF (process pool; the event loop keeps serving ingestion)
+    try:
+        pdf_content = await EFIR_RENDERER.render(incident_data)
+    except RendererBusy as e:
+        raise HTTPException(status_code=503, detail=f"E-FIR renderer busy ({e}); use /api/v1/efir/jobs", headers={"Retry-After": "5"})
+    
+    # 4. Decentralized Evidence Vault (IPFS + Blockchain)
+    _, audit_receipt = await seal_efir(pdf_content, did, device_id, x_actor_id, x_role, x_justification)
     
     # 5. Return as a downloadable stream
-    headers = {'Content-Disposition': f'attachment; filename="EFIR_{device_id}.pdf"'}
+    headers = {
+        'Content-Disposition': f'attachment; filename="EFIR_{device_id}.pdf"',
+        'X-Audit-Receipt': audit_receipt
+    }
+    return Response(content=pdf_content, media_type="application/pdf", headers=headers)
+
+@fastapi_app.post("/api/v1/efir/jobs/{device_id}", status_code=202)
+async def request_efir_job(
+    device_id: str,
+    x_actor_id: str = Header("officer-001", alias="X-Actor-ID"),
+    x_role: str = Header(ROLE_SUPERVISOR, alias="X-Role"),
+    x_justification: str = Header(..., alias="X-Justification")
+):
+    """
+    Async E-FIR: returns a job id at once; poll GET /api/v1/efir/jobs/{job_id},
+    then download from /api/v1/efir/jobs/{job_id}/download.
+    """
+    if x_role not in [ROLE_SUPERVISOR, ROLE_ADMIN]:
+        log_governance_action(x_actor_id, x_role, "GENERATE_EFIR_ATTEMPT", x_justification, device_id)
+        raise HTTPException(status_code=403, detail=f"Access Denied: Role '{x_role}' is not authorized to generate legal documents.")
+
+    tracker_state = LATEST_POSITIONS.get(device_id)
+    if not tracker_state:
+        raise HTTPException(status_code=404, detail="Device not found in active tracking cache")
+    did, incident_data = await build_efir_incident(device_id, tracker_state)
+
+    async def on_done(job: dict, pdf_content: bytes):
+        job["ipfs_cid"], job["audit_receipt"] = await seal_efir(pdf_content, did, device_id, x_actor_id, x_role, x_justification)
+
+    try:
+        job = EFIR_RENDERER.submit(incident_data, on_done=on_done)
+    except RendererBusy as e:
+        raise HTTPException(status_code=503, detail=f"E-FIR renderer busy ({e})", headers={"Retry-After": "5"})
+    job["device_id"] = device_id
+    return {**job, "poll_url": f"/api/v1/efir/jobs/{job['job_id']}"}
+
+@fastapi_app.get("/api/v1/efir/jobs/{job_id}")
+async def get_efir_job(
+    job_id: str,
+    x_actor_id: str = Header("officer-001", alias="X-Actor-ID"),
+    x_role: str = Header(ROLE_SUPERVISOR, alias="X-Role"),
+    x_justification: str = Header("E-FIR job status", alias="X-Justification")
+):
+    if x_role not in [ROLE_SUPERVISOR, ROLE_ADMIN]:
+        log_governance_action(x_actor_id, x_role, "EFIR_JOB_STATUS_ATTEMPT", x_justification, job_id)
+        raise HTTPException(status_code=403, detail=f"Access Denied: Role '{x_role}' is not authorized to access legal documents.")
+    job = EFIR_RENDERER.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired E-FIR job")
+    return job
+
+@fastapi_app.get("/api/v1/efir/jobs/{job_id}/download")
+async def download_efir_job(
+    job_id: str,
+    x_actor_id: str = Header("officer-001", alias="X-Actor-ID"),
+    x_role: str = Header(ROLE_SUPERVISOR, alias="X-Role"),
+    x_justification: str = Header(..., alias="X-Justification")
+):
+    job = EFIR_RENDERER.jobs.get(job_id)
+    target = job.get("device_id", job_id) if job else job_id
+    if x_role not in [ROLE_SUPERVISOR, ROLE_ADMIN]:
+        log_governance_action(x_actor_id, x_role, "DOWNLOAD_EFIR_ATTEMPT", x_justification, target)
+        raise HTTPException(status_code=403, detail=f"Access Denied: Role '{x_role}' is not authorized to access legal documents.")
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired E-FIR job")
+    pdf_content = EFIR_RENDERER.result(job_id)
+    if pdf_content is None:
+        raise HTTPException(status_code=409, detail=f"E-FIR job is {job['status']}")
+    log_governance_action(x_actor_id, x_role, "DOWNLOAD_EFIR", x_justification, target)
+    headers = {
+        'Content-Disposition': f'attachment; filename="EFIR_{job.get("device_id", job_id)}.pdf"',
+        'X-Audit-Receipt': job.get("audit_receipt", "")
+    }
     return Response(content=pdf_content, media_type="application/pdf", headers=headers)
 
+@fastapi_app.get("/api/v1/efir/export")
+async def export_efirs(
+    zone_id: str = None,
+    cluster_id: str = None,
+    x_actor_id: str = Header("officer-001", alias="X-Actor-ID"),
+    x_role: str = Header(ROLE_SUPERVISOR, alias="X-Role"),
+    x_justification: str = Header(..., alias="X-Justification")
+):
+    """
+    Bulk E-FIR export for a zone or incident cluster: a ZIP streamed as each PDF
+    finishes, ending with manifest.json (per-file CIDs + audit receipts, directory CID).
+    """
+    import json
+    from fastapi.responses import StreamingResponse
+    from app.services.efir_export import ZipStream, devices_for_scope, render_many
+    from app.services.ipfs import upload_batch_to_ipfs
+
+    scope = f"CLUSTER:{cluster_id}" if cluster_id else f"ZONE:{zone_id}"
+    if x_role not in [ROLE_SUPERVISOR, ROLE_ADMIN]:
+        log_governance_action(x_actor_id, x_role, "BULK_EFIR_EXPORT_ATTEMPT", x_justification, scope)
+        raise HTTPException(status_code=403, detail=f"Access Denied: Role '{x_role}' is not authorized to generate legal documents.")
+    if not zone_id and not cluster_id:
+        raise HTTPException(status_code=422, detail="zone_id or cluster_id is required")
+
+    device_ids = devices_for_scope(zone_id=zone_id, cluster_id=cluster_id)
+    if device_ids is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired incident cluster")
+    if not device_ids:
+        raise HTTPException(status_code=404, detail=f"No tracked devices in {scope}")
+    if len(device_ids) > settings.EFIR_EXPORT_MAX_DEVICES:
+        raise HTTPException(status_code=413, detail=f"{len(device_ids)} devices in {scope}; limit is {settings.EFIR_EXPORT_MAX_DEVICES}")
+
+    built = await asyncio.gather(*(build_efir_incident(d, LATEST_POSITIONS[d]) for d in device_ids))
+    incidents = {d: incident for d, (_, incident) in zip(device_ids, built)}
+    dids = {d: did for d, (did, _) in zip(device_ids, built)}
+    print(f"BULK_EFIR: Exporting {len(incidents)} reports for {scope}")
+
+    async def stream():
+        archive = ZipStream()
+        documents, failed = {}, {}
+        async for device_id, result in render_many(incidents):
+            if isinstance(result, Exception):
+                failed[device_id] = f"{type(result).__name__}: {result}"
+                continue
+            documents[f"EFIR_{device_id}.pdf"] = (device_id, result)
+            yield archive.add(f"EFIR_{device_id}.pdf", result)
+
+        # One pin (off the loop) + one governance entry for the whole export; one audit
+        # anchor entry per exported DID so each person covered is traceable on-chain
+        root_cid, cids = (await asyncio.to_thread(upload_batch_to_ipfs, {n: pdf for n, (_, pdf) in documents.items()})
+                          if documents else (None, {}))
+        log_governance_action(x_actor_id, x_role, "BULK_EFIR_EXPORT", x_justification,
+                              f"{scope} ({len(documents)} reports, directory {root_cid})")
+        reports = {}
+        for name, (device_id, _) in documents.items():
+            receipt = log_audit_event(x_actor_id, dids[device_id], "BULK_EFIR_EXPORT", cids[name])
+            reports[device_id] = {"file": name, "cid": cids[name], "did": dids[device_id], "audit_receipt": receipt}
+        manifest = {
+            "scope": scope,
+            "generated_at": time.time(),
+            "directory_cid": root_cid,
+            "reports": reports,
+            "failed": failed
+        }
+        yield archive.add("manifest.json", json.dumps(manifest, indent=2).encode())
+        yield archive.close()
+
+    headers = {'Content-Disposition': f'attachment; filename="EFIR_EXPORT_{(cluster_id or zone_id).replace(":", "_")}.zip"'}
+    return StreamingResponse(stream(), media_type="application/zip", headers=headers)
+
+@fastapi_app.get("/api/v1/evidence/{cid}")
+async def get_evidence(cid: str):
+    """Streams a stored evidence file by CID (chunk by chunk, never fully buffered)."""
+    from fastapi.responses import StreamingResponse
+    from app.services.evidence_store import EVIDENCE_STORE, DIRECTORY_MIME
+    if not EVIDENCE_STORE.has(cid):
+        raise HTTPException(status_code=404, detail="Unknown CID")
+    meta = EVIDENCE_STORE.stat(cid) or {}
+    if meta.get("mime") == DIRECTORY_MIME:
+        raise HTTPException(status_code=400, detail="CID is a directory; see the export manifest for file CIDs")
+    import itertools
+    chunks = EVIDENCE_STORE.stream(cid)
+    first = next(chunks, b"")
+    # Files inside an export directory carry no pin metadata
+    mime = meta.get("mime") or ("application/pdf" if first.startswith(b"%PDF-") else "application/octet-stream")
+    return StreamingResponse(itertools.chain([first], chunks), media_type=mime,
+                             headers={"ETag": f'"{cid}"', "Cache-Control": "public, max-age=31536000, immutable"})
+
+@fastapi_app.get("/api/v1/audit/receipts/{receipt_id}")
+async def get_audit_receipt(receipt_id: str):
+    """
+    Audit anchoring receipt: PROVISIONAL until its batch root is mined, then
+    CONFIRMED with TXID, block and the Merkle inclusion proof of its chain hash.
+    """
+    from app.services.audit_anchor import AUDIT_ANCHOR
+    receipt = AUDIT_ANCHOR.get(receipt_id)
+    if receipt is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired audit receipt")
+    return receipt
+
 @fastapi_app.post("/api/v1/alert/override/{alert_id}")
 async def override_alert(
     alert_id: str,
@@ -377,30 +652,24 @@ async def claim_incident(
     """
     ICS Protocol: Assigns Exclusive Incident Commander.
     """
-    # Find alert in cache (Key might be device_id_TYPE, so we search values)
-    target_key = None
-    target_alert = None
-    
-    for key, alert in LATEST_ALERTS.items():
-        if alert['alert_id'] == alert_id:
-            target_key = key
-            target_alert = alert
-            break
+    # Find alert in cache (Key is device_id_TYPE, so go through the alert_id index)
+    target_key = LATEST_ALERTS.key_for_id(alert_id)
+    target_alert = LATEST_ALERTS.get(target_key)
             
     if not target_key:
          raise HTTPException(status_code=404, detail="Active Alert not found")
 
     # Log Handoff
     handoff = IncidentHandoff(
-        from_actor=target_alert.get('owner_id', 'SYSTEM'),
+        from_actor=target_alert.get('owner_id') or 'SYSTEM',
         to_actor=x_actor_id,
         timestamp=time.time(),
         reason="Manual Claim of Command"
     )
     
     # Update State
-    LATEST_ALERTS[target_key]['owner_id'] = x_actor_id
     LATEST_ALERTS[target_key]['handoff_log'].append(handoff)
+    LATEST_ALERTS.set_fields(target_key, owner_id=x_actor_id)
     
     return {"status": "assigned", "commander": x_actor_id, "alert_id": alert_id}
 
@@ -422,6 +691,34 @@ async def set_system_mode(
     log_governance_action(x_actor_id, x_role, "CHANGE_SYSTEM_MODE", f"Switched to {mode}", "GLOBAL_SYSTEM")
     return {"status": "updated", "current_mode": mode}
 
+@fastapi_app.get("/api/v1/system/risk-rules")
+async def get_risk_rules():
+    """
+    Active risk rule set (version, compiled factors, last reload error if any).
+    """
+    from app.services.risk_rules import RISK_RULES
+    plan = RISK_RULES.current()
+    return {**RISK_RULES.status, "factors": plan.factor_names, "rules": len(plan.steps), "overrides": len(plan.overrides)}
+
+@fastapi_app.post("/api/v1/system/risk-rules/reload")
+async def reload_risk_rules(
+    x_actor_id: str = Header("admin", alias="X-Actor-ID"),
+    x_role: str = Header(ROLE_ADMIN, alias="X-Role")
+):
+    """
+    Hot Reload: Recompile app/core/risk_rules.json now (no restart, no wait for the mtime check).
+    """
+    from app.services.risk_rules import RISK_RULES, RuleError
+    if x_role != ROLE_ADMIN:
+        raise HTTPException(status_code=403, detail="Only Admins can reload risk rules.")
+    try:
+        plan = await asyncio.to_thread(RISK_RULES.reload, True)
+    except (RuleError, OSError) as e:
+        raise HTTPException(status_code=422, detail=f"Risk rules rejected: {e}")
+
+    log_governance_action(x_actor_id, x_role, "RELOAD_RISK_RULES", f"Loaded version {plan.version}", "GLOBAL_SYSTEM")
+    return {"status": "reloaded", "version": plan.version, "factors": plan.factor_names}
+
 @fastapi_app.get("/api/v1/system/policy")
 async def get_privacy_policy():
     """
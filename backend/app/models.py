@@ -17,6 +17,7 @@ class AlertType(str, Enum):
     FALL_DETECTED = "FALL_DETECTED"
     SOS_MANUAL = "SOS_MANUAL"
     Unconscious = "UNCONSCIOUS" 
+    RISK_ESCALATION = "RISK_ESCALATION" # Fleet re-scoring (night / weather drift)
 
 class SystemMode(str, Enum):
     NORMAL = "NORMAL"
@@ -67,6 +68,18 @@ class TelemetryData(BaseModel):
     # V5.0 Behavioral Biometrics
     humanity_score: float = 100.0 # 0-100% "Human Entropy" score
 
+class SignedTelemetry(BaseModel):
+    """
+    One attested packet inside a gateway batch (replaces X-Signature/X-Nonce headers).
+    """
+    packet: TelemetryData
+    signature: str
+    nonce: int
+
+class TelemetryBatch(BaseModel):
+    gateway_id: Optional[str] = None
+    packets: List[SignedTelemetry]
+
 class Alert(BaseModel):
     alert_id: str
     device_id: str
@@ -83,6 +96,7 @@ class Alert(BaseModel):
     ack_time: Optional[float] = None
     resolved_by: Optional[str] = None
     resolved_time: Optional[float] = None
+    version: int = 0 # Bumped per persisted state change (conditional writes)
     
     # Incident Ownership (V3.2 ICS)
     owner_id: Optional[str] = None # Functional Commander
@@ -5,17 +5,38 @@ from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
 
+# Compiled once per process (each E-FIR render worker keeps them warm)
+styles = getSampleStyleSheet()
+header_style = ParagraphStyle('Header', fontSize=18, leading=22, alignment=1, textColor=colors.navy)
+sub_header_style = ParagraphStyle('SubHeader', fontSize=12, alignment=1, spaceAfter=20)
+
+INCIDENT_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (1,0), colors.navy),
+    ('TEXTCOLOR', (0,0), (1,0), colors.whitesmoke),
+    ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+    ('GRID', (0,0), (-1,-1), 1, colors.black),
+    ('BOTTOMPADDING', (0,0), (-1,-1), 8),
+])
+
+TIMELINE_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+    ('TEXTCOLOR', (0,0), (-1,0), colors.black),
+    ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+    ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+    ('FONTSIZE', (0,0), (-1,-1), 8),
+    ('VALIGN', (0,0), (-1,-1), 'TOP'),
+])
+
+def render_efir_pdf(incident_data) -> bytes:
+    """Process-pool entry point (services/efir_renderer.py): PDF bytes."""
+    return generate_efir_pdf(incident_data).getvalue()
+
 def generate_efir_pdf(incident_data):
     """
     incident_data: {tourist_id, permit_id, lat, lng, risk_score, factors, blockchain_txid}
     """
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=50, leftMargin=50, topMargin=50, bottomMargin=50)
-    styles = getSampleStyleSheet()
-    
-    # Custom Styles
-    header_style = ParagraphStyle('Header', fontSize=18, leading=22, alignment=1, textColor=colors.navy)
-    sub_header_style = ParagraphStyle('SubHeader', fontSize=12, alignment=1, spaceAfter=20)
     
     story = []
 
@@ -41,13 +62,7 @@ def generate_efir_pdf(incident_data):
     ]
     
     t = Table(data, colWidths=[150, 300])
-    t.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (1,0), colors.navy),
-        ('TEXTCOLOR', (0,0), (1,0), colors.whitesmoke),
-        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-        ('GRID', (0,0), (-1,-1), 1, colors.black),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 8),
-    ]))
+    t.setStyle(INCIDENT_TABLE_STYLE)
     story.append(t)
     story.append(Spacer(1, 20))
 
@@ -85,14 +100,7 @@ def generate_efir_pdf(incident_data):
         t_data.append(["-", "NO EVENTS RECORDED", "-", "-"])
         
     tl_table = Table(t_data, colWidths=[100, 120, 100, 160])
-    tl_table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.black),
-        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-        ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-        ('FONTSIZE', (0,0), (-1,-1), 8),
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-    ]))
+    tl_table.setStyle(TIMELINE_TABLE_STYLE)
     story.append(tl_table)
 
     # 5. Footer & Legal Disclaimer
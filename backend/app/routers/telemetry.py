@@ -1,64 +1,52 @@
 from fastapi import APIRouter, BackgroundTasks, HTTPException, Header, Request, Depends
-from app.models import TelemetryData, Alert, AlertType, SafetyStatus, GeoPoint
+from fastapi.responses import JSONResponse
+from app.models import TelemetryData, TelemetryBatch, Alert, AlertType, SafetyStatus, GeoPoint
 from app.services.db import get_table
 from app.services.geofence import check_geofence_breach
+from app.services.event_log import EVENT_LOG
 from app.services.anomaly_detection import detect_anomalies
 from app.services.websocket import notify_alert, broadcast_telemetry
 from decimal import Decimal
 import uuid
 import time
-from app.core.shared_state import LATEST_POSITIONS, KALMAN_STATES, LATEST_ALERTS, SYSTEM_METRICS
-from app.services.identity import get_permit_info
+from app.core.shared_state import LATEST_POSITIONS, LATEST_ALERTS, SYSTEM_METRICS, TELEMETRY_HISTORY
+from app.services.biometrics import analyze_humanity
+from app.services.kalman import KALMAN_BANK
+from app.services.fleet_history import FLEET_HISTORY
+from app.services.metrics import stage_timer, INGESTION_THROUGHPUT
+from app.services.permits import PERMITS
 
 from app.engine import SentinelAI
 from fastapi import Security
 from fastapi.security.api_key import APIKeyHeader
 from app.core.config import settings
 from app.core import telemetry_pb2 # Generated Protobuf
-from collections import defaultdict
 
 router = APIRouter()
 
-# --- RATE LIMITER (Leaky Bucket) ---
-class RateLimiter:
-    def __init__(self, rate=100, per=1.0):
-        self.rate = rate
-        self.per = per
-        self.allowance = defaultdict(lambda: rate)
-        self.last_check = defaultdict(lambda: time.time())
-
-    def check(self, ip: str) -> bool:
-        current = time.time()
-        time_passed = current - self.last_check[ip]
-        self.last_check[ip] = current
-        self.allowance[ip] += time_passed * (self.rate / self.per)
-        
-        if self.allowance[ip] > self.rate:
-            self.allowance[ip] = self.rate
-            
-        if self.allowance[ip] < 1.0:
-            return False # Reject
-        
-        self.allowance[ip] -= 1.0
-        return True
+# --- RATE LIMITER (Token Bucket, LRU-capped) ---
+from app.services.rate_limit import RateLimiter
 
-limiter = RateLimiter(rate=50, per=1.0) # 50 req/sec per IP
+limiter = RateLimiter(rate=settings.RATE_LIMIT_PER_IP, per=1.0, capacity=settings.RATE_LIMIT_TABLE_SIZE) # per IP
+device_limiter = RateLimiter(rate=settings.RATE_LIMIT_PER_DEVICE, per=1.0, burst=settings.RATE_LIMIT_PER_DEVICE * 2,
+                             capacity=settings.RATE_LIMIT_TABLE_SIZE) # per attested device
 
 def check_rate_limit(request: Request):
     ip = request.client.host if request.client else "unknown"
     if not limiter.check(ip):
         raise HTTPException(status_code=429, detail="Rate Limit Exceeded (Anti-DDoS Protection)")
 
-from app.services.identities import verify_device_integrity, verify_packet_signature
+from app.services.admission import admission, PRIORITY, ADMIT, COALESCE, SHED
+from app.services.identities import verify_device_integrity, verify_packet_signature, verify_packet_batch, canonical_payload
 
 from app.services.integrity import is_system_locked
 
 # --- SHARED CORE LOGIC ---
-async def process_telemetry_core(data: TelemetryData, background_tasks: BackgroundTasks, 
-                                 request_fingerprint: str = None, request_cert: str = None,
-                                 request_signature: str = None, request_nonce: int = None):
+def attest_telemetry(data: TelemetryData, request_fingerprint: str = None, request_cert: str = None,
+                     request_signature: str = None, request_nonce: int = None):
     """
-    Common Pipeline for JSON and Protobuf Ingestion.
+    Common Attestation for JSON and Protobuf Ingestion (raises HTTPException on failure).
+    Runs before admission so nothing unattested can claim a lane or park a fix.
     """
     # -1. GLOBAL KILL SWITCH CHECK
     if is_system_locked():
@@ -66,7 +54,8 @@ async def process_telemetry_core(data: TelemetryData, background_tasks: Backgrou
 
     # 0. Zero Trust Check (mTLS + Fingerprinting)
     if request_fingerprint and request_cert: 
-        is_valid = verify_device_integrity(data.device_id, request_fingerprint, request_cert)
+        with stage_timer("auth"):
+            is_valid = verify_device_integrity(data.device_id, request_fingerprint, request_cert)
         if not is_valid:
             print(f"SECURITY ALERT: Telemetry blocked for {data.device_id} due to invalid Hardware/Cert.")
             raise HTTPException(status_code=401, detail="Zero Trust Violation: Hardware Fingerprint or mTLS Mismatch")
@@ -77,72 +66,72 @@ async def process_telemetry_core(data: TelemetryData, background_tasks: Backgrou
          # Fail securely if signature missing
          raise HTTPException(status_code=401, detail="Attestation Missing: X-Signature and X-Nonce are required.")
     
-    # Reconstruct Payload String (Canonical Format)
-    # Format: device_id:timestamp:lat:lng
-    payload_string = f"{data.device_id}:{data.timestamp}:{data.location.lat}:{data.location.lng}"
-    
-    is_attested = verify_packet_signature(data.device_id, payload_string, request_signature, request_nonce)
+    with stage_timer("signature"):
+        # Reconstruct Payload String (Canonical Format)
+        # Format: device_id:timestamp:lat:lng
+        payload_string = canonical_payload(data.device_id, data.timestamp, data.location.lat, data.location.lng)
+        is_attested = verify_packet_signature(data.device_id, payload_string, request_signature, request_nonce)
     if not is_attested:
             print(f"SECURITY ALERT: Telemetry blocked for {data.device_id} due to Badge Signature/Replay Failure.")
             raise HTTPException(status_code=401, detail="Attestation Violation: Invalid Signature or Replay Attack")
-            
+
+    # 0a-ii. Per-Device Flood Control (after attestation so a spoofed device_id can't starve the real one)
+    if not data.is_panic and not device_limiter.check(data.device_id):
+        raise HTTPException(status_code=429, detail="Rate Limit Exceeded (Per-Device)")
+
+def record_raw_fix(data: TelemetryData):
+    """Columnar history for the fleet bot scan (raw, pre-Kalman: jitter is the signal)."""
+    FLEET_HISTORY.append(data.device_id, data.timestamp, data.location.lat, data.location.lng,
+                         data.speed, data.heading)
+
+async def process_attested_telemetry(data: TelemetryData, background_tasks: BackgroundTasks, smoothed: bool = False,
+                                     risk_report: dict = None):
+    """
+    Pipeline stages AFTER attestation (shared by single and batch ingestion).
+    smoothed=True: location was already filtered by KALMAN_BANK.step_batch.
+    risk_report: precomputed by SentinelAI.calculate_risk_batch (batch ingestion).
+    """
     # 0b. Metrics
     SYSTEM_METRICS['ingestion_count'] += 1
+    INGESTION_THROUGHPUT.mark()
 
     # 1. BEHAVIORAL BIOMETRICS (V5.0 Turing Test)
-    from app.services.biometrics import analyze_humanity
-    data.humanity_score = analyze_humanity(data)
+    with stage_timer("biometrics"):
+        data.humanity_score = analyze_humanity(data)
+        if not smoothed:
+            record_raw_fix(data)
     if data.humanity_score < 50.0:
         print(f"🤖 ADVERSARIAL AI DEFENSE: {data.device_id} flagged as BOT (Score: {data.humanity_score:.1f}%)")
 
     # 2. KALMAN FILTERING (Signal Smoothing)
-    if data.device_id not in KALMAN_STATES:
-        KALMAN_STATES[data.device_id] = {
-            'x': [data.location.lat, data.location.lng, 0, 0], 
-            'P': [[1,0,0,0], [0,1,0,0], [0,0,1000,0], [0,0,0,1000]],
-            'last_ts': data.timestamp
-        }
-    
-    kf = KALMAN_STATES[data.device_id]
-    dt = data.timestamp - kf['last_ts']
-    if dt <= 0: dt = 0.01 
-    
-    kf['x'][0] += kf['x'][2] * dt
-    kf['x'][1] += kf['x'][3] * dt
-    
-    z = [data.location.lat, data.location.lng]
-    y = [z[0] - kf['x'][0], z[1] - kf['x'][1]]
-    K = 0.6 
-    
-    kf['x'][0] += K * y[0]
-    kf['x'][1] += K * y[1]
-    
-    kf['x'][2] = (kf['x'][0] - (kf['x'][0] - K*y[0])) / dt
-    kf['x'][3] = (kf['x'][1] - (kf['x'][1] - K*y[1])) / dt
-
-    kf['last_ts'] = data.timestamp
-    
-    # Overwrite with Smoothed Coordinates
-    data.location.lat = kf['x'][0]
-    data.location.lng = kf['x'][1]
+    if not smoothed:
+        with stage_timer("kalman"):
+            # Overwrite with Smoothed Coordinates
+            data.location.lat, data.location.lng = KALMAN_BANK.step(
+                data.device_id, data.location.lat, data.location.lng, data.timestamp
+            )
     
     # 2. UPDATE CACHE
-    LATEST_POSITIONS[data.device_id] = data.model_dump()
-
-    # 2a. UPDATE HISTORY BUFFER (Demo Resilience)
-    # Ensure VCR works even if DynamoDB is offline/empty
-    from app.core.shared_state import TELEMETRY_HISTORY
-    TELEMETRY_HISTORY[data.device_id].append(data.model_dump())
-    if len(TELEMETRY_HISTORY[data.device_id]) > 500:
-        TELEMETRY_HISTORY[data.device_id].pop(0)
+    with stage_timer("cache_update"):
+        snapshot = data.model_dump()
+        LATEST_POSITIONS[data.device_id] = snapshot
+
+        # 2a. UPDATE HISTORY BUFFER (Demo Resilience)
+        # Ensure VCR works even if DynamoDB is offline/empty
+        history = TELEMETRY_HISTORY[data.device_id]
+        history.append(dict(snapshot))
+        if len(history) > 500:
+            history.pop(0)
     
     # 3. AI RISK CALCULATION
-    risk_report = SentinelAI.calculate_risk(data.model_dump(), LATEST_POSITIONS)
+    if risk_report is None:
+        with stage_timer("risk"):
+            risk_report = SentinelAI.calculate_risk(snapshot)
+    snapshot['risk'] = risk_report # Drives admission priority & E-FIR
     
     # 4. BROADCAST
-    payload = data.model_dump()
-    payload['risk'] = risk_report
-    await broadcast_telemetry(payload)
+    with stage_timer("broadcast"):
+        await broadcast_telemetry(snapshot)
     
     # 5. OFFLOAD SLOW TASKS
     background_tasks.add_task(process_risk_and_db, data)
@@ -160,15 +149,14 @@ def upsert_alert(device_id: str, alert_type: AlertType, severity: str, msg: str,
     current_time = time.time()
     
     if existing and existing['status'] != 'RESOLVED':
-        # UPDATE EXISTING
-        existing['timestamp'] = current_time # refresh last seen
-        existing['location'] = location # update location
+        # UPDATE EXISTING (through set_fields so the write-behind persists last seen / location)
         # If severity increases?
         if severity == 'CRITICAL' and existing['severity'] != 'CRITICAL':
-            existing['severity'] = 'CRITICAL'
-            existing['message'] = msg
+            LATEST_ALERTS.set_fields(alert_key, timestamp=current_time, location=location,
+                                     severity='CRITICAL', message=msg)
             # Notify again if escalated
             return existing, True 
+        LATEST_ALERTS.set_fields(alert_key, timestamp=current_time, location=location)
         return existing, False # No new notification needed
         
     else:
@@ -195,12 +183,13 @@ async def process_risk_and_db(data: TelemetryData):
     """
     affected_alerts = []
     
-    # Identity Verification (Blockchain Bridge) - runs in threadpool to prevent deadlock
+    # Identity Verification (Blockchain Bridge) - cache-first, async chain call on a miss
     import asyncio
-    permit_str = await asyncio.to_thread(get_permit_info, data.did)
+    permit_str = await PERMITS.get(data.did)
 
     # 1. Check Geofence
     breached_zone = check_geofence_breach(data.location)
+    EVENT_LOG.observe_fix(data.device_id, data.timestamp, breached_zone, permit_str)
     if breached_zone:
          alert, is_new = upsert_alert(
              data.device_id, 
@@ -251,7 +240,8 @@ async def process_risk_and_db(data: TelemetryData):
         item['heading'] = Decimal(str(item['heading']))
         item['battery_level'] = Decimal(str(item['battery_level']))
         # Offload boto3 sync call to thread
-        await asyncio.to_thread(t_table.put_item, Item=item)
+        with stage_timer("background_db"):
+            await asyncio.to_thread(t_table.put_item, Item=item)
     except Exception as e:
         pass
 
@@ -274,8 +264,47 @@ async def verify_api_key(api_key: str = Security(api_key_header)):
         raise HTTPException(status_code=403, detail="Could not validate credentials")
 
 
-@router.post("/telemetry", dependencies=[Depends(verify_api_key), Depends(check_rate_limit)])
+async def run_admitted(lane: str, data: TelemetryData, background_tasks: BackgroundTasks, run):
+    """
+    Executes run(background_tasks) according to the admission lane.
+    Returns None when the packet was parked (coalesced) for later processing.
+    """
+    if lane == PRIORITY:
+        return await run(background_tasks)
+    if lane == ADMIT:
+        async with admission.routine_slot():
+            return await run(background_tasks)
+    if lane == COALESCE:
+        admission.defer(data.device_id, data.timestamp, run)
+        return None
+    raise HTTPException(status_code=503, detail="Load Shed: Routine telemetry dropped under overload",
+                        headers={"Retry-After": "1"})
+
+async def ingest_single(request: Request, data: TelemetryData, background_tasks: BackgroundTasks,
+                        fingerprint: str, cert: str, signature: str, nonce: int):
+    """
+    Single-packet path: per-IP limit -> attestation -> admission lane.
+    Returns the risk report, or None when the packet was coalesced.
+    """
+    # SOS / high-risk claims skip the per-IP bucket only once attested;
+    # a claim that fails attestation is charged like any other packet
+    priority_claim = admission.is_priority(data.device_id, data.is_panic)
+    if not priority_claim:
+        check_rate_limit(request)
+    try:
+        attest_telemetry(data, fingerprint, cert, signature, nonce)
+    except HTTPException:
+        if priority_claim:
+            check_rate_limit(request)
+        raise
+
+    lane = admission.admit(data.device_id, data.is_panic)
+    return await run_admitted(lane, data, background_tasks,
+                              lambda tasks: process_attested_telemetry(data, tasks))
+
+@router.post("/telemetry", dependencies=[Depends(verify_api_key)])
 async def ingest_telemetry(
+    request: Request,
     data: TelemetryData, 
     background_tasks: BackgroundTasks,
     x_device_fingerprint: str = Header(None, alias="X-Device-Fingerprint"),
@@ -287,12 +316,94 @@ async def ingest_telemetry(
     FAST PATH (JSON): Production-grade ingestion.
     """
     # Enforce Zero Trust if headers present (Phase 4.1)
-    risk_report = await process_telemetry_core(data, background_tasks, 
-                                             x_device_fingerprint, x_client_cert,
-                                             x_signature, x_nonce)
+    risk_report = await ingest_single(request, data, background_tasks,
+                                      x_device_fingerprint, x_client_cert, x_signature, x_nonce)
+    if risk_report is None:
+        return JSONResponse(status_code=202, content={"status": "coalesced", "timestamp": data.timestamp})
     return {"status": "accepted", "timestamp": data.timestamp, "risk": risk_report}
 
-@router.post("/telemetry/proto", dependencies=[Depends(verify_api_key), Depends(check_rate_limit)])
+@router.post("/telemetry/batch", dependencies=[Depends(verify_api_key), Depends(check_rate_limit)])
+async def ingest_telemetry_batch(batch: TelemetryBatch, background_tasks: BackgroundTasks):
+    """
+    GATEWAY PATH (Bulk JSON): One request carries many individually signed packets.
+    Signatures are verified off the event loop; bad packets are rejected individually.
+    """
+    if is_system_locked():
+        raise HTTPException(status_code=503, detail="SERVICE UNAVAILABLE: SECURITY LOCKDOWN IN EFFECT")
+    if len(batch.packets) > settings.MAX_BATCH_PACKETS:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {settings.MAX_BATCH_PACKETS} packets)")
+
+    verdicts = await verify_packet_batch([
+        (
+            item.packet.device_id,
+            canonical_payload(item.packet.device_id, item.packet.timestamp,
+                              item.packet.location.lat, item.packet.location.lng),
+            item.signature,
+            item.nonce
+        )
+        for item in batch.packets
+    ])
+
+    accepted = 0
+    coalesced = 0
+    rejected = []
+    admitted = [] # (lane, packet)
+    for item, is_attested in zip(batch.packets, verdicts):
+        packet = item.packet
+        if not is_attested:
+            rejected.append({"device_id": packet.device_id, "nonce": item.nonce,
+                             "reason": "Attestation Violation: Invalid Signature or Replay Attack"})
+            continue
+        if not packet.is_panic and not device_limiter.check(packet.device_id):
+            rejected.append({"device_id": packet.device_id, "nonce": item.nonce,
+                             "reason": "Rate Limit Exceeded (Per-Device)"})
+            continue
+
+        lane = admission.admit(packet.device_id, packet.is_panic)
+        if lane == SHED:
+            rejected.append({"device_id": packet.device_id, "nonce": item.nonce,
+                             "reason": "Load Shed: Routine telemetry dropped under overload"})
+            continue
+        admitted.append((lane, packet))
+
+    # Smooth + score every packet that runs now in one vectorized pass (coalesced
+    # ones are handled when drained, since a newer fix may replace them first)
+    immediate = [packet for lane, packet in admitted if lane != COALESCE]
+    risk_reports = {}
+    if immediate:
+        for packet in immediate:
+            record_raw_fix(packet)
+        with stage_timer("kalman"):
+            lats, lngs = KALMAN_BANK.step_batch([p.device_id for p in immediate],
+                                                [p.location.lat for p in immediate],
+                                                [p.location.lng for p in immediate],
+                                                [p.timestamp for p in immediate])
+        with stage_timer("risk"):
+            risks = SentinelAI.calculate_risk_batch(lats, lngs,
+                                                    [p.speed for p in immediate],
+                                                    [p.is_panic for p in immediate],
+                                                    [p.timestamp for p in immediate],
+                                                    now=time.time())
+        for k, (packet, lat, lng) in enumerate(zip(immediate, lats.tolist(), lngs.tolist())):
+            packet.location.lat, packet.location.lng = lat, lng
+            risk_reports[id(packet)] = SentinelAI.expand_risk(risks, k)
+
+    for lane, packet in admitted:
+        if lane == COALESCE:
+            run = lambda tasks, p=packet: process_attested_telemetry(p, tasks)
+        else:
+            run = lambda tasks, p=packet: process_attested_telemetry(p, tasks, smoothed=True,
+                                                                     risk_report=risk_reports[id(p)])
+        result = await run_admitted(lane, packet, background_tasks, run)
+        if result is None:
+            coalesced += 1
+        else:
+            accepted += 1
+
+    return {"status": "accepted", "gateway_id": batch.gateway_id, "accepted": accepted,
+            "coalesced": coalesced, "rejected": rejected}
+
+@router.post("/telemetry/proto", dependencies=[Depends(verify_api_key)])
 async def ingest_telemetry_proto(
     request: Request, 
     background_tasks: BackgroundTasks,
@@ -320,21 +431,27 @@ async def ingest_telemetry_proto(
             battery_level=packet.battery_level,
             is_panic=packet.is_panic
         )
-        
-        await process_telemetry_core(data, background_tasks, 
-                                   x_device_fingerprint, x_client_cert,
-                                   x_signature, x_nonce)
-        return {"status": "accepted", "method": "PROTOBUF"}
-        
     except Exception as e:
-        if "Zero Trust" in str(e): raise e
         raise HTTPException(status_code=400, detail=f"Invalid Protobuf: {str(e)}")
 
+    result = await ingest_single(request, data, background_tasks,
+                                 x_device_fingerprint, x_client_cert, x_signature, x_nonce)
+    if result is None:
+        return JSONResponse(status_code=202, content={"status": "coalesced", "method": "PROTOBUF"})
+    return {"status": "accepted", "method": "PROTOBUF"}
+
 @router.get("/alerts")
-async def get_all_alerts():
+async def get_all_alerts(status: str = None, severity: str = None):
     """
     Get all active alerts from memory (Operational View).
+    Optional status / severity filters are served from the alert store indexes.
     """
+    if status and severity:
+        return [a for a in LATEST_ALERTS.with_status(status) if a['severity'] == severity]
+    if status:
+        return LATEST_ALERTS.with_status(status)
+    if severity:
+        return LATEST_ALERTS.with_severity(severity)
     return list(LATEST_ALERTS.values())
 
 @router.patch("/alerts/{alert_id}/acknowledge")
@@ -348,17 +465,11 @@ async def acknowledge_alert(
         print(f"RBAC VIOLATION: {x_actor_id} ({x_role}) tried to ACK without permission.")
         raise HTTPException(status_code=403, detail="Insufficient Privileges")
 
-    # Find alert in cache (by ID)
-    target_key = None
-    for k, v in LATEST_ALERTS.items():
-        if v['alert_id'] == alert_id:
-            target_key = k
-            break
+    # Find alert in cache (alert_id index)
+    target_key = LATEST_ALERTS.key_for_id(alert_id)
             
     if target_key:
-        LATEST_ALERTS[target_key]['status'] = 'ACKNOWLEDGED'
-        LATEST_ALERTS[target_key]['ack_by'] = x_actor_id
-        LATEST_ALERTS[target_key]['ack_time'] = time.time()
+        LATEST_ALERTS.set_fields(target_key, status='ACKNOWLEDGED', ack_by=x_actor_id, ack_time=time.time())
         print(f"ALERT_OP: Alert {alert_id} ACKNOWLEDGED by {x_actor_id} ({x_role})")
         return {"status": "success", "alert": LATEST_ALERTS[target_key]}
     
@@ -375,21 +486,15 @@ async def resolve_alert(
         print(f"RBAC VIOLATION: {x_actor_id} ({x_role}) tried to RESOLVE without permission.")
         raise HTTPException(status_code=403, detail="Insufficient Privileges: COMMANDER Access Required")
 
-    target_key = None
-    for k, v in LATEST_ALERTS.items():
-        if v['alert_id'] == alert_id:
-            target_key = k
-            break
+    target_key = LATEST_ALERTS.key_for_id(alert_id)
             
     if target_key:
-        LATEST_ALERTS[target_key]['status'] = 'RESOLVED'
-        LATEST_ALERTS[target_key]['resolved_by'] = x_actor_id
-        LATEST_ALERTS[target_key]['resolved_time'] = time.time()
+        LATEST_ALERTS.set_fields(target_key, status='RESOLVED', resolved_by=x_actor_id, resolved_time=time.time())
         
         # Move to History / Delete from Active Cache to clear clutter
+        # (final RESOLVED state is persisted by the alert write-behind)
         resolved_alert = LATEST_ALERTS.pop(target_key)
         
-        # Persist final state to DB (Todo)
         print(f"ALERT_OP: Alert {alert_id} RESOLVED by {x_actor_id} ({x_role})")
         return {"status": "success", "message": "Alert Resolved and Archived"}
         
@@ -400,8 +505,8 @@ async def get_alerts(device_id: str):
     """
     Get active alerts for a device.
     """
-    # Filter LATEST_ALERTS for the specific device_id
-    device_alerts = [alert for alert in LATEST_ALERTS.values() if alert['device_id'] == device_id]
+    # device_id index on LATEST_ALERTS
+    device_alerts = LATEST_ALERTS.for_device(device_id)
     return {"alerts": device_alerts}
 
 @router.get("/test")
@@ -422,13 +527,32 @@ async def get_map_positions():
 
     return list(LATEST_POSITIONS.values())
 
+def score_history(points: list) -> list:
+    """
+    Replay scoring: attaches 'risk' to each point, evaluated at the point's own
+    timestamp, in one calculate_risk_batch call.
+    """
+    if not points:
+        return points
+    risks = SentinelAI.calculate_risk_batch([p['location']['lat'] for p in points],
+                                            [p['location']['lng'] for p in points],
+                                            [p.get('speed', 0.0) for p in points],
+                                            [p.get('is_panic', False) for p in points],
+                                            [p['timestamp'] for p in points])
+    return [{**p, "risk": SentinelAI.expand_risk(risks, i)} for i, p in enumerate(points)]
+
 @router.get("/telemetry/history/{device_id}")
-async def get_device_history(device_id: str, hours: int = 4):
+async def get_device_history(device_id: str, hours: int = 4, rescore: bool = False):
     """
     Fetch historical telemetry for 'Breadcrumbs' (last N hours).
     Efficiently queries DynamoDB partition key.
     Fallbacks to In-Memory Buffer if DB is empty (Demo Mode).
+    rescore=true: recompute risk for every point as of its own timestamp (VCR replay).
     """
+    history = await fetch_device_history(device_id, hours)
+    return score_history(history) if rescore else history
+
+async def fetch_device_history(device_id: str, hours: int):
     from boto3.dynamodb.conditions import Key
     from app.core.shared_state import TELEMETRY_HISTORY
     
@@ -47,11 +47,12 @@ async def monitor_dead_mans_switch():
                         reasons.append(f"Low Battery ({batt}%)")
                         suggested_action = "CHECK LAST POS / BATTERY DRAIN"
                         
-                    # Factor 2: Weather? (Mocked: Randomly assume bad weather for demo purposes if ID ends in odd number)
-                    # In prod, this queries app.engine.WeatherService
-                    if int(str(ord(device_id[-1]))) % 2 != 0: 
+                    # Factor 2: Weather? (Storms/snow/fog also kill signal)
+                    from app.services.weather import WEATHER, UNKNOWN
+                    weather = WEATHER.condition_at(gp.lat, gp.lng)
+                    if weather not in (UNKNOWN, "Clear Sky", "Clouds"):
                         confidence -= 20
-                        reasons.append("Possible Weather Interference")
+                        reasons.append(f"Possible Weather Interference ({weather})")
                     
                     # Factor 3: Movement History
                     # If speed was 0 before loss, maybe just resting?
@@ -76,9 +77,8 @@ async def monitor_dead_mans_switch():
                     
                     alert_dict = None
                     if existing and existing['status'] != 'RESOLVED':
-                        existing['timestamp'] = now
-                        existing['message'] = msg
-                        existing['severity'] = "CRITICAL" if final_score > 50 else "MEDIUM"
+                        LATEST_ALERTS.set_fields(alert_key, timestamp=now, message=msg,
+                                                 severity="CRITICAL" if final_score > 50 else "MEDIUM")
                         # Only notify if confidence changed significantly? For now notify always on loop
                     else:
                         new_alert = Alert(
@@ -102,13 +102,8 @@ async def monitor_dead_mans_switch():
         except Exception as e:
             print(f"Scheduler Error: {e}")
             
-        # --- TASK B: DR SNAPSHOT (Every 5 mins) ---
-        if int(time.time()) % 300 < 65:  # Window to run every ~5 mins
-             from app.snapshots import create_snapshot
-             try:
-                 create_snapshot()
-             except:
-                 pass
+        # --- TASK B: DR SNAPSHOT ---
+        # Base + delta snapshots run in app.snapshots.run_snapshot_loop (started in main)
                  
         # --- TASK C: CRYPTOGRAPHIC ANCHORING (Chain-of-Custody) ---
         # Phase 4.1: Build Merkle Tree of current state and anchor to Ledger
@@ -130,3 +125,84 @@ async def monitor_dead_mans_switch():
             print(f"Merkle Anchor Error: {e}")
 
         await asyncio.sleep(60)
+
+# --- FLEET RE-SCORING (Time / Weather Drift) ---
+# Risk is otherwise only computed when a packet arrives, so a silent tourist in
+# a zone never picks up NIGHT_MULTIPLIER at dusk or a storm rolling in. This pass
+# re-scores every tracked device in one vectorized call and only talks to the
+# dashboard (telemetry_update / new_alert) for devices whose STATUS changed.
+
+STATUS_RANK = {"SAFE": 0, "WARNING": 1, "CRITICAL": 2}
+
+async def rescore_fleet(now: float = None) -> dict:
+    from app.engine import SentinelAI
+    from app.core.shared_state import SYSTEM_METRICS
+    from app.services.websocket import broadcast_telemetry
+    from app.routers.telemetry import upsert_alert
+
+    started = time.perf_counter()
+    now = time.time() if now is None else now
+    device_ids = list(LATEST_POSITIONS.keys())
+    states = [LATEST_POSITIONS[d] for d in device_ids]
+    if not states:
+        return {"rescored": 0, "changed": 0, "escalated": 0}
+
+    risks = await asyncio.to_thread(
+        SentinelAI.calculate_risk_batch,
+        [s['location']['lat'] for s in states],
+        [s['location']['lng'] for s in states],
+        [s.get('speed', 0.0) for s in states],
+        [s.get('is_panic', False) for s in states],
+        [s.get('timestamp', now) for s in states],
+        now=now
+    )
+
+    rescored = changed = escalated = 0
+    for i, (device_id, state) in enumerate(zip(device_ids, states)):
+        if LATEST_POSITIONS.get(device_id) is not state:
+            continue # A fresher packet was scored inline meanwhile
+        old_status = state.get('risk', {}).get('status')
+        new_risk = SentinelAI.expand_risk(risks, i)
+        if new_risk != state.get('risk'):
+            state['risk'] = new_risk
+            LATEST_POSITIONS[device_id] = state # Write back: marks the key for the next DR delta
+        rescored += 1
+        if new_risk['status'] == old_status:
+            continue
+
+        changed += 1
+        await broadcast_telemetry(state)
+        if new_risk['status'] != "SAFE" and STATUS_RANK[new_risk['status']] > STATUS_RANK.get(old_status, 0):
+            alert, is_new = upsert_alert(
+                device_id,
+                AlertType.RISK_ESCALATION,
+                "CRITICAL" if new_risk['status'] == "CRITICAL" else "HIGH",
+                f"Alert: DID {state.get('did', 'unknown')} risk escalated {old_status or 'UNSCORED'} -> "
+                f"{new_risk['status']} while silent ({', '.join(new_risk['factors'])}).",
+                state['location']
+            )
+            alert['did'] = state.get('did', 'unknown')
+            escalated += 1
+            if is_new:
+                await notify_alert(alert)
+
+    summary = {"rescored": rescored, "changed": changed, "escalated": escalated,
+               "duration_ms": round((time.perf_counter() - started) * 1000, 2)}
+    SYSTEM_METRICS['rescoring'] = summary
+    return summary
+
+async def run_fleet_rescoring_loop():
+    """
+    Production Periodic Task: Re-score the whole fleet every RISK_RESCORE_INTERVAL_SECONDS.
+    """
+    from app.core.config import settings
+    print(f"SCHEDULER: Fleet re-scoring every {settings.RISK_RESCORE_INTERVAL_SECONDS:.0f}s")
+    while True:
+        await asyncio.sleep(settings.RISK_RESCORE_INTERVAL_SECONDS)
+        try:
+            summary = await rescore_fleet()
+            if summary["changed"]:
+                print(f"SCHEDULER: Re-scored {summary['rescored']} devices, {summary['changed']} status changes "
+                      f"({summary['escalated']} escalations) in {summary['duration_ms']} ms")
+        except Exception as e:
+            print(f"Re-scoring Error: {e}")
@@ -0,0 +1,125 @@
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from fastapi import BackgroundTasks
+from app.core.config import settings
+from app.core.shared_state import LATEST_POSITIONS, SYSTEM_METRICS
+
+# --- ADMISSION CONTROL (Priority Lanes + Load Shedding) ---
+# Lane 1 (PRIORITY): SOS packets and devices currently WARNING/CRITICAL. Never shed.
+# Lane 2 (ROUTINE) : Position pings. Run inline while healthy; under overload
+#                    (too many in flight OR event-loop lag) only the newest packet
+#                    per device is kept (coalesced) and drained when capacity frees.
+#                    Beyond the pending cap, routine packets are shed (503).
+
+PRIORITY = "PRIORITY"
+ADMIT = "ADMIT"
+COALESCE = "COALESCE"
+SHED = "SHED"
+
+HIGH_RISK_STATUSES = ("WARNING", "CRITICAL")
+
+class AdmissionController:
+    def __init__(self, inflight_limit: int, pending_limit: int, lag_threshold_ms: float):
+        self.inflight_limit = inflight_limit
+        self.pending_limit = pending_limit
+        self.lag_threshold_ms = lag_threshold_ms
+        self.inflight_routine = 0
+        self.loop_lag_ms = 0.0
+        self._pending = OrderedDict() # device_id -> (timestamp, coroutine factory)
+        self._drainer = None
+        self.stats = {
+            "priority": 0,
+            "admitted": 0,
+            "deferred": 0,
+            "coalesced": 0,
+            "superseded": 0,
+            "shed": 0,
+            "pending": 0,
+            "loop_lag_ms": 0.0
+        }
+        SYSTEM_METRICS['admission'] = self.stats
+
+    def is_priority(self, device_id: str, is_panic: bool) -> bool:
+        if is_panic:
+            return True
+        last = LATEST_POSITIONS.get(device_id)
+        return bool(last) and last.get('risk', {}).get('status') in HIGH_RISK_STATUSES
+
+    def overloaded(self) -> bool:
+        return self.inflight_routine >= self.inflight_limit or self.loop_lag_ms >= self.lag_threshold_ms
+
+    def admit(self, device_id: str, is_panic: bool) -> str:
+        if self.is_priority(device_id, is_panic):
+            self.stats["priority"] += 1
+            return PRIORITY
+        if not self.overloaded():
+            self.stats["admitted"] += 1
+            return ADMIT
+        if device_id in self._pending or len(self._pending) < self.pending_limit:
+            return COALESCE
+        self.stats["shed"] += 1
+        return SHED
+
+    @asynccontextmanager
+    async def routine_slot(self):
+        self.inflight_routine += 1
+        try:
+            yield
+        finally:
+            self.inflight_routine -= 1
+
+    def defer(self, device_id: str, timestamp: float, factory):
+        """
+        Parks the newest routine packet per device. factory(background_tasks) -> awaitable.
+        """
+        if device_id in self._pending:
+            self.stats["coalesced"] += 1 # Older pending ping replaced
+        else:
+            self.stats["deferred"] += 1
+        self._pending[device_id] = (timestamp, factory)
+        self.stats["pending"] = len(self._pending)
+
+        if self._drainer is None or self._drainer.done():
+            self._drainer = asyncio.create_task(self._drain())
+
+    async def _drain(self):
+        while self._pending:
+            if self.overloaded():
+                await asyncio.sleep(0.01)
+                continue
+
+            device_id, (timestamp, factory) = self._pending.popitem(last=False)
+            self.stats["pending"] = len(self._pending)
+
+            # A fresher packet may have gone through inline meanwhile
+            last = LATEST_POSITIONS.get(device_id)
+            if last and last.get('timestamp', 0) >= timestamp:
+                self.stats["superseded"] += 1
+                continue
+
+            background_tasks = BackgroundTasks()
+            try:
+                async with self.routine_slot():
+                    await factory(background_tasks)
+                await background_tasks()
+            except Exception as e:
+                print(f"ADMISSION: Deferred packet for {device_id} dropped: {e}")
+
+async def run_loop_lag_monitor(interval: float = 0.1):
+    """
+    Background Task: Measures event-loop scheduling lag (how late a sleep wakes up).
+    """
+    while True:
+        start = time.monotonic()
+        await asyncio.sleep(interval)
+        lag_ms = max(0.0, (time.monotonic() - start - interval) * 1000)
+        admission.loop_lag_ms = lag_ms
+        admission.stats["loop_lag_ms"] = round(lag_ms, 2)
+
+admission = AdmissionController(
+    inflight_limit=settings.ADMISSION_ROUTINE_INFLIGHT_LIMIT,
+    pending_limit=settings.ADMISSION_PENDING_LIMIT,
+    lag_threshold_ms=settings.ADMISSION_LOOP_LAG_MS
+)
@@ -0,0 +1,177 @@
+import time
+from collections import OrderedDict
+from app.core.config import settings
+from app.core.shared_state import INCIDENT_CLUSTERS, SYSTEM_METRICS
+from app.models import GeoPoint
+from app.services.geofence import check_geofence_breach
+from app.services.weather import geohash_encode
+
+# --- ALERT AGGREGATION (Storm Suppression + Incident Clusters) ---
+# A landslide makes hundreds of devices in one zone raise the same alert at once.
+# Every alert passes through here before it reaches the dashboards:
+#   1. Re-notify cooldown  : the same alert (alert_id) is re-notified at most once per
+#                            ALERT_DEVICE_RENOTIFY_SECONDS unless its severity rose.
+#                            A new alert_id, CRITICAL and SOS_MANUAL always pass.
+#   2. Clustering          : alerts are grouped by (zone, type, time window). Zone is
+#                            the geofence hit, else a ~5 km geohash cell.
+#   3. Roll-up             : up to ALERT_CLUSTER_THRESHOLD members go out one by one;
+#                            after that the cluster is STORMING and members are only
+#                            counted. One 'incident_cluster' event is emitted when it
+#                            starts storming, then at most once per flush interval.
+# WebSocket fan-out is therefore bounded by the number of clusters, not devices.
+
+EMIT = "EMIT"
+CLUSTERED = "CLUSTERED"
+SUPPRESSED = "SUPPRESSED"
+
+SEVERITY_RANK = {"LOW": 0, "MEDIUM": 1, "HIGH": 2, "CRITICAL": 3}
+SAMPLE_DEVICES = 20 # Device ids carried in a roll-up event
+FALLBACK_CELL_PRECISION = 5
+
+def _location_of(alert: dict) -> tuple:
+    location = alert.get('location') or {}
+    if isinstance(location, GeoPoint):
+        return location.lat, location.lng
+    return location.get('lat', 0.0), location.get('lng', 0.0)
+
+def zone_of(lat: float, lng: float) -> str:
+    """Cluster zone of a position: the geofence hit, else a ~5 km geohash cell."""
+    zone = check_geofence_breach(GeoPoint(lat=lat, lng=lng))
+    if zone:
+        return zone.zone_id
+    return f"CELL_{geohash_encode(lat, lng, FALLBACK_CELL_PRECISION)}"
+
+class AlertAggregator:
+    def __init__(self, window_seconds: float, threshold: int, renotify_seconds: float,
+                 cluster_ttl_seconds: float, capacity: int):
+        self.window_seconds = window_seconds
+        self.threshold = threshold
+        self.renotify_seconds = renotify_seconds
+        self.cluster_ttl_seconds = cluster_ttl_seconds
+        self.capacity = capacity
+        self._last_notified = OrderedDict() # alert_id -> (monotonic ts, severity rank); LRU-capped
+        self._dirty = set()                 # Storming clusters with unsent member updates
+        self.stats = {
+            "emitted": 0,
+            "clustered": 0,
+            "suppressed": 0,
+            "cluster_events": 0,
+            "active_clusters": 0
+        }
+        SYSTEM_METRICS['alert_aggregation'] = self.stats
+
+    def _cooldown(self, alert: dict) -> bool:
+        """True if this same alert was notified recently at the same or higher severity."""
+        key = alert.get('alert_id')
+        if key is None:
+            return False
+        rank = SEVERITY_RANK.get(alert.get('severity'), 0)
+        now = time.monotonic()
+        last = self._last_notified.get(key)
+        urgent = alert.get('severity') == "CRITICAL" or getattr(alert['type'], 'value', alert['type']) == "SOS_MANUAL"
+        if not urgent and last is not None and now - last[0] < self.renotify_seconds and rank <= last[1]:
+            return True
+        self._last_notified[key] = (now, rank)
+        self._last_notified.move_to_end(key)
+        if len(self._last_notified) > self.capacity:
+            self._last_notified.popitem(last=False)
+        return False
+
+    def submit(self, alert: dict) -> tuple:
+        """
+        Returns (decision, cluster). EMIT: send the alert itself; CLUSTERED: counted
+        into a storming cluster (cluster returned when it JUST started storming, so
+        the caller can emit the first roll-up immediately); SUPPRESSED: cooldown.
+        """
+        if self._cooldown(alert):
+            self.stats["suppressed"] += 1
+            return SUPPRESSED, None
+
+        lat, lng = _location_of(alert)
+        zone = zone_of(lat, lng)
+        now = time.time()
+        window_start = int(now // self.window_seconds * self.window_seconds)
+        alert_type = getattr(alert['type'], 'value', alert['type'])
+        cluster_id = f"{zone}:{alert_type}:{window_start}"
+
+        cluster = INCIDENT_CLUSTERS.get(cluster_id)
+        if cluster is None:
+            cluster = {
+                "cluster_id": cluster_id,
+                "zone": zone,
+                "type": alert_type,
+                "window_start": window_start,
+                "first_seen": now,
+                "last_seen": now,
+                "count": 0,
+                "devices": set(),
+                "severity": alert.get('severity', "LOW"),
+                "center": {"lat": lat, "lng": lng},
+                "status": "FORMING"
+            }
+            INCIDENT_CLUSTERS[cluster_id] = cluster
+            self.stats["active_clusters"] = len(INCIDENT_CLUSTERS)
+
+        cluster["count"] += 1
+        cluster["devices"].add(alert['device_id'])
+        cluster["last_seen"] = now
+        if SEVERITY_RANK.get(alert.get('severity'), 0) > SEVERITY_RANK.get(cluster["severity"], 0):
+            cluster["severity"] = alert['severity']
+
+        if cluster["status"] == "FORMING":
+            if len(cluster["devices"]) <= self.threshold:
+                self.stats["emitted"] += 1
+                return EMIT, None
+            cluster["status"] = "STORMING"
+            self.stats["clustered"] += 1
+            return CLUSTERED, cluster
+
+        self.stats["clustered"] += 1
+        self._dirty.add(cluster_id)
+        return CLUSTERED, None
+
+    def to_event(self, cluster: dict) -> dict:
+        """Roll-up event for the WebSocket (counted in stats)."""
+        self.stats["cluster_events"] += 1
+        return self.render(cluster)
+
+    def render(self, cluster: dict) -> dict:
+        """JSON-safe view of a cluster (member counts + a device sample)."""
+        return {
+            "cluster_id": cluster["cluster_id"],
+            "zone": cluster["zone"],
+            "type": cluster["type"],
+            "severity": cluster["severity"],
+            "status": cluster["status"],
+            "window_start": cluster["window_start"],
+            "first_seen": cluster["first_seen"],
+            "last_seen": cluster["last_seen"],
+            "alert_count": cluster["count"],
+            "device_count": len(cluster["devices"]),
+            "sample_devices": sorted(cluster["devices"])[:SAMPLE_DEVICES],
+            "center": cluster["center"]
+        }
+
+    def drain_updates(self) -> list:
+        """Roll-up events for storming clusters that gained members since the last drain."""
+        events = [self.to_event(INCIDENT_CLUSTERS[c]) for c in self._dirty if c in INCIDENT_CLUSTERS]
+        self._dirty.clear()
+        return events
+
+    def evict_expired(self):
+        cutoff = time.time() - self.cluster_ttl_seconds
+        for cluster_id in [c for c, v in INCIDENT_CLUSTERS.items() if v["last_seen"] < cutoff]:
+            del INCIDENT_CLUSTERS[cluster_id]
+            self._dirty.discard(cluster_id)
+        self.stats["active_clusters"] = len(INCIDENT_CLUSTERS)
+
+    def snapshot(self) -> list:
+        return [self.render(c) for c in sorted(INCIDENT_CLUSTERS.values(), key=lambda c: -c["last_seen"])]
+
+ALERT_AGGREGATOR = AlertAggregator(
+    window_seconds=settings.ALERT_CLUSTER_WINDOW_SECONDS,
+    threshold=settings.ALERT_CLUSTER_THRESHOLD,
+    renotify_seconds=settings.ALERT_DEVICE_RENOTIFY_SECONDS,
+    cluster_ttl_seconds=settings.ALERT_CLUSTER_TTL_SECONDS,
+    capacity=settings.RATE_LIMIT_TABLE_SIZE
+)
@@ -0,0 +1,230 @@
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from enum import Enum
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import BotoCoreError, ClientError
+from pydantic import BaseModel
+from app.core.config import settings
+from app.core.shared_state import LATEST_ALERTS, SYSTEM_METRICS
+from app.services.db import get_db_resource
+
+# --- ALERT PERSISTENCE (Write-Behind to Prahari_Alerts) ---
+# Operator actions only touch memory. Every alert change marks the alert dirty
+# (one slot per alert_id, so DETECTED -> ACKNOWLEDGED -> RESOLVED inside one flush
+# interval becomes a single write of the final state). A flush loop ships dirty
+# alerts in TransactWriteItems chunks, each Put conditioned on the stored version
+# being older, so a slow / retried writer can never roll an alert back.
+#
+# Boot: a parallel Scan (TotalSegments workers) rebuilds the open alerts into
+# LATEST_ALERTS in the background; alerts raised meanwhile win over the table.
+
+ALERTS_TABLE = 'Prahari_Alerts'
+VERSION_CONDITION = "attribute_not_exists(alert_id) OR version < :v"
+INT_FIELDS = ('version', 'escalation_level')
+
+_serializer = TypeSerializer()
+
+def _to_dynamo(value):
+    """Alert dict -> DynamoDB-safe Python values (Decimal numbers, plain containers)."""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, BaseModel):
+        return _to_dynamo(value.model_dump())
+    if isinstance(value, dict):
+        return {k: _to_dynamo(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_dynamo(v) for v in value]
+    return value
+
+def _from_dynamo(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, dict):
+        return {k: _from_dynamo(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_from_dynamo(v) for v in value]
+    return value
+
+def alert_from_item(item: dict) -> tuple:
+    """Table item -> (store key, alert dict)."""
+    alert = _from_dynamo(item)
+    key = alert.pop('alert_key', f"{alert['device_id']}_{alert['type']}")
+    for field in INT_FIELDS:
+        if field in alert:
+            alert[field] = int(alert[field])
+    return key, alert
+
+class AlertWriteBehind:
+    def __init__(self, batch_size: int, segments: int):
+        self.batch_size = batch_size
+        self.segments = segments
+        self._dirty = OrderedDict() # alert_id -> (store key, alert dict)
+        self._client = None
+        self._healthy = True # Log only the first failure of an outage
+        self.stats = {
+            "pending": 0,
+            "written": 0,
+            "stale": 0,          # Table already held a newer version
+            "failed_batches": 0,
+            "last_flush_ms": 0.0,
+            "rehydrated": 0
+        }
+        SYSTEM_METRICS['alert_persistence'] = self.stats
+
+    # 1. Change capture (AlertStore listener, runs on the event loop)
+    def mark_dirty(self, key, alert: dict):
+        alert['version'] = alert.get('version', 0) + 1
+        self._dirty[alert['alert_id']] = (key, alert)
+        self._dirty.move_to_end(alert['alert_id'])
+        self.stats["pending"] = len(self._dirty)
+
+    def _take(self, limit: int) -> list:
+        """Pops up to `limit` dirty alerts, serialized now (on the loop) so the writer thread sees a consistent snapshot."""
+        batch = []
+        while self._dirty and len(batch) < limit:
+            alert_id, (key, alert) = self._dirty.popitem(last=False)
+            item = _to_dynamo(alert)
+            item['alert_key'] = key
+            batch.append((alert_id, alert['version'], key, alert, item))
+        self.stats["pending"] = len(self._dirty)
+        return batch
+
+    def _requeue(self, batch: list):
+        """Failed writes go back unless a newer change is already queued."""
+        for alert_id, _, key, alert, _ in batch:
+            if alert_id not in self._dirty:
+                self._dirty[alert_id] = (key, alert)
+                self._dirty.move_to_end(alert_id, last=False)
+        self.stats["pending"] = len(self._dirty)
+
+    # 2. Writes (blocking, off the event loop)
+    def _get_client(self):
+        if self._client is None:
+            self._client = get_db_resource().meta.client
+        return self._client
+
+    def _transact(self, batch: list):
+        """
+        Writes one chunk. Conditional failures mean the table is already newer and
+        are dropped; the rest of a cancelled transaction is retried once more here.
+        """
+        client = self._get_client()
+        request = [{
+            "Put": {
+                "TableName": ALERTS_TABLE,
+                "Item": {k: _serializer.serialize(v) for k, v in item.items()},
+                "ConditionExpression": VERSION_CONDITION,
+                "ExpressionAttributeValues": {":v": _serializer.serialize(version)}
+            }
+        } for _, version, _, _, item in batch]
+        try:
+            client.transact_write_items(TransactItems=request)
+            self.stats["written"] += len(batch)
+            return
+        except ClientError as e:
+            reasons = e.response.get("CancellationReasons")
+            if e.response.get("Error", {}).get("Code") != "TransactionCanceledException" or not reasons:
+                raise
+            retry = []
+            for entry, reason in zip(batch, reasons):
+                if reason.get("Code") == "ConditionalCheckFailed":
+                    self.stats["stale"] += 1
+                else:
+                    retry.append(entry)
+            if len(retry) == len(batch):
+                raise
+            if retry:
+                self._transact(retry)
+
+    async def flush(self) -> int:
+        """Ships everything dirty right now; returns the number of alerts written."""
+        started = time.perf_counter()
+        written_before = self.stats["written"]
+        while self._dirty:
+            batch = self._take(self.batch_size)
+            try:
+                await asyncio.to_thread(self._transact, batch)
+            except (BotoCoreError, ClientError) as e:
+                self.stats["failed_batches"] += 1
+                self._requeue(batch)
+                if self._healthy:
+                    print(f"ALERT_DB: Flush failed ({type(e).__name__}); keeping {len(self._dirty)} alerts pending")
+                self._healthy = False
+                break
+            if not self._healthy:
+                print("ALERT_DB: Table reachable again, draining pending alerts")
+                self._healthy = True
+        self.stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return self.stats["written"] - written_before
+
+    # 3. Boot rehydration
+    def _scan_segment(self, segment: int) -> list:
+        table = get_db_resource().Table(ALERTS_TABLE)
+        kwargs = {
+            "Segment": segment,
+            "TotalSegments": self.segments,
+            "FilterExpression": "#s <> :resolved",
+            "ExpressionAttributeNames": {"#s": "status"},
+            "ExpressionAttributeValues": {":resolved": "RESOLVED"}
+        }
+        items = []
+        while True:
+            response = table.scan(**kwargs)
+            items.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                return items
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def _scan_open_alerts(self) -> list:
+        with ThreadPoolExecutor(max_workers=self.segments) as pool:
+            return [item for part in pool.map(self._scan_segment, range(self.segments)) for item in part]
+
+    async def rehydrate(self) -> int:
+        """Loads open alerts from the table; live in-memory alerts are never overwritten by older rows."""
+        try:
+            items = await asyncio.to_thread(self._scan_open_alerts)
+        except (BotoCoreError, ClientError) as e:
+            print(f"ALERT_DB: Rehydrate skipped ({type(e).__name__}: {e})")
+            return 0
+
+        from app.services.event_log import EVENT_LOG
+        restored = 0
+        for item in items:
+            try:
+                key, alert = alert_from_item(item)
+            except (KeyError, TypeError):
+                continue
+            live = LATEST_ALERTS.get(key)
+            if live is not None and (live.get('alert_id') != alert.get('alert_id')
+                                     or live.get('version', 0) >= alert.get('version', 0)):
+                continue # A different (newer) alert owns the key, or the live copy is as recent
+            LATEST_ALERTS.restore(key, alert)
+            EVENT_LOG.seed_alert(alert) # restore() skips listeners; the next transition isn't a new trigger
+            restored += 1
+        self.stats["rehydrated"] = restored
+        print(f"ALERT_DB: Rehydrated {restored} open alerts ({self.segments} scan segments)")
+        return restored
+
+async def run_alert_persistence_loop():
+    """
+    Background Task: Flush dirty alerts every ALERT_FLUSH_SECONDS.
+    """
+    while True:
+        await asyncio.sleep(settings.ALERT_FLUSH_SECONDS)
+        try:
+            await ALERT_WRITER.flush()
+        except Exception as e:
+            print(f"ALERT_DB: Flush loop error: {e}")
+
+ALERT_WRITER = AlertWriteBehind(
+    batch_size=settings.ALERT_TRANSACT_BATCH,
+    segments=settings.ALERT_REHYDRATE_SEGMENTS
+)
+LATEST_ALERTS.listeners.append(ALERT_WRITER.mark_dirty)
@@ -0,0 +1,121 @@
+from collections.abc import MutableMapping
+
+# --- ALERT STORE (Primary + Secondary Indexes) ---
+# Drop-in replacement for the LATEST_ALERTS dict ({ "device_id_TYPE": alert_dict }).
+# Operator actions address alerts by alert_id and dashboards filter by device,
+# status and severity; during a cloudburst there can be tens of thousands of open
+# alerts, so each of those lookups is a dict hit instead of a scan over values().
+#
+# Indexed fields (alert_id, device_id, status, severity) must be changed through
+# set_fields() so the indexes follow; other fields can be mutated in place (call
+# touch() afterwards if the change should be persisted).
+#
+# Listeners (e.g. the write-behind in services/alert_persistence.py) are called as
+# listener(key, alert) after every insert / set_fields / touch / delete.
+
+INDEXED_FIELDS = ("alert_id", "device_id", "status", "severity")
+
+class AlertStore(MutableMapping):
+    def __init__(self):
+        self._alerts = {}       # key -> alert dict
+        self._by_id = {}        # alert_id -> key
+        self._by_device = {}    # device_id -> {key}
+        self._by_status = {}    # status -> {key}
+        self._by_severity = {}  # severity -> {key}
+        self.listeners = []
+
+    # 1. Mapping protocol (existing callers keep working)
+    def __getitem__(self, key):
+        return self._alerts[key]
+
+    def __setitem__(self, key, alert: dict):
+        if key in self._alerts:
+            self._unindex(key, self._alerts[key])
+        self._alerts[key] = alert
+        self._index(key, alert)
+        self._notify(key, alert)
+
+    def __delitem__(self, key):
+        alert = self._alerts.pop(key)
+        self._unindex(key, alert)
+        self._notify(key, alert)
+
+    def __iter__(self):
+        return iter(self._alerts)
+
+    def __len__(self):
+        return len(self._alerts)
+
+    def __contains__(self, key):
+        return key in self._alerts
+
+    # 2. Index maintenance
+    def _index(self, key, alert: dict):
+        self._by_id[alert['alert_id']] = key
+        self._by_device.setdefault(alert['device_id'], set()).add(key)
+        self._by_status.setdefault(alert['status'], set()).add(key)
+        self._by_severity.setdefault(alert['severity'], set()).add(key)
+
+    def _unindex(self, key, alert: dict):
+        if self._by_id.get(alert['alert_id']) == key:
+            del self._by_id[alert['alert_id']]
+        for index, value in ((self._by_device, alert['device_id']),
+                             (self._by_status, alert['status']),
+                             (self._by_severity, alert['severity'])):
+            keys = index.get(value)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[value]
+
+    def _notify(self, key, alert: dict):
+        for listener in self.listeners:
+            listener(key, alert)
+
+    def set_fields(self, key, **fields) -> dict:
+        """Updates an alert in place, re-indexing if an indexed field changed."""
+        alert = self._alerts[key]
+        if any(f in fields and fields[f] != alert.get(f) for f in INDEXED_FIELDS):
+            self._unindex(key, alert)
+            alert.update(fields)
+            self._index(key, alert)
+        else:
+            alert.update(fields)
+        self._notify(key, alert)
+        return alert
+
+    def touch(self, key) -> dict:
+        """Signals an in-place change to a non-indexed field (owner, attestors...)."""
+        alert = self._alerts[key]
+        self._notify(key, alert)
+        return alert
+
+    def restore(self, key, alert: dict):
+        """Inserts without notifying listeners (rehydrating from the table)."""
+        if key in self._alerts:
+            self._unindex(key, self._alerts[key])
+        self._alerts[key] = alert
+        self._index(key, alert)
+
+    # 3. Lookups
+    def key_for_id(self, alert_id: str):
+        return self._by_id.get(alert_id)
+
+    def get_by_id(self, alert_id: str):
+        key = self._by_id.get(alert_id)
+        return self._alerts[key] if key is not None else None
+
+    def for_device(self, device_id: str) -> list:
+        return [self._alerts[k] for k in self._by_device.get(device_id, ())]
+
+    def with_status(self, status: str) -> list:
+        return [self._alerts[k] for k in self._by_status.get(status, ())]
+
+    def with_severity(self, severity: str) -> list:
+        return [self._alerts[k] for k in self._by_severity.get(severity, ())]
+
+    def count_by_status(self) -> dict:
+        return {status: len(keys) for status, keys in self._by_status.items()}
+
+    def active_count(self) -> int:
+        return len(self._alerts) - len(self._by_status.get('RESOLVED', ()))
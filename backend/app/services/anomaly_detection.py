@@ -1,104 +1,18 @@
 from app.models import TelemetryData, AlertType
-from app.services.db import get_table
-from app.core.config import settings
-import boto3
-import time
-from decimal import Decimal
 
 def detect_anomalies(data: TelemetryData) -> list[AlertType]:
     """
     The Weighted Risk Engine (The "Brain")
-    Calculates a Risk Score (0-100) based on Spatial, Temporal, and Behavioral factors.
+    Scores the packet with the shared compiled rule set (app/core/risk_rules.json, the
+    same plan as SentinelAI.calculate_risk) on the DEVICE clock, then maps the result
+    through the rule file's "alerts" table (e.g. CRITICAL -> SOS_MANUAL).
     """
-    anomalies = []
-    
-    # 0. Base Score
-    risk_score = 0.0
-    
-    # --- 1. SPATIAL RISK (Geofencing) ---
-    # Weight: +50 for Critical Breach
-    from app.services.geofence import check_geofence_breach
-    zone = check_geofence_breach(data.location)
-    
-    spatial_risk = False
-    if zone:
-        if zone.risk_level == "HIGH":
-            risk_score += 50.0
-            spatial_risk = True
-        elif zone.risk_level == "MEDIUM":
-            risk_score += 25.0
-            
-    # --- 2. TEMPORAL RISK (Night-time Factor) ---
-    # Weight: +20 for Night Operations (18:00 - 05:00)
-    # Using device timestamp to be accurate
-    hour = time.localtime(data.timestamp).tm_hour
-    if hour >= 18 or hour < 5:
-        risk_score += 20.0
-        
-    # --- 3. BEHAVIORAL ANOMALY (Inactivity / Fall) ---
-    # Weight: +30 if Inactive for > 30 mins
-    # "if telemetry['speed'] == 0"
-    
-    behavior_risk = False
-    if data.speed < 0.5: # Allowing for GPS drift velocity
-        # Check History
-        table = get_table('Prahari_Telemetry')
-        try:
-            # Query last checkpoint
-            response = table.query(
-                KeyConditionExpression=boto3.dynamodb.conditions.Key('device_id').eq(data.device_id),
-                Limit=1,
-                ScanIndexForward=False 
-            )
-            items = response.get('Items', [])
-            if items:
-                last = items[0]
-                last_ts = float(last['timestamp'])
-                # logic: if last recorded speed was also ~0 and time diff is huge?
-                # or just check time since last *movement*?
-                # For demo, if current speed is 0 and we are stagnant...
-                # Let's use the DB history directly if possible, or simplifying:
-                # If the simulation sends "0" speed for many ticks, the 'time_diff' between current and 'last successful movement' is needed.
-                # However, this function is stateless. 
-                # We'll use the 'simple' check: If speed is 0 and we are in a Danger Zone, auto-escalate?
-                # User prompted: "inactivity_duration > 30".
-                # We will check if the *previous* point in DB was updated long ago? No that's signal loss.
-                # We need to know when we *started* stopping.
-                # Complex to do stateless. 
-                # SIMPLIFICATION: If speed is 0 and we are in High Risk, assume worst.
-                # OR: rely on the simulation 'T-FALL' scenarios which likely set valid flags.
-                # We'll stick to the user's pseudo-code logic:
-                # "inactivity_duration = calculate_inactivity(historical_data)"
-                # We will assume a match for now.
-                pass 
-                
-        except Exception:
-            pass
+    from app.engine import SentinelAI
+    from app.services.risk_rules import RISK_RULES
 
-    # For the specific T-FALL scenario in our simulation:
-    # The simulation sets speed=0. 
-    # To truly trigger this +30, we'll hack it slightly for the demo: 
-    # If speed < 0.1, we add the risk.
-    if data.speed < 0.1:
-        risk_score += 30.0
-
-    # --- 4. SOS OVERRIDE ---
-    if data.is_panic:
-        return [AlertType.SOS_MANUAL]
-
-    # Threshold evaluation
-    # User Logic: "return min(score, 100)"
-    final_score = min(risk_score, 100.0)
-    
-    # print(f"AI BRAIN: {data.device_id} | Score: {final_score}")
-
-    if final_score >= 80.0:
-        # High Risk -> Treat as SOS/Critical
-        if not data.is_panic: # Don't duplicate if SOS already handled
-             anomalies.append(AlertType.SOS_MANUAL) 
-    elif final_score >= 50.0:
-        # Warning Level -> Geofence Breach usually
-        if spatial_risk:
-             anomalies.append(AlertType.GEOFENCE_BREACH)
-             
-    return anomalies
+    report = SentinelAI.calculate_risk({
+        "location": {"lat": data.location.lat, "lng": data.location.lng},
+        "speed": data.speed,
+        "is_panic": data.is_panic
+    }, now=data.timestamp)
+    return RISK_RULES.current().alerts_for(report)
@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from app.core.config import settings
+from app.core.shared_state import SYSTEM_METRICS
+from app.services import identity
+from app.services.merkle import MerkleTree
+
+# --- AUDIT ANCHORING (Local Hash Chain + Batched Merkle Roots On-Chain) ---
+# Governance actions used to send one logIncidentAction transaction each, inside
+# the request handler. Now:
+#   1. append()  : the entry is hash-chained locally (same forensic chain as before)
+#                  and a PROVISIONAL receipt is returned at once.
+#   2. anchor()  : every AUDIT_ANCHOR_BATCH entries or AUDIT_ANCHOR_SECONDS, the
+#                  pending chain hashes become the leaves of one Merkle tree and its
+#                  root is committed in a single logIncidentAction transaction.
+#   3. receipts  : upgraded to CONFIRMED with the TXID, block and an inclusion proof,
+#                  so each entry stays independently verifiable against the root.
+# Gas and request latency scale with batches, not with audit events. A failed
+# anchor leaves its entries pending and is retried on the next cycle.
+
+PROVISIONAL = "PROVISIONAL"
+CONFIRMED = "CONFIRMED"
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+GENESIS_HASH = "00000000000000000000000000000000"
+
+class AuditAnchorQueue:
+    def __init__(self, batch_size: int, capacity: int):
+        self.batch_size = batch_size
+        self.capacity = capacity
+        self.last_hash = GENESIS_HASH
+        self.pending = []              # receipts awaiting a root, in chain order
+        self.receipts = OrderedDict()  # receipt_id -> receipt dict (LRU-capped)
+        self.batch_ready = asyncio.Event()
+        self._anchoring = False
+        self.stats = {
+            "appended": 0,
+            "pending": 0,
+            "batches_anchored": 0,
+            "entries_anchored": 0,
+            "anchor_failures": 0,
+            "last_root": None,
+            "last_txid": None
+        }
+        SYSTEM_METRICS['audit_anchor'] = self.stats
+
+    # 1. Append (request path: hashing only, no chain I/O)
+    def append(self, admin_id: str, tourist_did: str, action: str, doc_hash: str) -> dict:
+        timestamp = time.time()
+        current_entry = f"{admin_id}:{tourist_did}:{action}:{doc_hash}:{timestamp}"
+
+        # New Hash = SHA256(Previous Hash + Current Content)
+        chain_hash = hashlib.sha256(f"{self.last_hash}{current_entry}".encode()).hexdigest()
+        print(f"FORENSIC_LOG: Chained Entry {chain_hash[:10]}... <-- Parent {self.last_hash[:10]}...")
+
+        receipt = {
+            "receipt_id": f"rcpt-{chain_hash[:16]}",
+            "status": PROVISIONAL,
+            "chain_hash": chain_hash,
+            "parent_hash": self.last_hash,
+            "admin_id": admin_id,
+            "tourist_did": tourist_did,
+            "action": action,
+            "doc_hash": doc_hash,
+            "timestamp": timestamp,
+            "merkle_root": None,
+            "merkle_proof": None,
+            "txid": None,
+            "block_number": None
+        }
+        self.last_hash = chain_hash
+        self.receipts[receipt["receipt_id"]] = receipt
+        while len(self.receipts) > self.capacity:
+            self.receipts.popitem(last=False)
+        self.pending.append(receipt)
+        self.stats["appended"] += 1
+        self.stats["pending"] = len(self.pending)
+        if len(self.pending) >= self.batch_size:
+            self.batch_ready.set()
+        return receipt
+
+    def get(self, receipt_id: str):
+        return self.receipts.get(receipt_id)
+
+    # 2. Anchor (one transaction per batch, off the event loop)
+    def _commit_root(self, root: str, count: int, tip_hash: str) -> tuple:
+        """Blocking: sends the root, waits for the receipt. Returns (txid, block).
+        tip_hash: chain hash of the batch's last entry (captured when the batch was cut)."""
+        if not identity.contract or not identity.w3:
+            return f"0xMOCK_TXID_CHAIN_{root[:8]}", None
+        authority_acc = identity.w3.eth.accounts[0]
+        tx_hash = identity.contract.functions.logIncidentAction(
+            ZERO_ADDRESS,
+            f"MERKLE_BATCH n={count} TIP:{tip_hash[:8]}",
+            root
+        ).transact({'from': authority_acc})
+        tx_receipt = identity.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=settings.AUDIT_CONFIRM_TIMEOUT_SECONDS)
+        return identity.w3.to_hex(tx_hash), tx_receipt["blockNumber"]
+
+    async def anchor(self) -> int:
+        """Commits the pending entries as one Merkle root; returns the number anchored."""
+        if self._anchoring or not self.pending:
+            return 0
+        self._anchoring = True
+        batch = self.pending[:self.batch_size]
+        try:
+            tree = MerkleTree()
+            for receipt in batch:
+                tree.add_leaf(receipt["chain_hash"])
+            root = tree.build()
+            try:
+                txid, block_number = await asyncio.to_thread(self._commit_root, root, len(batch),
+                                                               batch[-1]["chain_hash"])
+            except Exception as e:
+                self.stats["anchor_failures"] += 1
+                self.batch_ready.clear() # Retry on the next timer tick, not in a tight loop
+                print(f"AUDIT_ANCHOR: Commit failed ({type(e).__name__}: {e}); {len(self.pending)} entries stay provisional")
+                return 0
+
+            del self.pending[:len(batch)]
+            for index, receipt in enumerate(batch):
+                receipt.update({
+                    "status": CONFIRMED,
+                    "merkle_root": root,
+                    "merkle_proof": tree.proof(index),
+                    "txid": txid,
+                    "block_number": block_number
+                })
+            self.stats["batches_anchored"] += 1
+            self.stats["entries_anchored"] += len(batch)
+            self.stats["last_root"] = root
+            self.stats["last_txid"] = txid
+            print(f"BLOCKCHAIN ANCHOR: {len(batch)} audit entries -> Root {root[:10]}... | TXID: {txid}")
+            return len(batch)
+        finally:
+            self.stats["pending"] = len(self.pending)
+            if len(self.pending) < self.batch_size:
+                self.batch_ready.clear()
+            self._anchoring = False
+
+    async def flush(self) -> int:
+        """Anchors everything pending (shutdown)."""
+        total = 0
+        while self.pending:
+            anchored = await self.anchor()
+            if not anchored:
+                break
+            total += anchored
+        return total
+
+async def run_audit_anchor_loop():
+    """
+    Background Task: Anchor a batch when AUDIT_ANCHOR_BATCH entries are pending,
+    or every AUDIT_ANCHOR_SECONDS, whichever comes first.
+    """
+    while True:
+        try:
+            await asyncio.wait_for(AUDIT_ANCHOR.batch_ready.wait(), settings.AUDIT_ANCHOR_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        try:
+            await AUDIT_ANCHOR.anchor()
+        except Exception as e:
+            print(f"AUDIT_ANCHOR: Loop error: {e}")
+
+AUDIT_ANCHOR = AuditAnchorQueue(
+    batch_size=settings.AUDIT_ANCHOR_BATCH,
+    capacity=settings.AUDIT_RECEIPT_CAPACITY
+)
@@ -1,13 +1,112 @@
 import math
+from collections import deque
 from app.models import TelemetryData
 from app.core.shared_state import BIOMETRIC_HISTORY
 
 HISTORY_LEN = 10
+MIN_SAMPLES = 5
+RESYNC_EVERY = 1024 # Recompute sums from the window to cancel floating-point drift
 
-def calculate_variance(data):
-    if len(data) < 2: return 0.0
-    mean = sum(data) / len(data)
-    return sum((x - mean) ** 2 for x in data) / len(data)
+class RollingStats:
+    """
+    Sliding window over (speed, heading) with O(1) add/remove:
+    - speed mean/variance: Welford update and its inverse
+    - heading: circular mean/variance from running sin/cos sums (359 deg ~ 1 deg)
+    - max speed: monotonic deque
+    """
+    __slots__ = ("size", "window", "last_ts", "n", "speed_mean", "speed_m2",
+                 "sin_sum", "cos_sum", "max_q", "seq", "updates")
+
+    def __init__(self, size: int = HISTORY_LEN):
+        self.size = size
+        self.window = deque() # (seq, speed, heading_rad)
+        self.last_ts = None
+        self.n = 0
+        self.speed_mean = 0.0
+        self.speed_m2 = 0.0
+        self.sin_sum = 0.0
+        self.cos_sum = 0.0
+        self.max_q = deque()  # (seq, speed), speeds strictly decreasing
+        self.seq = 0
+        self.updates = 0
+
+    def __len__(self):
+        return self.n
+
+    def add(self, timestamp: float, speed: float, heading: float) -> bool:
+        """Returns False (and ignores the sample) if it is not newer than the last one."""
+        if self.last_ts is not None and timestamp <= self.last_ts:
+            return False
+        self.last_ts = timestamp
+
+        if self.n == self.size:
+            self._evict()
+
+        rad = math.radians(heading)
+        self.seq += 1
+        self.window.append((self.seq, speed, rad))
+
+        self.n += 1
+        delta = speed - self.speed_mean
+        self.speed_mean += delta / self.n
+        self.speed_m2 += delta * (speed - self.speed_mean)
+
+        self.sin_sum += math.sin(rad)
+        self.cos_sum += math.cos(rad)
+
+        while self.max_q and self.max_q[-1][1] <= speed:
+            self.max_q.pop()
+        self.max_q.append((self.seq, speed))
+
+        self.updates += 1
+        if self.updates % RESYNC_EVERY == 0:
+            self._resync()
+        return True
+
+    def _evict(self):
+        seq, speed, rad = self.window.popleft()
+        if self.max_q[0][0] == seq:
+            self.max_q.popleft()
+
+        self.n -= 1
+        if self.n == 0:
+            self.speed_mean = self.speed_m2 = self.sin_sum = self.cos_sum = 0.0
+            return
+        old_mean = self.speed_mean
+        self.speed_mean = (old_mean * (self.n + 1) - speed) / self.n
+        self.speed_m2 = max(0.0, self.speed_m2 - (speed - old_mean) * (speed - self.speed_mean))
+        self.sin_sum -= math.sin(rad)
+        self.cos_sum -= math.cos(rad)
+
+    def _resync(self):
+        speeds = [s for _, s, _ in self.window]
+        self.speed_mean = sum(speeds) / self.n
+        self.speed_m2 = sum((s - self.speed_mean) ** 2 for s in speeds)
+        self.sin_sum = sum(math.sin(r) for _, _, r in self.window)
+        self.cos_sum = sum(math.cos(r) for _, _, r in self.window)
+
+    @property
+    def speed_variance(self) -> float:
+        return self.speed_m2 / self.n if self.n >= 2 else 0.0
+
+    @property
+    def max_speed(self) -> float:
+        return self.max_q[0][1] if self.max_q else 0.0
+
+    @property
+    def heading_variance(self) -> float:
+        """
+        Circular variance expressed in deg^2 (square of the circular standard
+        deviation), so it is comparable to a linear variance for small spreads.
+        """
+        if self.n < 2:
+            return 0.0
+        r = math.hypot(self.sin_sum, self.cos_sum) / self.n
+        if r >= 1.0:
+            return 0.0
+        if r <= 0.0:
+            return math.inf
+        return math.degrees(math.sqrt(-2.0 * math.log(r))) ** 2
 
 def analyze_humanity(data: TelemetryData) -> float:
     """
@@ -15,26 +114,20 @@ def analyze_humanity(data: TelemetryData) -> float:
     Real humans have 'entropy' (jitter).
     Bots move in straight lines or constant speeds.
     """
-    history = BIOMETRIC_HISTORY[data.device_id]
-    
+    stats = BIOMETRIC_HISTORY.get(data.device_id)
+    if stats is None:
+        stats = BIOMETRIC_HISTORY[data.device_id] = RollingStats()
+
     # Only append if timestamp is newer (deduplication already done upstream, but safe to check)
-    if not history or data.timestamp > history[-1].timestamp:
-        history.append(data)
-        
-    if len(history) > HISTORY_LEN:
-        history.pop(0)
+    stats.add(data.timestamp, data.speed, data.heading)
 
-    if len(history) < 5:
+    if len(stats) < MIN_SAMPLES:
         return 100.0
 
-    # Extract metrics
-    speeds = [p.speed for p in history]
-    headings = [p.heading for p in history]
-    
     # Variance Analysis
-    speed_var = calculate_variance(speeds)
-    heading_var = calculate_variance(headings)
-    avg_speed = sum(speeds) / len(speeds)
+    speed_var = stats.speed_variance
+    heading_var = stats.heading_variance
+    avg_speed = stats.speed_mean
     
     score = 100.0
     
@@ -50,7 +143,7 @@ def analyze_humanity(data: TelemetryData) -> float:
         score -= 30.0
         
     # Rule 3: Superhuman Speed (e.g., > 30 m/s ~ 100 km/h on foot/trail)
-    if max(speeds) > 30.0:
+    if stats.max_speed > 30.0:
         score -= 90.0
         print(f"BIOMETRICS: {data.device_id} flagged for Impossible Speed")
         
@@ -0,0 +1,257 @@
+import asyncio
+import math
+import time
+import numpy as np
+from app.core.config import settings
+from app.core.shared_state import SYSTEM_METRICS
+from app.services.fleet_history import FLEET_HISTORY
+
+# --- FLEET BOT SCAN (Batch Turing Test) ---
+# analyze_humanity() judges one device on its last 10 packets. This job scores
+# the whole fleet at once on longer windows: every feature is a vectorized op
+# over an (n_devices, window) matrix, so one pass costs a few NumPy calls.
+# It also looks ACROSS devices: a spoofing rig replaying one track on many
+# devices shows up as near-identical trajectory shapes, found with SimHash LSH.
+
+M_PER_DEG = 111_320.0
+MOVING_SPEED = 0.5       # m/s; below this the rules do not apply
+TURN_BINS = 12           # 30 deg bins for the turn-angle histogram
+MIN_JITTER_M = 0.05      # Consumer GPS never holds a line to 5 cm
+MIN_HF_FRACTION = 0.05   # Share of residual energy above half the window's Nyquist band
+MIN_PATH_M = 5.0         # Shorter tracks carry no trajectory shape
+SIMILARITY = 0.995       # Cosine similarity of displacement sequences
+NORM_TOLERANCE = 0.05    # ... and path lengths within 5%
+FLAG_THRESHOLD = 50.0
+LSH_SEED = 7
+MAX_LEADER_ROUNDS = 8    # Bounds the retry passes inside one LSH band
+
+# (reason, penalty) in the order they are reported
+RULES = (
+    ("ROBOTIC_SPEED", 30.0),
+    ("LOCKED_HEADING", 20.0),
+    ("ZERO_JERK", 15.0),
+    ("LOW_TURN_ENTROPY", 15.0),
+    ("NO_GPS_JITTER", 20.0),
+    ("SMOOTH_JITTER_SPECTRUM", 10.0),
+    ("COORDINATED_TRAJECTORY", 60.0),
+)
+
+LATEST_BOT_SCAN = {}
+
+def _local_meters(lat: np.ndarray, lng: np.ndarray) -> tuple:
+    """North/east offsets (m) from each device's first fix."""
+    north = (lat - lat[:, :1]) * M_PER_DEG
+    east = (lng - lng[:, :1]) * (M_PER_DEG * np.cos(np.radians(lat[:, :1])))
+    return north, east
+
+def _detrend(t: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Residual after a per-row least-squares line (removes constant velocity)."""
+    t_c = t - t.mean(axis=1, keepdims=True)
+    x_c = x - x.mean(axis=1, keepdims=True)
+    var_t = (t_c * t_c).sum(axis=1, keepdims=True)
+    slope = np.divide((t_c * x_c).sum(axis=1, keepdims=True), var_t, out=np.zeros_like(var_t), where=var_t > 0)
+    return x_c - slope * t_c
+
+def extract_features(columns: dict) -> dict:
+    """
+    Entropy features for every row of the (n, window) columns.
+    """
+    ts, lat, lng = columns["timestamp"], columns["lat"], columns["lng"]
+    speed, heading = columns["speed"], columns["heading"]
+    n = len(ts)
+
+    dt = np.maximum(np.diff(ts, axis=1), 1e-3)
+    accel = np.diff(speed, axis=1) / dt
+    jerk = np.diff(accel, axis=1) / dt[:, 1:]
+
+    rad = np.radians(heading)
+    resultant = np.hypot(np.sin(rad).mean(axis=1), np.cos(rad).mean(axis=1))
+
+    # Turn-angle distribution: normalized Shannon entropy of wrapped heading deltas
+    turn = (np.diff(heading, axis=1) + 180.0) % 360.0 - 180.0
+    bins = np.minimum(((turn + 180.0) * (TURN_BINS / 360.0)).astype(np.intp), TURN_BINS - 1)
+    counts = np.bincount((np.arange(n)[:, None] * TURN_BINS + bins).ravel(),
+                         minlength=n * TURN_BINS).reshape(n, TURN_BINS)
+    p = counts / counts.sum(axis=1, keepdims=True)
+    logp = np.log(p, out=np.zeros_like(p), where=p > 0)
+    turn_entropy = -(p * logp).sum(axis=1) / math.log(TURN_BINS)
+
+    # GPS jitter: position residual after a constant-velocity fit, and its spectrum
+    north, east = _local_meters(lat, lng)
+    t = ts - ts[:, :1]
+    res_n, res_e = _detrend(t, north), _detrend(t, east)
+    jitter_rms = np.sqrt((res_n ** 2 + res_e ** 2).mean(axis=1))
+    power = np.abs(np.fft.rfft(res_n, axis=1)) ** 2 + np.abs(np.fft.rfft(res_e, axis=1)) ** 2
+    power = power[:, 1:] # Drop DC
+    half = power.shape[1] // 2
+    total = power.sum(axis=1)
+    hf_fraction = np.divide(power[:, half:].sum(axis=1), total, out=np.zeros(n), where=total > 0)
+
+    return {
+        "mean_speed": speed.mean(axis=1),
+        "speed_var": speed.var(axis=1),
+        "heading_circ_var": 1.0 - resultant,
+        "jerk_std": jerk.std(axis=1),
+        "turn_entropy": turn_entropy,
+        "jitter_rms_m": jitter_rms,
+        "jitter_hf_fraction": hf_fraction,
+    }
+
+def trajectory_signatures(columns: dict) -> tuple:
+    """
+    Per-step displacement sequence (m) as one vector per device, plus its norm.
+    Position-independent, so a track replayed from a different start still matches.
+    """
+    north, east = _local_meters(columns["lat"], columns["lng"])
+    vectors = np.concatenate([np.diff(north, axis=1), np.diff(east, axis=1)], axis=1)
+    return vectors, np.linalg.norm(vectors, axis=1)
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return root
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[rb] = ra
+
+def find_coordinated_clusters(vectors: np.ndarray, norms: np.ndarray, bands: int, bits: int, min_size: int) -> list:
+    """
+    SimHash LSH: random hyperplanes -> `bands` keys of `bits` bits per device.
+    Devices sharing a band key are candidates; each is confirmed against its
+    bucket's leader (cosine + path length) in one vectorized pass per band, and
+    unconfirmed members retry among themselves. Returns clusters as lists of row
+    indices, largest first.
+    """
+    candidates = np.flatnonzero(norms >= MIN_PATH_M)
+    if len(candidates) < min_size:
+        return []
+
+    unit = vectors[candidates] / norms[candidates, None]
+    lengths = norms[candidates]
+    planes = np.random.default_rng(LSH_SEED).standard_normal((unit.shape[1], bands * bits))
+    signs = (unit @ planes > 0).reshape(len(candidates), bands, bits)
+    keys = (signs.astype(np.int64) << np.arange(bits, dtype=np.int64)).sum(axis=2)
+    # Same shape at a different pace is a different track: fold a path-length bucket
+    # into every key (offset by half a bucket on odd bands so near-edge pairs still meet)
+    log_len = np.log(lengths) / math.log(1.0 + 2 * NORM_TOLERANCE)
+    for b in range(bands):
+        keys[:, b] = (keys[:, b] << 12) | (np.floor(log_len + 0.5 * (b % 2)).astype(np.int64) & 0xFFF)
+
+    uf = _UnionFind(len(candidates))
+    touched = set()
+    for b in range(bands):
+        band_keys = keys[:, b]
+        pending = np.arange(len(candidates))
+        for _ in range(MAX_LEADER_ROUNDS):
+            if len(pending) < 2:
+                break
+            order = pending[np.argsort(band_keys[pending], kind="stable")]
+            sorted_keys = band_keys[order]
+            is_leader = np.empty(len(order), dtype=bool)
+            is_leader[0] = True
+            is_leader[1:] = sorted_keys[1:] != sorted_keys[:-1]
+            if is_leader.all():
+                break
+            leaders = order[is_leader][np.cumsum(is_leader) - 1][~is_leader]
+            followers = order[~is_leader]
+            match = ((np.einsum("ij,ij->i", unit[followers], unit[leaders]) >= SIMILARITY)
+                     & (np.abs(lengths[followers] / lengths[leaders] - 1.0) <= NORM_TOLERANCE))
+            for leader, follower in zip(leaders[match].tolist(), followers[match].tolist()):
+                uf.union(leader, follower)
+                touched.add(leader)
+                touched.add(follower)
+            pending = followers[~match]
+
+    groups = {}
+    for i in touched:
+        groups.setdefault(uf.find(i), []).append(int(candidates[i]))
+    clusters = [sorted(g) for g in groups.values() if len(g) >= min_size]
+    clusters.sort(key=lambda g: (-len(g), g[0]))
+    return clusters
+
+def score_fleet(device_ids: list, columns: dict) -> dict:
+    """
+    Scores every device in one pass. Returns the scan report.
+    """
+    started = time.perf_counter()
+    n = len(device_ids)
+    features = extract_features(columns)
+    vectors, norms = trajectory_signatures(columns)
+    clusters = find_coordinated_clusters(vectors, norms, settings.BOT_LSH_BANDS,
+                                         settings.BOT_LSH_BITS_PER_BAND, settings.BOT_CLUSTER_MIN_SIZE)
+
+    in_cluster = np.zeros(n, dtype=bool)
+    for members in clusters:
+        in_cluster[members] = True
+
+    moving = features["mean_speed"] > MOVING_SPEED
+    hits = {
+        "ROBOTIC_SPEED": moving & (features["speed_var"] < 0.01),
+        "LOCKED_HEADING": moving & (features["heading_circ_var"] < 1e-4),
+        "ZERO_JERK": moving & (features["jerk_std"] < 1e-3),
+        "LOW_TURN_ENTROPY": moving & (features["turn_entropy"] < 0.2),
+        "NO_GPS_JITTER": features["jitter_rms_m"] < MIN_JITTER_M,
+        "SMOOTH_JITTER_SPECTRUM": moving & (features["jitter_hf_fraction"] < MIN_HF_FRACTION),
+        "COORDINATED_TRAJECTORY": in_cluster,
+    }
+    scores = np.full(n, 100.0)
+    for reason, penalty in RULES:
+        scores -= penalty * hits[reason]
+    scores = np.maximum(scores, 0.0)
+
+    flagged = []
+    for i in np.flatnonzero(scores < FLAG_THRESHOLD):
+        flagged.append({
+            "device_id": device_ids[i],
+            "score": round(float(scores[i]), 1),
+            "reasons": [reason for reason, _ in RULES if hits[reason][i]],
+            "features": {name: round(float(values[i]), 6) for name, values in features.items()}
+        })
+    flagged.sort(key=lambda f: f["score"])
+
+    return {
+        "generated_at": time.time(),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        "window": int(columns["timestamp"].shape[1]) if n else settings.BOT_SCAN_WINDOW,
+        "devices_scored": n,
+        "devices_flagged": len(flagged),
+        "flagged": flagged,
+        "clusters": [
+            {"cluster_id": f"TRAJ_{k:03d}", "size": len(members), "device_ids": [device_ids[i] for i in members]}
+            for k, members in enumerate(clusters)
+        ]
+    }
+
+async def run_fleet_bot_scan():
+    """One scan: gather on the loop (consistent snapshot), score in a worker thread."""
+    device_ids, columns = FLEET_HISTORY.full_windows()
+    report = await asyncio.to_thread(score_fleet, device_ids, columns)
+    LATEST_BOT_SCAN.clear()
+    LATEST_BOT_SCAN.update(report)
+    SYSTEM_METRICS['bot_scan'] = {k: report[k] for k in ("generated_at", "duration_ms", "devices_scored", "devices_flagged")}
+    SYSTEM_METRICS['bot_scan']['clusters'] = len(report["clusters"])
+    return report
+
+async def run_fleet_bot_scan_loop():
+    """
+    Background Task: Periodic fleet-wide bot scan.
+    """
+    print(f"BOTSCAN: Fleet scan every {settings.BOT_SCAN_INTERVAL_SECONDS:.0f}s over {settings.BOT_SCAN_WINDOW}-fix windows")
+    while True:
+        await asyncio.sleep(settings.BOT_SCAN_INTERVAL_SECONDS)
+        try:
+            report = await run_fleet_bot_scan()
+            if report["devices_flagged"] or report["clusters"]:
+                print(f"BOTSCAN: {report['devices_flagged']}/{report['devices_scored']} devices flagged, "
+                      f"{len(report['clusters'])} coordinated clusters ({report['duration_ms']} ms)")
+        except Exception as e:
+            print(f"BOTSCAN: Scan failed: {e}")
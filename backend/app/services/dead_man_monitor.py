@@ -19,7 +19,7 @@ from app.models import Alert, AlertType, GeoPoint
 from app.services.geofence import check_geofence_breach
 from app.services.websocket import notify_alert
 from app.core.config import settings
-from app.services.identity import get_permit_info
+from app.services.permits import PERMITS
 
 # --- STEP 2: CLOUD-SIDE DEAD MAN'S LOGIC ---
 
@@ -33,31 +33,22 @@ async def trigger_dead_man_alert(device_id, zone_name, elapsed_time, device_data
     print(f"DEAD MAN TRIGGER: {device_id} lost for {elapsed_time:.1f}s in {zone_name}")
     
     did = device_data.get('did', 'unknown')
-    permit_str = get_permit_info(did)
+    permit_str = await PERMITS.get(did)
     
-    alert = Alert(
-        alert_id=str(uuid.uuid4()),
-        device_id=device_id,
-        did=did,
-        type=AlertType.INACTIVITY, 
-        severity="CRITICAL",
-        timestamp=time.time(),
-        location=GeoPoint(**device_data['location']),
-        message=f"Alert: DID {did} has gone silent in restricted zone: {zone_name}. {permit_str} Last signal {int(elapsed_time/60)} min ago."
+    # Stateful upsert: the alert store's write-behind persists it to Prahari_Alerts
+    from app.routers.telemetry import upsert_alert
+    alert, is_new = upsert_alert(
+        device_id,
+        AlertType.INACTIVITY,
+        "CRITICAL",
+        f"Alert: DID {did} has gone silent in restricted zone: {zone_name}. {permit_str} Last signal {int(elapsed_time/60)} min ago.",
+        device_data['location']
     )
-    
-    # 1. Notify Frontend (Socket)
-    await notify_alert(alert.model_dump())
-    
-    # 2. Persist to DB
-    try:
-        a_table = get_table('Prahari_Alerts')
-        a_item = alert.model_dump()
-        a_item['location'] = {k: Decimal(str(v)) for k, v in a_item['location'].items()}
-        a_item['timestamp'] = Decimal(str(a_item['timestamp']))
-        a_table.put_item(Item=a_item)
-    except Exception as e:
-        print(f"Failed to persist Dead Man Alert: {e}")
+    alert['did'] = did
+
+    # Notify Frontend (Socket) once per incident / escalation
+    if is_new:
+        await notify_alert(alert)
 
 async def dead_mans_switch_check(device_data):
     """
@@ -0,0 +1,85 @@
+import asyncio
+import zipfile
+from app.core.config import settings
+from app.core.shared_state import INCIDENT_CLUSTERS, LATEST_POSITIONS
+from app.services.alert_aggregator import zone_of
+from app.services.efir_renderer import EFIR_RENDERER, RendererBusy
+
+# --- BULK E-FIR EXPORT (Zone / Incident Cluster -> Streaming ZIP) ---
+# After an avalanche, commanders need a report for every device in the zone.
+#   1. Scope   : an incident cluster (its member devices) or a zone id (every
+#                tracked device whose last fix maps to it, as in alert clustering).
+#   2. Render  : all PDFs go through the shared E-FIR process pool, at most
+#                EFIR_EXPORT_CONCURRENCY at a time so single-device requests still
+#                get workers; each PDF is written to the ZIP as soon as it finishes.
+#   3. Seal    : the caller pins the whole set and logs one audit entry per export
+#                (not per document); the manifest is the ZIP's last entry.
+# PDFs are already compressed, so entries are STORED.
+
+class ZipStream:
+    """zipfile over a write-only buffer: each drain() returns the bytes produced since the last one."""
+    def __init__(self):
+        self._chunks = []
+        self.zip = zipfile.ZipFile(self, mode="w", compression=zipfile.ZIP_STORED)
+
+    # File protocol used by zipfile (non-seekable: entries get data descriptors)
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def add(self, name: str, content: bytes) -> bytes:
+        self.zip.writestr(name, content)
+        return self.drain()
+
+    def close(self) -> bytes:
+        self.zip.close()
+        return self.drain()
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+def devices_for_scope(zone_id: str = None, cluster_id: str = None) -> list:
+    """Tracked devices in an incident cluster or zone (None if the cluster is unknown)."""
+    if cluster_id:
+        cluster = INCIDENT_CLUSTERS.get(cluster_id)
+        if cluster is None:
+            return None
+        return sorted(d for d in cluster["devices"] if d in LATEST_POSITIONS)
+    return sorted(
+        device_id for device_id, state in list(LATEST_POSITIONS.items())
+        if zone_of(state['location']['lat'], state['location']['lng']) == zone_id
+    )
+
+async def _render_when_free(incident_data: dict) -> bytes:
+    """Bulk renders wait for room in the pool queue instead of failing."""
+    while True:
+        try:
+            return await EFIR_RENDERER.render(incident_data)
+        except RendererBusy:
+            await asyncio.sleep(settings.EFIR_EXPORT_RETRY_SECONDS)
+
+async def render_many(incidents: dict):
+    """
+    incidents: {device_id: incident_data}. Yields (device_id, pdf bytes or
+    exception) in completion order.
+    """
+    gate = asyncio.Semaphore(settings.EFIR_EXPORT_CONCURRENCY)
+
+    async def render_one(device_id: str, incident_data: dict):
+        async with gate:
+            try:
+                return device_id, await _render_when_free(incident_data)
+            except Exception as e:
+                return device_id, e
+
+    tasks = [asyncio.create_task(render_one(d, i)) for d, i in incidents.items()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel() # Client went away mid-export
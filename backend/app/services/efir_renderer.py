@@ -0,0 +1,167 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from app.core.config import settings
+from app.core.shared_state import SYSTEM_METRICS
+
+# --- E-FIR RENDERER (Process Pool + Content-Hash Cache + Async Jobs) ---
+# ReportLab layout and QR rendering are pure CPU. Running them in an async handler
+# (or a thread, under the GIL) stalls ingestion for every connected device. Here:
+#   1. Pool    : renders run in EFIR_WORKERS processes; each worker imports
+#                app.reports once, so compiled styles and fonts stay warm.
+#   2. Bound   : at most EFIR_MAX_PENDING renders queued or running; more -> 503.
+#   3. Cache   : PDFs keyed by the SHA-256 of the canonical incident JSON, so a
+#                re-request for an unchanged incident is a dict hit; identical
+#                renders already in flight share one future.
+#   4. Jobs    : submit() returns a job id at once (request report -> poll ->
+#                download) for big incidents and bulk requests.
+
+QUEUED = "QUEUED"
+RUNNING = "RUNNING"
+DONE = "DONE"
+FAILED = "FAILED"
+
+class RendererBusy(Exception):
+    pass
+
+def content_hash(incident_data: dict) -> str:
+    canonical = json.dumps(incident_data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def _warm_worker():
+    import app.reports # noqa: F401 (styles compiled at import)
+
+class EfirRenderer:
+    def __init__(self, workers: int, max_pending: int, cache_size: int, job_ttl: float):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.cache_size = cache_size
+        self.job_ttl = job_ttl
+        self.cache = OrderedDict() # content hash -> pdf bytes (LRU)
+        self.jobs = {}             # job_id -> job dict
+        self.results = {}          # job_id -> pdf bytes (kept for EFIR_JOB_TTL_SECONDS)
+        self._inflight = {}        # content hash -> asyncio.Future
+        self._pool = None
+        self.stats = {
+            "rendered": 0,
+            "cache_hits": 0,
+            "coalesced": 0,
+            "rejected": 0,
+            "pending": 0,
+            "last_render_ms": 0.0
+        }
+        SYSTEM_METRICS['efir_renderer'] = self.stats
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: workers must not inherit the event loop / socket threads
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_warm_worker)
+        return self._pool
+
+    def _remember(self, key: str, pdf: bytes):
+        self.cache[key] = pdf
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    # 1. Rendering
+    async def render(self, incident_data: dict) -> bytes:
+        """PDF bytes for the incident; raises RendererBusy when the queue is full."""
+        key = content_hash(incident_data)
+        pdf = self.cache.get(key)
+        if pdf is not None:
+            self.cache.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return pdf
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(future)
+        if len(self._inflight) >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise RendererBusy(f"{len(self._inflight)} E-FIR renders pending")
+
+        from app.reports import render_efir_pdf
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._get_pool(), render_efir_pdf, incident_data)
+        self._inflight[key] = future
+        self.stats["pending"] = len(self._inflight)
+        # Bookkeeping lives on the future, not in this coroutine: a cancelled
+        # caller leaves the render counted as pending until it really ends,
+        # and its PDF still lands in the cache
+        future.add_done_callback(lambda f, started=time.perf_counter(): self._finish(key, f, started))
+        return await asyncio.shield(future)
+
+    def _finish(self, key: str, future: asyncio.Future, started: float):
+        self._inflight.pop(key, None)
+        self.stats["pending"] = len(self._inflight)
+        if future.cancelled() or future.exception() is not None:
+            return
+        self.stats["rendered"] += 1
+        self.stats["last_render_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        self._remember(key, future.result())
+
+    # 2. Async jobs
+    def submit(self, incident_data: dict, on_done=None) -> dict:
+        """
+        Queues a render and returns the job immediately. await on_done(job, pdf) runs
+        on the loop after a successful render (IPFS pinning, audit log...).
+        """
+        self.evict_expired()
+        if len(self._inflight) >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise RendererBusy(f"{len(self._inflight)} E-FIR renders pending")
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": QUEUED,
+            "content_hash": content_hash(incident_data),
+            "created": time.time(),
+            "finished": None,
+            "size_bytes": None,
+            "error": None
+        }
+        self.jobs[job["job_id"]] = job
+        asyncio.create_task(self._run_job(job, incident_data, on_done))
+        return job
+
+    async def _run_job(self, job: dict, incident_data: dict, on_done):
+        job["status"] = RUNNING
+        try:
+            pdf = await self.render(incident_data)
+            if on_done is not None:
+                await on_done(job, pdf)
+        except Exception as e:
+            job.update(status=FAILED, error=f"{type(e).__name__}: {e}", finished=time.time())
+            print(f"EFIR: Job {job['job_id'][:8]} failed: {job['error']}")
+            return
+        self.results[job["job_id"]] = pdf
+        job.update(status=DONE, size_bytes=len(pdf), finished=time.time())
+
+    def result(self, job_id: str):
+        """PDF bytes of a finished job (None if unknown, expired or not done)."""
+        return self.results.get(job_id)
+
+    def evict_expired(self):
+        cutoff = time.time() - self.job_ttl
+        for job_id in [j for j, v in self.jobs.items() if v["finished"] and v["finished"] < cutoff]:
+            del self.jobs[job_id]
+            self.results.pop(job_id, None)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+EFIR_RENDERER = EfirRenderer(
+    workers=settings.EFIR_WORKERS,
+    max_pending=settings.EFIR_MAX_PENDING,
+    cache_size=settings.EFIR_CACHE_SIZE,
+    job_ttl=settings.EFIR_JOB_TTL_SECONDS
+)
@@ -0,0 +1,186 @@
+import bisect
+import time
+from app.core.config import settings
+from app.core.shared_state import LATEST_ALERTS, SYSTEM_METRICS
+
+# --- DEVICE EVENT LOG (Append-Only, Indexed by Device + Time) ---
+# Source of truth for the E-FIR legal timeline. Events are recorded as they
+# happen instead of being reconstructed at report time:
+#   ZONE_ENTRY / ZONE_EXIT        : geofence result changes between fixes
+#   PERMIT_VERIFIED               : permit status seen for the device (on change)
+#   SIGNAL_LOST / SIGNAL_RESTORED : gap > EVENT_LOG_SIGNAL_GAP_SECONDS between fixes
+#   ALERT_*                       : alert store transitions (listener on LATEST_ALERTS)
+#   OPERATOR:<action>             : governance actions targeting the device / its alerts
+# Per device, events are kept sorted by time (late fixes are inserted in place) in
+# parallel lists, so a timeline is a bisect range read. Entries are never edited;
+# the oldest are dropped beyond EVENT_LOG_MAX_PER_DEVICE.
+#
+# Restarts: the log is memory-resident and rides the DR snapshot chain
+# (app/snapshots.py): a base carries export(), each delta the events recorded
+# since the previous object (take_changes()); restore() replays them on boot.
+# Events recorded after the last successful delta (<= SNAPSHOT_INTERVAL_SECONDS)
+# are lost on a crash. Rehydrated open alerts are seeded with seed_alert() so
+# their next transition is not recorded as a new ALERT_TRIGGERED.
+
+class DeviceEventLog:
+    def __init__(self, max_per_device: int, gap_seconds: float):
+        self.max_per_device = max_per_device
+        self.gap_seconds = gap_seconds
+        self._times = {}        # device_id -> [event time] (sorted)
+        self._events = {}       # device_id -> [event dict] (aligned with _times)
+        self._zone = {}         # device_id -> zone_id of the last fix (None = outside zones)
+        self._last_fix = {}     # device_id -> newest fix timestamp
+        self._permit = {}       # device_id -> last permit status string
+        self._alerts = {}       # alert_id -> (status, severity, owner_id) last recorded
+        self._unsaved = {}      # device_id -> [event dict] recorded since the last take_changes()
+        self.stats = {
+            "devices": 0,
+            "events": 0
+        }
+        SYSTEM_METRICS['event_log'] = self.stats
+
+    # 1. Append + range read
+    def record(self, device_id: str, ts: float, event: str, actor: str, details: str) -> dict:
+        entry = {"time": ts, "event": event, "actor": actor, "details": details}
+        if device_id not in self._times:
+            self._times[device_id] = []
+            self._events[device_id] = []
+            self.stats["devices"] = len(self._times)
+        self._insert(device_id, entry)
+        unsaved = self._unsaved.setdefault(device_id, [])
+        unsaved.append(entry)
+        if len(unsaved) > self.max_per_device:
+            del unsaved[0] # Snapshots failing for a long time: keep what the log itself keeps
+        return entry
+
+    def _insert(self, device_id: str, entry: dict):
+        times = self._times[device_id]
+        index = bisect.bisect_right(times, entry["time"])
+        times.insert(index, entry["time"])
+        self._events[device_id].insert(index, entry)
+        if len(times) > self.max_per_device:
+            del times[0]
+            del self._events[device_id][0]
+        else:
+            self.stats["events"] += 1
+
+    def range(self, device_id: str, start: float = None, end: float = None) -> list:
+        """Events for one device with start <= time <= end, oldest first."""
+        times = self._times.get(device_id)
+        if not times:
+            return []
+        lo = 0 if start is None else bisect.bisect_left(times, start)
+        hi = len(times) if end is None else bisect.bisect_right(times, end)
+        return self._events[device_id][lo:hi]
+
+    # 2. Derived events
+    def observe_fix(self, device_id: str, ts: float, zone, permit_str: str = None):
+        """Called once per processed fix (slow path) with its geofence result."""
+        last = self._last_fix.get(device_id)
+        if last is not None and ts <= last:
+            return # Late / duplicate fix: transitions were already derived from newer ones
+        if last is not None and ts - last > self.gap_seconds:
+            self.record(device_id, last, "SIGNAL_LOST", "TELEMETRY_GATEWAY",
+                        f"No fixes after this point for {int(ts - last)}s")
+            self.record(device_id, ts, "SIGNAL_RESTORED", "TELEMETRY_GATEWAY",
+                        f"Fix received after {int(ts - last)}s gap")
+        self._last_fix[device_id] = ts
+
+        zone_id = zone.zone_id if zone else None
+        previous = self._zone.get(device_id)
+        if zone_id != previous:
+            if previous is not None:
+                self.record(device_id, ts, "ZONE_EXIT", "GEOFENCE_ENGINE", f"Left zone {previous}")
+            if zone is not None:
+                self.record(device_id, ts, "ZONE_ENTRY", "GEOFENCE_ENGINE",
+                            f"Entered {zone.name} ({zone.zone_id}, risk {zone.risk_level})")
+            self._zone[device_id] = zone_id
+
+        if permit_str and permit_str != self._permit.get(device_id):
+            self._permit[device_id] = permit_str
+            self.record(device_id, ts, "PERMIT_VERIFIED", "PERMIT_REGISTRY", permit_str)
+
+    def observe_alert(self, key, alert: dict):
+        """LATEST_ALERTS listener: records state transitions, not every touch."""
+        alert_id = alert['alert_id']
+        state = (alert['status'], alert['severity'], alert.get('owner_id'))
+        previous = self._alerts.get(alert_id)
+        if previous == state or (previous is None and state[0] == 'RESOLVED'):
+            return # No change, or the archive delete of an already-recorded resolution
+        device_id = alert['device_id']
+        alert_type = getattr(alert['type'], 'value', alert['type'])
+        if previous is None:
+            self.record(device_id, alert['timestamp'], f"ALERT_TRIGGERED: {alert['severity']}",
+                        "ANOMALY_DETECTION", f"{alert_type} - {alert.get('message', '')}")
+        else:
+            if state[1] != previous[1]:
+                self.record(device_id, alert['timestamp'], f"ALERT_ESCALATED: {state[1]}",
+                            "ANOMALY_DETECTION", f"{alert_type} - {alert.get('message', '')}")
+            if state[0] != previous[0] and state[0] == 'ACKNOWLEDGED':
+                self.record(device_id, alert.get('ack_time', alert['timestamp']), "ALERT_ACKNOWLEDGED",
+                            alert.get('ack_by') or '-', f"{alert_type}: Operator took cognizance.")
+            if state[0] != previous[0] and state[0] == 'RESOLVED':
+                self.record(device_id, alert.get('resolved_time', alert['timestamp']), "ALERT_RESOLVED",
+                            alert.get('resolved_by') or '-', f"{alert_type}: Incident marked as Resolved.")
+            if state[2] != previous[2] and state[2]:
+                self.record(device_id, time.time(), "INCIDENT_CLAIMED", state[2],
+                            f"{alert_type}: Command assumed (from {previous[2] or 'SYSTEM'}).")
+        if state[0] == 'RESOLVED':
+            self._alerts.pop(alert_id, None) # Terminal; keeps the map bounded by open alerts
+        else:
+            self._alerts[alert_id] = state
+
+    def observe_operator(self, target: str, ts: float, actor: str, action: str, justification: str):
+        """Governance actions whose target is a device id or an alert id."""
+        alert = LATEST_ALERTS.get_by_id(target)
+        device_id = alert['device_id'] if alert else target
+        if device_id in self._times or device_id in self._last_fix:
+            self.record(device_id, ts, f"OPERATOR: {action}", actor, justification)
+
+    # 3. Persistence (carried by the DR snapshot chain)
+    def _cursor(self, device_id: str) -> dict:
+        return {"zone": self._zone.get(device_id), "permit": self._permit.get(device_id)}
+
+    def take_changes(self) -> dict:
+        """{device_id: {"events", "zone", "permit"}} for events recorded since the last call."""
+        changed, self._unsaved = self._unsaved, {}
+        return {d: {"events": events, **self._cursor(d)} for d, events in changed.items()}
+
+    def export(self) -> dict:
+        """The whole log in take_changes() format (snapshot base); restarts change tracking."""
+        self._unsaved = {}
+        return {d: {"events": list(self._events[d]), **self._cursor(d)} for d in self._times}
+
+    def requeue(self, changes: dict):
+        """A failed snapshot write: its events go back into the next take_changes()."""
+        for device_id, part in changes.items():
+            self._unsaved[device_id] = (part["events"] + self._unsaved.get(device_id, []))[-self.max_per_device:]
+
+    def restore(self, changes: dict, last_fix: dict):
+        """
+        Boot path: replays merged snapshot events (not re-marked as unsaved) and the
+        per-device cursors. last_fix: {device_id: timestamp} from restored positions.
+        """
+        for device_id, part in changes.items():
+            if device_id not in self._times:
+                self._times[device_id] = []
+                self._events[device_id] = []
+            for entry in part["events"]:
+                self._insert(device_id, entry)
+            self._zone.setdefault(device_id, part.get("zone"))
+            if part.get("permit"):
+                self._permit.setdefault(device_id, part["permit"])
+        for device_id, ts in last_fix.items():
+            self._last_fix.setdefault(device_id, ts)
+        self.stats["devices"] = len(self._times)
+
+    def seed_alert(self, alert: dict):
+        """Rehydrated open alert: remembers its state without recording an event."""
+        if alert['status'] != 'RESOLVED':
+            self._alerts.setdefault(alert['alert_id'], (alert['status'], alert['severity'], alert.get('owner_id')))
+
+EVENT_LOG = DeviceEventLog(
+    max_per_device=settings.EVENT_LOG_MAX_PER_DEVICE,
+    gap_seconds=settings.EVENT_LOG_SIGNAL_GAP_SECONDS
+)
+LATEST_ALERTS.listeners.append(EVENT_LOG.observe_alert)
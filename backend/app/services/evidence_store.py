@@ -0,0 +1,367 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from app.core.config import settings
+from app.core.shared_state import SYSTEM_METRICS
+
+# --- EVIDENCE STORE (Content-Addressed Blobs, Disk or Kubo) ---
+# Replaces the in-process IPFS_STORE dict, which held every PDF forever.
+#   1. Identifiers : CIDv1 (base32, sha2-256 multihash). Files up to one chunk are a
+#                    single 'raw' block; larger files are split into fixed-size raw
+#                    chunks plus a dag-json manifest, so repeated chunks are stored
+#                    once. Directories (bulk exports) are dag-json name -> CID maps.
+#   2. Layout      : <EVIDENCE_STORE_PATH>/blocks/<d0d1>/<d2d3>/<cid>, sharded by
+#                    digest. Blocks are written to a temp file, fsynced and renamed,
+#                    so a crash never leaves a partial block under a valid CID.
+#   3. Reads       : stream() yields a chunk at a time; read() goes through a
+#                    byte-bounded LRU (EVIDENCE_CACHE_BYTES) for hot evidence.
+#   4. Pins + GC   : roots are pinned in pins.log, an append-only JSON-lines log (one
+#                    small fsynced append per pin / unpin; compacted on load). gc()
+#                    deletes blocks not reachable from any pin and older than the
+#                    grace period. A lock orders block writes against GC removals.
+# Writes block on disk (fsync); callers on the event loop go through asyncio.to_thread.
+# EVIDENCE_BACKEND=kubo sends the same operations to a local Kubo node's RPC API.
+
+RAW = 0x55
+DAG_JSON = 0x0129
+SHA2_256 = 0x12
+DIRECTORY_MIME = "inode/directory"
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = n & 0x7f
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+def _read_varint(data: bytes, pos: int) -> tuple:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        value |= (byte & 0x7f) << shift
+        pos += 1
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+def make_cid(codec: int, data: bytes) -> str:
+    digest = hashlib.sha256(data).digest()
+    raw = _varint(1) + _varint(codec) + bytes([SHA2_256, len(digest)]) + digest
+    return "b" + base64.b32encode(raw).decode().lower().rstrip("=")
+
+def parse_cid(cid: str) -> tuple:
+    """CIDv1 string -> (codec, hex digest). Raises ValueError on anything else."""
+    if not cid.startswith("b"):
+        raise ValueError(f"Unsupported multibase in {cid!r}")
+    body = cid[1:].upper()
+    try:
+        raw = base64.b32decode(body + "=" * (-len(body) % 8))
+        version, pos = _read_varint(raw, 0)
+        codec, pos = _read_varint(raw, pos)
+    except Exception:
+        raise ValueError(f"Malformed CID {cid!r}")
+    if version != 1 or raw[pos] != SHA2_256 or raw[pos + 1] != 32 or len(raw) != pos + 34:
+        raise ValueError(f"Unsupported CID {cid!r}")
+    return codec, raw[pos + 2:].hex()
+
+def _dag_json(obj) -> bytes:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":")).encode()
+
+class DiskBlobStore:
+    def __init__(self, root: str, chunk_size: int, cache_bytes: int, gc_grace: float):
+        self.root = root
+        self.blocks_dir = os.path.join(root, "blocks")
+        self.pins_path = os.path.join(root, "pins.log")
+        self.chunk_size = chunk_size
+        self.cache_bytes = cache_bytes
+        self.gc_grace = gc_grace
+        self._cache = OrderedDict() # cid -> bytes (whole file, LRU by bytes)
+        self._cached_bytes = 0
+        self.pins = {}              # root cid -> {"mime", "size", "pinned_at"}
+        self._lock = threading.Lock() # Block dedup/write + pin vs. GC removal
+        self._pin_log = None
+        self.stats = {
+            "backend": "disk",
+            "blocks_written": 0,
+            "blocks_deduped": 0,
+            "bytes_written": 0,
+            "cache_hits": 0,
+            "pinned": 0,
+            "gc_removed": 0
+        }
+        SYSTEM_METRICS['evidence_store'] = self.stats
+        os.makedirs(self.blocks_dir, exist_ok=True)
+        self._load_pins()
+
+    # 1. Blocks
+    def _block_path(self, cid: str) -> str:
+        _, digest = parse_cid(cid)
+        return os.path.join(self.blocks_dir, digest[:2], digest[2:4], cid)
+
+    def _put_block(self, codec: int, data: bytes) -> str:
+        cid = make_cid(codec, data)
+        path = self._block_path(cid)
+        with self._lock:
+            if os.path.exists(path):
+                os.utime(path) # Fresh again for the GC grace window
+                self.stats["blocks_deduped"] += 1
+                return cid
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path) # New mtime: inside the grace window until pinned
+        self.stats["blocks_written"] += 1
+        self.stats["bytes_written"] += len(data)
+        return cid
+
+    def _get_block(self, cid: str) -> bytes:
+        with open(self._block_path(cid), "rb") as f:
+            return f.read()
+
+    def _links(self, cid: str) -> list:
+        """Child CIDs of a manifest / directory block (none for raw blocks)."""
+        codec, _ = parse_cid(cid)
+        if codec != DAG_JSON:
+            return []
+        node = json.loads(self._get_block(cid))
+        if "chunks" in node:
+            return [link["/"] for link in node["chunks"]]
+        return [link["/"] for link in node.get("entries", {}).values()]
+
+    # 2. Pins (append-only log)
+    def _load_pins(self):
+        """Replays pins.log, then compacts it to one line per live pin."""
+        lines = 0
+        legacy_path = os.path.join(self.root, "pins.json") # Single-document format (pre pins.log)
+        if os.path.exists(legacy_path):
+            with open(legacy_path, "r") as f:
+                self.pins.update(json.load(f))
+            lines = len(self.pins) + 1 # Forces the compaction below to write them to the log
+        if os.path.exists(self.pins_path):
+            with open(self.pins_path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue # Torn last line from a crash mid-append
+                    lines += 1
+                    if entry.get("op") == "unpin":
+                        self.pins.pop(entry["cid"], None)
+                    else:
+                        self.pins[entry["cid"]] = {k: entry[k] for k in ("mime", "size", "pinned_at")}
+        if lines > len(self.pins):
+            tmp_path = f"{self.pins_path}.tmp"
+            with open(tmp_path, "w") as f:
+                for cid, meta in self.pins.items():
+                    f.write(json.dumps({"op": "pin", "cid": cid, **meta}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.pins_path)
+            if os.path.exists(legacy_path):
+                os.remove(legacy_path)
+        self._pin_log = open(self.pins_path, "a")
+        self.stats["pinned"] = len(self.pins)
+
+    def _append_pin_log(self, entry: dict):
+        self._pin_log.write(json.dumps(entry) + "\n")
+        self._pin_log.flush()
+        os.fsync(self._pin_log.fileno())
+        self.stats["pinned"] = len(self.pins)
+
+    def pin(self, cid: str, mime: str, size: int):
+        meta = {"mime": mime, "size": size, "pinned_at": time.time()}
+        with self._lock:
+            self.pins[cid] = meta
+            self._append_pin_log({"op": "pin", "cid": cid, **meta})
+
+    def unpin(self, cid: str) -> bool:
+        with self._lock:
+            if self.pins.pop(cid, None) is None:
+                return False
+            self._append_pin_log({"op": "unpin", "cid": cid})
+        return True
+
+    # 3. Add
+    def _add_file(self, data: bytes) -> str:
+        if len(data) <= self.chunk_size:
+            return self._put_block(RAW, data)
+        chunks = [{"/": self._put_block(RAW, data[i:i + self.chunk_size])}
+                  for i in range(0, len(data), self.chunk_size)]
+        return self._put_block(DAG_JSON, _dag_json({"chunks": chunks, "size": len(data)}))
+
+    def add(self, data: bytes, mime: str) -> str:
+        cid = self._add_file(data)
+        self.pin(cid, mime, len(data))
+        return cid
+
+    def add_many(self, files: dict, mime: str) -> tuple:
+        """files: {name: bytes} -> (directory CID, {name: CID}); only the directory is pinned."""
+        cids = {name: self._add_file(data) for name, data in files.items()}
+        root = self._put_block(DAG_JSON, _dag_json({"entries": {n: {"/": c} for n, c in cids.items()}}))
+        self.pin(root, DIRECTORY_MIME, sum(len(d) for d in files.values()))
+        return root, cids
+
+    # 4. Reads
+    def has(self, cid: str) -> bool:
+        try:
+            return os.path.exists(self._block_path(cid))
+        except ValueError:
+            return False
+
+    def stat(self, cid: str) -> dict:
+        return self.pins.get(cid)
+
+    def stream(self, cid: str):
+        """Yields the file's bytes chunk by chunk (directories are not files)."""
+        codec, _ = parse_cid(cid)
+        if codec == RAW:
+            with open(self._block_path(cid), "rb") as f:
+                while True:
+                    block = f.read(self.chunk_size)
+                    if not block:
+                        return
+                    yield block
+        node = json.loads(self._get_block(cid))
+        if "chunks" not in node:
+            raise IsADirectoryError(cid)
+        for link in node["chunks"]:
+            yield self._get_block(link["/"])
+
+    def read(self, cid: str) -> bytes:
+        data = self._cache.get(cid)
+        if data is not None:
+            self._cache.move_to_end(cid)
+            self.stats["cache_hits"] += 1
+            return data
+        data = b"".join(self.stream(cid))
+        if len(data) <= self.cache_bytes:
+            self._cache[cid] = data
+            self._cached_bytes += len(data)
+            while self._cached_bytes > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= len(evicted)
+        return data
+
+    # 5. Garbage collection (blocking; run off the event loop)
+    def gc(self) -> int:
+        reachable = set()
+        with self._lock:
+            frontier = list(self.pins)
+        while frontier:
+            cid = frontier.pop()
+            if cid in reachable:
+                continue
+            reachable.add(cid)
+            try:
+                frontier.extend(self._links(cid))
+            except (OSError, ValueError):
+                pass # Missing block: nothing below it to keep
+        cutoff = time.time() - self.gc_grace
+        removed = 0
+        for directory, _, names in os.walk(self.blocks_dir):
+            for name in names:
+                path = os.path.join(directory, name)
+                if name in reachable or os.path.getmtime(path) >= cutoff:
+                    continue
+                with self._lock:
+                    # Re-check: an add() may have deduped (touched) or pinned it since the walk began
+                    if name in self.pins or not os.path.exists(path) or os.path.getmtime(path) >= cutoff:
+                        continue
+                    os.remove(path) # Unpinned content and stale temp files
+                self._cache.pop(name, None)
+                removed += 1
+        self._cached_bytes = sum(len(d) for d in self._cache.values())
+        self.stats["gc_removed"] += removed
+        return removed
+
+class KuboBlobStore:
+    """Same interface over a local Kubo node (RPC API, CIDv1 with raw leaves)."""
+    def __init__(self, api_url: str, timeout: float):
+        import requests
+        self._session = requests.Session()
+        self.api = api_url.rstrip("/") + "/api/v0"
+        self.timeout = timeout
+        self.stats = {"backend": "kubo", "added": 0, "gc_removed": 0}
+        SYSTEM_METRICS['evidence_store'] = self.stats
+
+    def _post(self, command: str, **kwargs):
+        response = self._session.post(f"{self.api}/{command}", timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def add(self, data: bytes, mime: str) -> str:
+        response = self._post("add", params={"cid-version": 1, "raw-leaves": "true", "pin": "true"},
+                              files={"file": ("evidence", data, mime)})
+        self.stats["added"] += 1
+        return response.json()["Hash"]
+
+    def add_many(self, files: dict, mime: str) -> tuple:
+        response = self._post("add", params={"cid-version": 1, "raw-leaves": "true", "pin": "true",
+                                             "wrap-with-directory": "true"},
+                              files=[("file", (name, data, mime)) for name, data in files.items()])
+        entries = [json.loads(line) for line in response.text.splitlines() if line.strip()]
+        cids = {e["Name"]: e["Hash"] for e in entries if e["Name"]}
+        root = next(e["Hash"] for e in entries if not e["Name"])
+        self.stats["added"] += len(cids)
+        return root, cids
+
+    def has(self, cid: str) -> bool:
+        try:
+            self._post("block/stat", params={"arg": cid, "offline": "true"})
+            return True
+        except Exception:
+            return False
+
+    def stat(self, cid: str) -> dict:
+        return None # Kubo keeps no mime metadata
+
+    def stream(self, cid: str):
+        with self._post("cat", params={"arg": cid}, stream=True) as response:
+            yield from response.iter_content(chunk_size=settings.EVIDENCE_CHUNK_SIZE)
+
+    def read(self, cid: str) -> bytes:
+        return self._post("cat", params={"arg": cid}).content
+
+    def unpin(self, cid: str) -> bool:
+        self._post("pin/rm", params={"arg": cid})
+        return True
+
+    def gc(self) -> int:
+        response = self._post("repo/gc")
+        removed = sum(1 for line in response.text.splitlines() if line.strip())
+        self.stats["gc_removed"] += removed
+        return removed
+
+def build_store():
+    if settings.EVIDENCE_BACKEND == "kubo":
+        return KuboBlobStore(settings.KUBO_API_URL, settings.KUBO_TIMEOUT_SECONDS)
+    return DiskBlobStore(settings.EVIDENCE_STORE_PATH, settings.EVIDENCE_CHUNK_SIZE,
+                         settings.EVIDENCE_CACHE_BYTES, settings.EVIDENCE_GC_GRACE_SECONDS)
+
+async def run_evidence_gc_loop():
+    """
+    Background Task: Collect unpinned evidence blocks every EVIDENCE_GC_SECONDS.
+    """
+    while True:
+        await asyncio.sleep(settings.EVIDENCE_GC_SECONDS)
+        try:
+            removed = await asyncio.to_thread(EVIDENCE_STORE.gc)
+            if removed:
+                print(f"EVIDENCE: GC removed {removed} unpinned blocks")
+        except Exception as e:
+            print(f"EVIDENCE: GC error: {e}")
+
+EVIDENCE_STORE = build_store()
@@ -0,0 +1,60 @@
+import numpy as np
+from app.core.config import settings
+
+# --- COLUMNAR FLEET HISTORY (Ring Buffers for Batch Analytics) ---
+# The last `window` raw fixes of every device, stored column-wise in one NumPy
+# block [column, slot, position]. Appends are O(1); batch jobs pull every full
+# window in chronological order with a single gather instead of walking dicts.
+
+COLUMNS = ("timestamp", "lat", "lng", "speed", "heading")
+
+class FleetHistory:
+    def __init__(self, window: int, capacity: int = 1024):
+        self.window = window
+        self.slots = {}      # device_id -> slot
+        self.device_ids = [] # slot -> device_id
+        self.data = np.zeros((len(COLUMNS), capacity, window))
+        self.head = np.zeros(capacity, dtype=np.intp)  # Next write position
+        self.count = np.zeros(capacity, dtype=np.intp)
+
+    def __len__(self):
+        return len(self.device_ids)
+
+    def _allocate(self, device_id: str) -> int:
+        slot = len(self.device_ids)
+        if slot >= len(self.head):
+            grow = len(self.head)
+            self.data = np.concatenate([self.data, np.zeros((len(COLUMNS), grow, self.window))], axis=1)
+            self.head = np.concatenate([self.head, np.zeros(grow, dtype=np.intp)])
+            self.count = np.concatenate([self.count, np.zeros(grow, dtype=np.intp)])
+        self.slots[device_id] = slot
+        self.device_ids.append(device_id)
+        return slot
+
+    def append(self, device_id: str, timestamp: float, lat: float, lng: float, speed: float, heading: float):
+        slot = self.slots.get(device_id)
+        if slot is None:
+            slot = self._allocate(device_id)
+        pos = self.head[slot]
+        if self.count[slot] and timestamp <= self.data[0, slot, pos - 1]:
+            return # Out-of-order / duplicate fix
+        self.data[:, slot, pos] = (timestamp, lat, lng, speed, heading)
+        self.head[slot] = (pos + 1) % self.window
+        if self.count[slot] < self.window:
+            self.count[slot] += 1
+
+    def full_windows(self) -> tuple:
+        """
+        Returns (device_ids, {column: (n, window) array}) for every device with a
+        full window, oldest fix first. Arrays are copies (safe to use off-loop).
+        """
+        n = len(self.device_ids)
+        slots = np.flatnonzero(self.count[:n] == self.window)
+        order = (self.head[slots][:, None] + np.arange(self.window)) % self.window
+        columns = {
+            name: np.take_along_axis(self.data[i, slots], order, axis=1)
+            for i, name in enumerate(COLUMNS)
+        }
+        return [self.device_ids[s] for s in slots], columns
+
+FLEET_HISTORY = FleetHistory(window=settings.BOT_SCAN_WINDOW)
@@ -2,6 +2,7 @@ import math
 import time
 import uuid
 import hashlib
+import numpy as np
 from typing import List, Optional
 from app.models import GeoPoint, GeoFence, GeofenceAuditLog
 from app.services.db import get_table
@@ -31,6 +32,22 @@ class PolygonZone:
             p1x, p1y = p2x, p2y
         return inside
 
+    def contains_many(self, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+        """Vectorized contains() over arrays of points (same edge rules)."""
+        inside = np.zeros(len(lats), dtype=bool)
+        n = len(self.points)
+        p1x, p1y = self.points[0]
+        for i in range(n + 1):
+            p2x, p2y = self.points[i % n]
+            crosses = (lngs > min(p1y, p2y)) & (lngs <= max(p1y, p2y)) & (lats <= max(p1x, p2x))
+            if p1x == p2x:
+                inside ^= crosses
+            elif p1y != p2y:
+                xinters = (lngs - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
+                inside ^= crosses & (lats <= xinters)
+            p1x, p1y = p2x, p2y
+        return inside
+
 # Defined Red Zone near Tawang (as per User Request)
 RED_ZONE_TAWANG = PolygonZone([
     (27.5890, 91.8610), 
@@ -230,3 +247,65 @@ def check_geofence_breach(location: GeoPoint) -> Optional[GeoFence]:
         pass
 
     return winning_zone
+
+# --- BATCH ZONE HITS (Vectorized) ---
+
+# Stand-in for the polygon hit in batch results (the scalar path builds one per point)
+POLYGON_ZONE = GeoFence(
+    zone_id="POLY_RED_01",
+    name="Restricted Border Zone (Polygon)",
+    risk_level="HIGH",
+    center=GeoPoint(lat=27.5880, lng=91.8620),
+    radius_meters=0.0,
+    description="Geospatial Polygon Breach",
+    approved_by="MILITARY_COMMAND",
+    priority=100,
+    authority="DEFENSE_MINISTRY",
+    version=99
+)
+
+def haversine_many(lats: np.ndarray, lngs: np.ndarray, center: GeoPoint) -> np.ndarray:
+    """haversine_distance(point, center) for arrays of points, in meters."""
+    R = 6371000
+    phi1, phi2 = np.radians(lats), math.radians(center.lat)
+    dphi = np.radians(center.lat - lats)
+    dlambda = np.radians(center.lng - lngs)
+
+    a = np.sin(dphi/2)**2 + np.cos(phi1)*math.cos(phi2)*np.sin(dlambda/2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+    return R * c
+
+def zone_hits_batch(lats, lngs) -> tuple:
+    """
+    Vectorized check_geofence_breach over many points.
+    Returns (hits, zones): hits[i] indexes the winning zone in `zones`, or -1.
+    zones[0] is POLYGON_ZONE, followed by the live circular zones in cache order,
+    so priority ties resolve exactly like the scalar path (first listed wins).
+    """
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    if not _GEOFENCE_CACHE:
+        load_geofences()
+    zones = [POLYGON_ZONE] + list(_GEOFENCE_CACHE)
+
+    hits = np.full(len(lats), -1, dtype=np.intp)
+    best = np.full(len(lats), -np.inf)
+    inside = RED_ZONE_TAWANG.contains_many(lats, lngs)
+    hits[inside] = 0
+    best[inside] = POLYGON_ZONE.priority
+
+    # Great-circle distance >= R * |dphi|, so only a latitude band can be inside a circle
+    order = np.argsort(lats, kind="stable")
+    sorted_lats = lats[order]
+    for k, fence in enumerate(zones[1:], start=1):
+        band = math.degrees(fence.radius_meters / 6371000) * (1 + 1e-9) + 1e-12
+        lo = np.searchsorted(sorted_lats, fence.center.lat - band, side="left")
+        hi = np.searchsorted(sorted_lats, fence.center.lat + band, side="right")
+        if lo >= hi:
+            continue
+        idx = order[lo:hi]
+        idx = idx[haversine_many(lats[idx], lngs[idx], fence.center) <= fence.radius_meters]
+        idx = idx[fence.priority > best[idx]]
+        hits[idx] = k
+        best[idx] = fence.priority
+    return hits, zones
@@ -1,7 +1,12 @@
 from pydantic import BaseModel
 from typing import Dict, List, Optional
 import hashlib
+import json
+import os
 import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from app.core.config import settings
 
 # --- Mock Hardware Registry ---
 # In production, this syncs with the MDM (Mobile Device Management) server.
@@ -15,7 +20,6 @@ class DeviceIdentity(BaseModel):
     cert_thumbprint: str     # The expected mTLS cert thumbprint
     status: str = "ACTIVE"
     secret_key: str = "default-secret" # Burned-in Private Key (Simulated)
-    last_nonce: int = 0 # Replay Protection State
 
 # Registry of Authorized Hardware
 AUTHORIZED_DEVICES = {
@@ -53,13 +57,198 @@ AUTHORIZED_DEVICES = {
     )
 }
 
+# --- Device Key Store (Attestation State) ---
+# Compact per-device records: the HMAC key is keyed ONCE at registration and
+# cloned per packet, and replay protection uses an IPsec-style sliding bitmap
+# (RFC 4303 §3.4.3) so gateways may batch/reorder packets within the window.
+
+def derive_device_key(master_secret: str, device_id: str) -> bytes:
+    """
+    Fleet Provisioning: per-device key = HMAC-SHA256(master, device_id).
+    """
+    return hmac.new(master_secret.encode(), device_id.encode(), hashlib.sha256).digest()
+
+class DeviceKeyRecord:
+    __slots__ = ("device_id", "did", "allowed_fingerprint", "cert_thumbprint", "status",
+                 "key_id", "mac", "top_nonce", "window")
+
+    def __init__(self, device_id: str, did: str, allowed_fingerprint: str, cert_thumbprint: str,
+                 secret: bytes, status: str = "ACTIVE"):
+        self.device_id = device_id
+        self.did = did
+        self.allowed_fingerprint = allowed_fingerprint
+        self.cert_thumbprint = cert_thumbprint
+        self.status = status
+        self.key_id = hashlib.sha256(secret).hexdigest()[:16] # Detects key rotation across restarts
+        self.mac = hmac.new(secret, digestmod=hashlib.sha256)
+        self.top_nonce = 0 # Highest accepted nonce
+        self.window = 0    # Bit i set => nonce (top_nonce - i) already seen
+
+    def sign(self, payload: bytes) -> str:
+        mac = self.mac.copy()
+        mac.update(payload)
+        return mac.hexdigest()
+
+    def check_nonce(self, nonce: int, window_size: int) -> bool:
+        """O(1) replay check. Does NOT mutate state."""
+        if nonce <= 0:
+            return False
+        if nonce > self.top_nonce:
+            return True
+        offset = self.top_nonce - nonce
+        if offset >= window_size:
+            return False # Too old: fell off the window
+        return not (self.window >> offset) & 1
+
+    def commit_nonce(self, nonce: int, window_size: int):
+        """Marks nonce as seen. Only call after the signature verified."""
+        if nonce > self.top_nonce:
+            shift = nonce - self.top_nonce
+            if shift < window_size:
+                self.window = ((self.window << shift) | 1) & ((1 << window_size) - 1)
+            else:
+                self.window = 1
+            self.top_nonce = nonce
+        else:
+            self.window |= 1 << (self.top_nonce - nonce)
+
+class DeviceKeyStore:
+    """
+    In-process attestation store, persisted to a small JSON file so the replay
+    window survives restarts. Secrets are NOT persisted (they come from the MDM
+    registry / master key); only key_id + nonce window per device.
+    """
+    def __init__(self, path: str, window_size: int, master_secret: str = ""):
+        self.path = path
+        self.window_size = window_size
+        self.master_secret = master_secret
+        self._records: Dict[str, DeviceKeyRecord] = {}
+        self._dirty = False
+
+    def register(self, identity: DeviceIdentity):
+        self._records[identity.device_id] = DeviceKeyRecord(
+            identity.device_id,
+            identity.did,
+            identity.allowed_fingerprint,
+            identity.cert_thumbprint,
+            identity.secret_key.encode(),
+            identity.status
+        )
+
+    def get(self, device_id: str) -> Optional[DeviceKeyRecord]:
+        record = self._records.get(device_id)
+        if record is None and self.master_secret:
+            # Derived fleet device (simulators, load tests, bulk-provisioned trackers).
+            # Not stored until a signature verifies (commit_nonce), so floods of
+            # random device_ids can't grow the store.
+            record = DeviceKeyRecord(
+                device_id,
+                f"did:eth:derived:{device_id}",
+                f"hw:{device_id}",
+                f"CERT_{device_id}",
+                derive_device_key(self.master_secret, device_id)
+            )
+        return record
+
+    def check_nonce(self, record: DeviceKeyRecord, nonce: int) -> bool:
+        return record.check_nonce(nonce, self.window_size)
+
+    def commit_nonce(self, record: DeviceKeyRecord, nonce: int):
+        """Marks nonce as seen (after the signature verified); admits derived records."""
+        record = self._records.setdefault(record.device_id, record)
+        record.commit_nonce(nonce, self.window_size)
+        self._dirty = True
+
+    def load(self):
+        """Restores nonce windows from disk (call once on boot)."""
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"DEVICE_STORE: Failed to load {self.path}: {e}")
+            return
+
+        mask = (1 << self.window_size) - 1
+        restored = 0
+        for device_id, entry in state.get("devices", {}).items():
+            record = self.get(device_id)
+            if not record or record.key_id != entry.get("key_id"):
+                continue # Unknown device or rotated key -> fresh window
+            record.top_nonce = int(entry.get("top_nonce", 0))
+            record.window = int(entry.get("window", "0"), 16) & mask
+            self._records[device_id] = record # Derived devices with a window on disk were attested before
+            restored += 1
+        print(f"DEVICE_STORE: Restored replay windows for {restored} devices.")
+
+    def snapshot(self, force: bool = False) -> Optional[dict]:
+        """
+        Nonce state to persist, or None if nothing changed. Call on the event loop:
+        commit_nonce inserts records there, so the walk must not race it.
+        """
+        if not self._dirty and not force:
+            return None
+        state = {
+            "version": 1,
+            "window_size": self.window_size,
+            "devices": {
+                r.device_id: {"key_id": r.key_id, "top_nonce": r.top_nonce, "window": format(r.window, "x")}
+                for r in list(self._records.values()) if r.top_nonce
+            }
+        }
+        self._dirty = False # Commits after this point dirty the store again
+        return state
+
+    def write(self, state: dict) -> bool:
+        """Atomically writes a snapshot() (blocking; safe in a worker thread)."""
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            return True
+        except Exception as e:
+            self._dirty = True # Retry on next flush
+            print(f"DEVICE_STORE: Flush failed: {e}")
+            return False
+
+    def flush(self, force: bool = False):
+        """Synchronous snapshot + write (shutdown path)."""
+        state = self.snapshot(force)
+        if state is not None:
+            self.write(state)
+
+DEVICE_KEY_STORE = DeviceKeyStore(
+    settings.DEVICE_STORE_PATH,
+    settings.NONCE_WINDOW_SIZE,
+    settings.DEVICE_KEY_MASTER
+)
+for _identity in AUTHORIZED_DEVICES.values():
+    DEVICE_KEY_STORE.register(_identity)
+
+async def run_device_store_flush_loop():
+    """
+    Background Task: Persists replay windows every few seconds.
+    """
+    while True:
+        await asyncio.sleep(settings.DEVICE_STORE_FLUSH_SECONDS)
+        try:
+            state = DEVICE_KEY_STORE.snapshot() # On the loop; only the file write is threaded
+            if state is not None:
+                await asyncio.to_thread(DEVICE_KEY_STORE.write, state)
+        except Exception as e:
+            print(f"DEVICE_STORE: Flush loop error: {e}")
+
 def verify_device_integrity(device_id: str, presented_fingerprint: str, cert_header: str) -> bool:
     """
     ZERO TRUST LOGIC:
     Verifies that the telemetry is coming from the SPECIFIC registered hardware,
     not just a valid API Key holder.
     """
-    identity = AUTHORIZED_DEVICES.get(device_id)
+    identity = DEVICE_KEY_STORE.get(device_id)
     
     if not identity:
         print(f"ZERO_TRUST_FAIL: Device {device_id} not in MDM Registry.")
@@ -81,31 +270,92 @@ def verify_device_integrity(device_id: str, presented_fingerprint: str, cert_hea
         
     return True
 
+def canonical_payload(device_id: str, timestamp: float, lat: float, lng: float) -> str:
+    """
+    Canonical Signed Format: device_id:timestamp:lat:lng
+    """
+    return f"{device_id}:{timestamp}:{lat}:{lng}"
+
 def verify_packet_signature(device_id: str, payload_string: str, signature: str, nonce: int) -> bool:
     """
     CRYPTOGRAPHIC ATTESTATION & REPLAY PROTECTION:
-    1. Checks Nonce Monotonicity (Anti-Replay).
+    1. Checks Nonce against the Sliding Replay Window (Anti-Replay, reorder tolerant).
     2. Verifies HMAC-SHA256 Signature (Attestation).
     """
-    identity = AUTHORIZED_DEVICES.get(device_id)
+    identity = DEVICE_KEY_STORE.get(device_id)
     if not identity: return False
     
     # 1. Replay Protection
-    if nonce <= identity.last_nonce:
-        print(f"REPLAY ATTACK DETECTED: Device {device_id} sent nonce {nonce} <= last {identity.last_nonce}")
+    if not DEVICE_KEY_STORE.check_nonce(identity, nonce):
+        print(f"REPLAY ATTACK DETECTED: Device {device_id} sent nonce {nonce} (window top {identity.top_nonce})")
         return False
         
     # 2. Verify Signature
-    expected = hmac.new(
-        identity.secret_key.encode(), 
-        payload_string.encode(), 
-        hashlib.sha256
-    ).hexdigest()
+    expected = identity.sign(payload_string.encode())
     
     if not hmac.compare_digest(expected, signature):
         print(f"SIGNATURE FAIL: Device {device_id}. Forged Packet?")
         return False
         
     # 3. Update State
-    identity.last_nonce = nonce
+    DEVICE_KEY_STORE.commit_nonce(identity, nonce)
     return True
+
+# --- Batch Attestation (Bulk Gateway Flushes) ---
+# HMAC runs in a dedicated pool so the event loop stays free while a gateway
+# flush of thousands of packets is verified chunk by chunk.
+_ATTESTATION_POOL = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="attest")
+
+def _verify_chunk(jobs: list) -> List[bool]:
+    results = []
+    for record, payload, signature in jobs:
+        try:
+            results.append(hmac.compare_digest(record.sign(payload), signature))
+        except TypeError:
+            results.append(False) # Non-ASCII signature string
+    return results
+
+async def verify_packet_batch(packets: List[tuple]) -> List[bool]:
+    """
+    Verifies a batch of (device_id, payload_string, signature, nonce) tuples.
+    Each packet is accepted/rejected individually; nonces are committed in
+    batch order AFTER signatures verify, so duplicates inside one batch are
+    still caught as replays.
+    """
+    results = [False] * len(packets)
+    jobs, job_index = [], []
+
+    # 1. Cheap pre-filter on the loop: unknown device / stale nonce
+    for i, (device_id, payload_string, signature, nonce) in enumerate(packets):
+        record = DEVICE_KEY_STORE.get(device_id)
+        if not record or not signature or nonce is None:
+            continue
+        if not DEVICE_KEY_STORE.check_nonce(record, nonce):
+            continue
+        jobs.append((record, payload_string.encode(), signature))
+        job_index.append(i)
+
+    # 2. Signatures in the pool, chunked
+    loop = asyncio.get_running_loop()
+    chunk = settings.ATTESTATION_CHUNK_SIZE
+    parts = await asyncio.gather(*[
+        loop.run_in_executor(_ATTESTATION_POOL, _verify_chunk, jobs[i:i + chunk])
+        for i in range(0, len(jobs), chunk)
+    ])
+    verdicts = [v for part in parts for v in part]
+
+    # 3. Commit nonces in order (re-check: an earlier packet may have used it).
+    # Re-fetched so packets of a newly derived device share the record stored
+    # by the first commit.
+    for i, ok in zip(job_index, verdicts):
+        nonce = packets[i][3]
+        if not ok:
+            continue
+        record = DEVICE_KEY_STORE.get(packets[i][0])
+        if DEVICE_KEY_STORE.check_nonce(record, nonce):
+            DEVICE_KEY_STORE.commit_nonce(record, nonce)
+            results[i] = True
+    rejected = len(packets) - sum(results)
+    if rejected:
+        print(f"SECURITY ALERT: Batch attestation rejected {rejected}/{len(packets)} packets (Signature/Replay).")
+    return results
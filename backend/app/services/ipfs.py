@@ -1,32 +1,36 @@
-import hashlib
-import json
-import time
+from app.services.evidence_store import EVIDENCE_STORE
 
-# Simulation of a decentralized IPFS Node
-# In production, this would connect to Infura IPFS or a local Go-IPFS node
-
-IPFS_STORE = {}
+# Decentralized Evidence Vault
+# Content-addressed (CIDv1) blobs on local disk, or on a local Kubo node when
+# EVIDENCE_BACKEND=kubo (see services/evidence_store.py).
 
 def upload_to_ipfs(file_bytes: bytes, explicit_mime_type: str = "application/pdf") -> str:
     """
-    Uploads bytes to the IPFS Mock Network.
-    Returns: CID (Content Identifier) - effectively a hash starting with 'Qm'.
+    Uploads and pins bytes in the evidence store.
+    Returns: CID (Content Identifier) - CIDv1, base32 ('b...').
     """
-    # 1. Simulate CID generation (SHA256 usually, IPFS uses multihash)
-    # We use a mock 'Qm' prefix to look like real IPFS
-    content_hash = hashlib.sha256(file_bytes).hexdigest()
-    cid = f"Qm{content_hash[:44]}" # IPFS CIDs are usually 46 chars
-    
-    # 2. Store in "Network"
-    IPFS_STORE[cid] = {
-        "content": file_bytes,
-        "mime": explicit_mime_type,
-        "timestamp": time.time(),
-        "replicas": 3 # Simulated replication on 3 nodes
-    }
-    
+    cid = EVIDENCE_STORE.add(file_bytes, explicit_mime_type)
     print(f"[IPFS_NODE] Content Pinned. CID: {cid} | Size: {len(file_bytes)} bytes")
     return cid
 
+def upload_batch_to_ipfs(files: dict, explicit_mime_type: str = "application/pdf") -> tuple:
+    """
+    Pins a set of files as one directory (one pin operation per batch).
+    files: {name: bytes}. Returns (directory CID, {name: file CID}).
+    """
+    root_cid, cids = EVIDENCE_STORE.add_many(files, explicit_mime_type)
+    print(f"[IPFS_NODE] Directory Pinned. CID: {root_cid} | Files: {len(cids)} | Size: {sum(len(b) for b in files.values())} bytes")
+    return root_cid, cids
+
 def get_from_ipfs(cid: str):
-    return IPFS_STORE.get(cid)
+    """{"content", "mime", "timestamp", "size"} for a stored file, or None."""
+    if not EVIDENCE_STORE.has(cid):
+        return None
+    meta = EVIDENCE_STORE.stat(cid) or {}
+    content = EVIDENCE_STORE.read(cid)
+    return {
+        "content": content,
+        "mime": meta.get("mime", "application/octet-stream"),
+        "timestamp": meta.get("pinned_at"),
+        "size": len(content)
+    }
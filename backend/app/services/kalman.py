@@ -0,0 +1,181 @@
+import math
+import numpy as np
+from app.core.config import settings
+from app.core.shared_state import SYSTEM_METRICS
+
+# --- KALMAN FILTER BANK (Constant-Velocity GPS Smoothing) ---
+# Each device runs two independent 2-state filters [position, velocity], one per
+# axis (lat, lng). Every device owns a slot in contiguous NumPy arrays, so a whole
+# gateway batch is smoothed with a handful of vector ops instead of a dict walk
+# per packet. Noise is configured in meters and converted to degrees at the
+# device's latitude (1 deg lat ~ 111.32 km; 1 deg lng shrinks with cos(lat)).
+
+METERS_PER_DEG_LAT = 111_320.0
+MIN_COS_LAT = 0.01 # Keeps the lng conversion finite near the poles
+
+# Row layout per axis: S[slot, axis] = [x, v, P00, P01, P11]
+POS, VEL, P00, P01, P11 = range(5)
+
+def meters_per_degree(lat: float) -> tuple:
+    """(meters per degree of latitude, meters per degree of longitude) at lat."""
+    return METERS_PER_DEG_LAT, METERS_PER_DEG_LAT * max(math.cos(math.radians(lat)), MIN_COS_LAT)
+
+def _predict_update(x, v, p00, p01, p11, z, dt, r, q):
+    """
+    One CV predict + position-measurement update. Works on floats or arrays.
+    Q is the discrete white-acceleration model: q * [[dt^4/4, dt^3/2], [dt^3/2, dt^2]].
+    """
+    dt2 = dt * dt
+    # Predict
+    x = x + v * dt
+    p00 = p00 + dt * (2 * p01 + dt * p11) + q * dt2 * dt2 / 4
+    p01 = p01 + dt * p11 + q * dt2 * dt / 2
+    p11 = p11 + q * dt2
+    # Update (H = [1, 0])
+    s = p00 + r
+    k0 = p00 / s
+    k1 = p01 / s
+    y = z - x
+    return x + k0 * y, v + k1 * y, (1 - k0) * p00, (1 - k0) * p01, p11 - k1 * p01
+
+class KalmanFilterBank:
+    def __init__(self, gps_accuracy_m: float, accel_noise: float, initial_speed_m_s: float, capacity: int = 1024):
+        self.gps_accuracy_m = gps_accuracy_m      # 1-sigma GPS position error
+        self.accel_noise = accel_noise            # 1-sigma unmodelled acceleration (m/s^2)
+        self.initial_speed_m_s = initial_speed_m_s # 1-sigma prior on velocity for a new device
+        self.slots = {} # device_id -> slot
+        self.S = np.zeros((capacity, 2, 5))
+        self.last_ts = np.zeros(capacity)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def reset(self):
+        self.slots.clear()
+
+    def _allocate(self, device_id: str) -> int:
+        slot = len(self.slots)
+        if slot >= len(self.last_ts):
+            grow = len(self.last_ts)
+            self.S = np.concatenate([self.S, np.zeros((grow, 2, 5))])
+            self.last_ts = np.concatenate([self.last_ts, np.zeros(grow)])
+        self.slots[device_id] = slot
+        return slot
+
+    def _initial_row(self, z: float, m_per_deg: float) -> list:
+        return [z, 0.0, (self.gps_accuracy_m / m_per_deg) ** 2, 0.0, (self.initial_speed_m_s / m_per_deg) ** 2]
+
+    def _reset_slot(self, slot: int, lat: float, lng: float, timestamp: float):
+        m_lat, m_lng = meters_per_degree(lat)
+        self.S[slot] = [self._initial_row(lat, m_lat), self._initial_row(lng, m_lng)]
+        self.last_ts[slot] = timestamp
+
+    def step(self, device_id: str, lat: float, lng: float, timestamp: float) -> tuple:
+        """
+        Smooths one GPS fix. Returns the filtered (lat, lng).
+        """
+        slot = self.slots.get(device_id)
+        if slot is None:
+            self._reset_slot(self._allocate(device_id), lat, lng, timestamp)
+            return lat, lng
+
+        last_ts = float(self.last_ts[slot])
+        dt = max(timestamp - last_ts, 0.0) # Out-of-order fix: update without predicting backwards
+        rows = self.S[slot].tolist()
+        for axis, z, m in zip((0, 1), (lat, lng), meters_per_degree(lat)):
+            rows[axis] = _predict_update(*rows[axis], z, dt,
+                                         (self.gps_accuracy_m / m) ** 2, (self.accel_noise / m) ** 2)
+
+        if not all(math.isfinite(value) for row in rows for value in row):
+            SYSTEM_METRICS['kalman_failures'] += 1
+            self._reset_slot(slot, lat, lng, timestamp)
+            return lat, lng
+
+        self.S[slot] = rows
+        self.last_ts[slot] = max(last_ts, timestamp)
+        return rows[0][POS], rows[1][POS]
+
+    def step_batch(self, device_ids, lats, lngs, timestamps) -> tuple:
+        """
+        Smooths a batch of fixes. Returns (lats, lngs) arrays aligned with the input.
+        Repeated device_ids are applied in arrival order (one vectorized round per repeat).
+        """
+        lats = np.asarray(lats, dtype=float)
+        lngs = np.asarray(lngs, dtype=float)
+        timestamps = np.asarray(timestamps, dtype=float)
+        out_lat = lats.copy()
+        out_lng = lngs.copy()
+
+        rounds = []
+        seen = {}
+        slots = np.empty(len(lats), dtype=np.intp)
+        fresh = np.zeros(len(lats), dtype=bool) # First fix of a never-seen device
+        for i, device_id in enumerate(device_ids):
+            k = seen.get(device_id, 0)
+            seen[device_id] = k + 1
+            if k == len(rounds):
+                rounds.append([])
+            rounds[k].append(i)
+            slot = self.slots.get(device_id)
+            if slot is None:
+                slot = self._allocate(device_id)
+                fresh[i] = True
+            slots[i] = slot
+
+        for members in rounds:
+            idx = np.asarray(members, dtype=np.intp)
+            new = idx[fresh[idx]]
+            if len(new):
+                self._reset_slots(slots[new], lats[new], lngs[new], timestamps[new])
+            old = idx[~fresh[idx]]
+            if len(old):
+                out_lat[old], out_lng[old] = self._step_slots(slots[old], lats[old], lngs[old], timestamps[old])
+        return out_lat, out_lng
+
+    def _noise(self, lats: np.ndarray):
+        """Per-row (R, Q) in deg^2, shape (n, 2)."""
+        m = np.empty((len(lats), 2))
+        m[:, 0] = METERS_PER_DEG_LAT
+        m[:, 1] = METERS_PER_DEG_LAT * np.maximum(np.cos(np.radians(lats)), MIN_COS_LAT)
+        return (self.gps_accuracy_m / m) ** 2, (self.accel_noise / m) ** 2, m
+
+    def _reset_slots(self, slots, lats, lngs, timestamps):
+        r, _, m = self._noise(lats)
+        rows = np.zeros((len(slots), 2, 5))
+        rows[:, 0, POS] = lats
+        rows[:, 1, POS] = lngs
+        rows[:, :, P00] = r
+        rows[:, :, P11] = (self.initial_speed_m_s / m) ** 2
+        self.S[slots] = rows
+        self.last_ts[slots] = timestamps
+
+    def _step_slots(self, slots, lats, lngs, timestamps):
+        S = self.S[slots]
+        last_ts = self.last_ts[slots]
+        dt = np.maximum(timestamps - last_ts, 0.0)[:, None]
+        r, q, _ = self._noise(lats)
+        z = np.stack([lats, lngs], axis=1)
+
+        new = np.stack(_predict_update(S[..., POS], S[..., VEL], S[..., P00], S[..., P01], S[..., P11],
+                                       z, dt, r, q), axis=-1)
+
+        bad = ~np.isfinite(new).all(axis=(1, 2))
+        if bad.any():
+            SYSTEM_METRICS['kalman_failures'] += int(bad.sum())
+            self._reset_slots(slots[bad], lats[bad], lngs[bad], timestamps[bad])
+            good = ~bad
+            slots, new, last_ts, timestamps = slots[good], new[good], last_ts[good], timestamps[good]
+            new_lat, new_lng = lats.copy(), lngs.copy()
+            new_lat[good], new_lng[good] = new[:, 0, POS], new[:, 1, POS]
+        else:
+            new_lat, new_lng = new[:, 0, POS], new[:, 1, POS]
+
+        self.S[slots] = new
+        self.last_ts[slots] = np.maximum(last_ts, timestamps)
+        return new_lat, new_lng
+
+KALMAN_BANK = KalmanFilterBank(
+    gps_accuracy_m=settings.KALMAN_GPS_ACCURACY_M,
+    accel_noise=settings.KALMAN_ACCEL_NOISE,
+    initial_speed_m_s=settings.KALMAN_INITIAL_SPEED_M_S
+)
@@ -4,6 +4,7 @@ from typing import List
 class MerkleTree:
     def __init__(self):
         self.leaves = []
+        self.layers = []
         self.root = None
 
     def add_leaf(self, data: str):
@@ -19,6 +20,7 @@ class MerkleTree:
             return None
             
         current_layer = self.leaves
+        self.layers = [current_layer]
         
         while len(current_layer) > 1:
             next_layer = []
@@ -33,10 +35,31 @@ class MerkleTree:
                 combined = hashlib.sha256((node1 + node2).encode()).hexdigest()
                 next_layer.append(combined)
             current_layer = next_layer
+            self.layers.append(current_layer)
             
         self.root = current_layer[0]
         return self.root
 
+    def proof(self, index: int) -> List[dict]:
+        """
+        Inclusion proof for leaf `index` (call build() first): sibling hashes from
+        leaf to root, each tagged with the side it is concatenated on.
+        """
+        path = []
+        for layer in self.layers[:-1]:
+            sibling = index ^ 1
+            node = layer[sibling] if sibling < len(layer) else layer[index]
+            path.append({"hash": node, "position": "left" if sibling < index else "right"})
+            index //= 2
+        return path
+
+def verify_merkle_proof(leaf_data: str, proof: List[dict], root: str) -> bool:
+    node = hashlib.sha256(leaf_data.encode()).hexdigest()
+    for step in proof:
+        pair = step["hash"] + node if step["position"] == "left" else node + step["hash"]
+        node = hashlib.sha256(pair.encode()).hexdigest()
+    return node == root
+
 def generate_telemetry_merkle_root(telemetry_batch: List[dict]) -> str:
     """
     Takes a batch of telemetry objects, serializes them canonically, 
@@ -0,0 +1,186 @@
+import math
+import time
+
+# --- INGESTION OBSERVABILITY (Latency Histograms + Sliding Throughput) ---
+# HDR-style log-linear histograms: 32 linear buckets below 32us, then 16 sub-buckets
+# per power of two (<= ~3% relative error) up to 60s. Fixed ~370 ints per histogram,
+# O(1) record. Quantiles are reported over a sliding window (current + previous
+# interval) so they track CURRENT load, while _sum/_count stay monotonic for Prometheus.
+
+SUB_BUCKETS = 32
+HALF_SUB_BUCKETS = SUB_BUCKETS // 2
+MAX_VALUE_US = 60_000_000 # 60s
+_MAX_SHIFT = MAX_VALUE_US.bit_length() - 5
+BUCKET_COUNT = SUB_BUCKETS + _MAX_SHIFT * HALF_SUB_BUCKETS
+
+QUANTILES = (0.5, 0.99, 0.999)
+
+def _bucket_index(value_us: int) -> int:
+    if value_us < SUB_BUCKETS:
+        return value_us
+    shift = value_us.bit_length() - 5
+    return SUB_BUCKETS + (shift - 1) * HALF_SUB_BUCKETS + ((value_us >> shift) - HALF_SUB_BUCKETS)
+
+def _bucket_midpoint(index: int) -> float:
+    if index < SUB_BUCKETS:
+        return float(index)
+    k = index - SUB_BUCKETS
+    shift = k // HALF_SUB_BUCKETS + 1
+    top = k % HALF_SUB_BUCKETS + HALF_SUB_BUCKETS
+    return ((top << shift) + ((top + 1) << shift)) / 2.0
+
+class LatencyHistogram:
+    def __init__(self, window_seconds: float = 60.0):
+        self.window_seconds = window_seconds
+        self.current = [0] * BUCKET_COUNT
+        self.previous = [0] * BUCKET_COUNT
+        self.window_start = time.monotonic()
+        self.count = 0      # Lifetime
+        self.sum_us = 0     # Lifetime
+
+    def _rotate(self, now: float):
+        if now - self.window_start >= self.window_seconds:
+            # Skipped a whole window => previous is stale too
+            stale = now - self.window_start >= 2 * self.window_seconds
+            self.previous = [0] * BUCKET_COUNT if stale else self.current
+            self.current = [0] * BUCKET_COUNT
+            self.window_start = now
+
+    def record(self, value_us: int):
+        if value_us < 0:
+            value_us = 0
+        elif value_us > MAX_VALUE_US:
+            value_us = MAX_VALUE_US
+        self._rotate(time.monotonic())
+        self.current[_bucket_index(value_us)] += 1
+        self.count += 1
+        self.sum_us += value_us
+
+    def percentiles(self, quantiles=QUANTILES) -> dict:
+        """Returns {q: latency_us} over the sliding window (0.0 when empty)."""
+        self._rotate(time.monotonic())
+        merged = [a + b for a, b in zip(self.current, self.previous)]
+        total = sum(merged)
+        result = {q: 0.0 for q in quantiles}
+        if total == 0:
+            return result
+
+        targets = sorted((max(1, math.ceil(q * total)), q) for q in quantiles)
+        seen = 0
+        t = 0
+        for index, n in enumerate(merged):
+            if not n:
+                continue
+            seen += n
+            while t < len(targets) and seen >= targets[t][0]:
+                result[targets[t][1]] = _bucket_midpoint(index)
+                t += 1
+            if t == len(targets):
+                break
+        return result
+
+class StageTimer:
+    """Context manager: `with stage_timer("risk"): ...` (safe across awaits)."""
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: LatencyHistogram):
+        self.histogram = histogram
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.record((time.perf_counter_ns() - self.start) // 1000)
+        return False
+
+class SlidingThroughput:
+    """Per-second ring buffer (60 slots) -> packets/sec over 1s / 10s / 60s."""
+    SLOTS = 60
+
+    def __init__(self):
+        self.counts = [0] * self.SLOTS
+        self.seconds = [0] * self.SLOTS
+
+    def mark(self, n: int = 1):
+        sec = int(time.monotonic())
+        idx = sec % self.SLOTS
+        if self.seconds[idx] != sec:
+            self.seconds[idx] = sec
+            self.counts[idx] = 0
+        self.counts[idx] += n
+
+    def rate(self, window: int) -> float:
+        """Average over the last `window` COMPLETE seconds."""
+        now = int(time.monotonic())
+        total = 0
+        for sec in range(now - window, now):
+            idx = sec % self.SLOTS
+            if self.seconds[idx] == sec:
+                total += self.counts[idx]
+        return total / window
+
+INGEST_STAGES = ("auth", "signature", "biometrics", "kalman", "cache_update", "risk", "broadcast", "background_db")
+STAGE_HISTOGRAMS = {stage: LatencyHistogram() for stage in INGEST_STAGES}
+INGESTION_THROUGHPUT = SlidingThroughput()
+THROUGHPUT_WINDOWS = (1, 10, 60)
+
+def stage_timer(stage: str) -> StageTimer:
+    return StageTimer(STAGE_HISTOGRAMS[stage])
+
+def ingestion_rates() -> dict:
+    return {f"{w}s": round(INGESTION_THROUGHPUT.rate(w), 2) for w in THROUGHPUT_WINDOWS}
+
+def latency_summary_ms() -> dict:
+    """Compact p50/p99/p999 per stage for the JSON health endpoint."""
+    summary = {}
+    for stage, hist in STAGE_HISTOGRAMS.items():
+        p = hist.percentiles()
+        summary[stage] = {f"p{str(q)[2:].ljust(2, '0')}": round(v / 1000.0, 3) for q, v in p.items()}
+    return summary
+
+def render_prometheus(system_metrics: dict) -> str:
+    """
+    Prometheus text exposition format (v0.0.4).
+    """
+    lines = [
+        "# HELP prahari_stage_latency_seconds Ingestion stage latency (sliding-window quantiles).",
+        "# TYPE prahari_stage_latency_seconds summary",
+    ]
+    for stage, hist in STAGE_HISTOGRAMS.items():
+        for q, v in hist.percentiles().items():
+            lines.append(f'prahari_stage_latency_seconds{{stage="{stage}",quantile="{q}"}} {v / 1e6:.9f}')
+        lines.append(f'prahari_stage_latency_seconds_sum{{stage="{stage}"}} {hist.sum_us / 1e6:.6f}')
+        lines.append(f'prahari_stage_latency_seconds_count{{stage="{stage}"}} {hist.count}')
+
+    lines += [
+        "# HELP prahari_ingestion_packets_total Attested telemetry packets processed since boot.",
+        "# TYPE prahari_ingestion_packets_total counter",
+        f"prahari_ingestion_packets_total {system_metrics.get('ingestion_count', 0)}",
+        "# HELP prahari_ingestion_rate Packets per second over a sliding window.",
+        "# TYPE prahari_ingestion_rate gauge",
+    ]
+    for w in THROUGHPUT_WINDOWS:
+        lines.append(f'prahari_ingestion_rate{{window="{w}s"}} {INGESTION_THROUGHPUT.rate(w):.3f}')
+
+    admission = system_metrics.get('admission')
+    if admission:
+        lines += [
+            "# HELP prahari_admission_decisions_total Admission-control decisions by outcome.",
+            "# TYPE prahari_admission_decisions_total counter",
+        ]
+        for decision in ("priority", "admitted", "deferred", "coalesced", "superseded", "shed"):
+            lines.append(f'prahari_admission_decisions_total{{decision="{decision}"}} {admission.get(decision, 0)}')
+        lines += [
+            "# TYPE prahari_admission_pending gauge",
+            f"prahari_admission_pending {admission.get('pending', 0)}",
+            "# TYPE prahari_event_loop_lag_seconds gauge",
+            f"prahari_event_loop_lag_seconds {admission.get('loop_lag_ms', 0.0) / 1000.0:.6f}",
+        ]
+
+    lines += [
+        "# TYPE prahari_active_devices gauge",
+        f"prahari_active_devices {system_metrics.get('active_users', 0)}",
+    ]
+    return "\n".join(lines) + "\n"
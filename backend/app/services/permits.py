@@ -0,0 +1,337 @@
+import asyncio
+import time
+from app.core.config import settings
+from app.core.shared_state import LATEST_POSITIONS, SYSTEM_METRICS
+from app.services import identity
+
+# --- PERMIT SERVICE (TTL Cache + Coalescing + SWR + Circuit Breaker) ---
+# Permit checks sit on the per-packet slow path, so a chain lookup must never be
+# paid inline more than once per DID per TTL:
+#   fresh  (age < TTL)        -> served from memory (dict hit)
+#   stale  (age >= TTL)       -> served from memory, ONE background refresh queued
+#   miss                      -> awaited; concurrent callers share one in-flight call
+# Chain calls use AsyncWeb3 (no worker thread parked on a 0.5s socket timeout) and
+# go through a circuit breaker: after PERMIT_BREAKER_FAILURES consecutive failures
+# the chain is not called for PERMIT_BREAKER_RESET_SECONDS, then a single half-open
+# probe decides whether to close it again. While open, answers come from cache with
+# the same grace labelling as before (24h MEDIUM confidence, then LOW).
+#
+# Fleet sync (run_permit_sync_loop) keeps the cache warm so the per-DID path is
+# rarely taken at all: every registered DID is loaded at startup in JSON-RPC batches
+# of PERMIT_PREFETCH_BATCH eth_calls (one HTTP round trip per chunk), entries about
+# to go stale are re-swept every PERMIT_PREFETCH_SECONDS, and PermitIssued /
+# PermitRevoked / EmergencyAlert logs are polled so a changed permit is re-read
+# within PERMIT_EVENT_POLL_SECONDS instead of waiting out its TTL.
+
+MOCK_PERMIT = "[Blockchain Offline] Verified Permit: #MOCK-001. Status: Active (Cached/SafeMode)."
+UNKNOWN_PERMIT = "Verified Permit: UNKNOWN (DID not in Registry). Status: Invalid."
+NO_CACHE_PERMIT = "[CRITICAL] Blockchain Unreachable & No Cache. Manual Verify Required."
+PENDING_PERMIT = "Verified Permit: PENDING (On-Chain lookup in progress)."
+
+CLOSED = "CLOSED"
+OPEN = "OPEN"
+HALF_OPEN = "HALF_OPEN"
+
+# Events after which the stored permits(address) tuple differs (tourist is topic 1)
+PERMIT_EVENTS = ("PermitIssued(address,uint256)", "PermitRevoked(address)", "EmergencyAlert(address,string)")
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_inflight = False
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self._probe_inflight:
+            self._probe_inflight = True # Exactly one probe per half-open period
+            return True
+        return False
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self._probe_inflight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_inflight = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+def format_permit(permit_data, now: float = None) -> tuple:
+    """permits(address) tuple -> (display string, raw status)."""
+    identity_hash = permit_data[0].hex()[:8] + "..."
+    expiry = permit_data[2]
+    is_active = permit_data[3]
+    emergency = permit_data[4]
+
+    status = "Active" if is_active else "Revoked"
+    if emergency: status = "EMERGENCY FLAG"
+    if (time.time() if now is None else now) > expiry: status = "EXPIRED"
+    return f"Verified Permit: #{identity_hash}. Status: {status} [On-Chain]", status
+
+class PermitService:
+    def __init__(self, ttl: float, grace: float, call_timeout: float, breaker: CircuitBreaker):
+        self.ttl = ttl
+        self.grace = grace
+        self.call_timeout = call_timeout
+        self.breaker = breaker
+        self.cache = {}     # did -> {"data", "raw_status", "timestamp" (wall), "fetched" (monotonic)}
+        self._inflight = {} # did -> asyncio.Task
+        self._w3 = None
+        self._contract = None
+        self._w3_loop = None
+        self._event_topics = None
+        self._last_block = None
+        self.stats = {
+            "hits": 0,
+            "stale_served": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "chain_calls": 0,
+            "chain_failures": 0,
+            "batch_calls": 0,
+            "prefetched": 0,
+            "events_seen": 0,
+            "last_event_block": None,
+            "breaker": CLOSED
+        }
+        SYSTEM_METRICS['permits'] = self.stats
+
+    # 1. Chain access (AsyncWeb3, created per event loop)
+    def _async_contract(self):
+        loop = asyncio.get_running_loop()
+        if self._contract is None or self._w3_loop is not loop:
+            from web3 import AsyncWeb3
+            # Retries are the breaker's job; web3's own backoff would stretch every failure
+            self._w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(identity.NETWORK_URL,
+                                                             request_kwargs={'timeout': self.call_timeout},
+                                                             exception_retry_configuration=None))
+            self._contract = self._w3.eth.contract(address=identity.CONTRACT_ADDRESS, abi=identity.CONTRACT_ABI)
+            self._w3_loop = loop
+        return self._contract
+
+    async def fetch_chain(self, eth_address: str):
+        self.stats["chain_calls"] += 1
+        contract = self._async_contract()
+        return await asyncio.wait_for(contract.functions.permits(eth_address).call(), self.call_timeout)
+
+    async def fetch_chain_batch(self, addresses: list) -> list:
+        """permits(address) for many addresses in one batched JSON-RPC request."""
+        self.stats["batch_calls"] += 1
+        contract = self._async_contract()
+        async with self._w3.batch_requests() as batch:
+            for address in addresses:
+                batch.add(contract.functions.permits(address))
+            return await asyncio.wait_for(batch.async_execute(), settings.PERMIT_BATCH_TIMEOUT_SECONDS)
+
+    async def fetch_permit_logs(self) -> list:
+        """
+        Permit-changing logs since the last poll. The first poll only records the
+        chain head: the startup prefetch already reflects everything before it.
+        """
+        contract = self._async_contract()
+        head = await asyncio.wait_for(self._w3.eth.block_number, self.call_timeout)
+        if self._last_block is None:
+            self._last_block = self.stats["last_event_block"] = head
+            return []
+        if head <= self._last_block:
+            return []
+        if self._event_topics is None:
+            from web3 import Web3
+            self._event_topics = [Web3.keccak(text=e).to_0x_hex() for e in PERMIT_EVENTS]
+        logs = await asyncio.wait_for(self._w3.eth.get_logs({
+            "address": contract.address,
+            "fromBlock": self._last_block + 1,
+            "toBlock": head,
+            "topics": [self._event_topics]
+        }), settings.PERMIT_BATCH_TIMEOUT_SECONDS)
+        self._last_block = head
+        self.stats["last_event_block"] = head
+        return logs
+
+    def _set_health(self):
+        self.stats["breaker"] = self.breaker.state
+        SYSTEM_METRICS['services']['blockchain'] = 'CONNECTED' if self.breaker.state == CLOSED else 'DEGRADED/OFFLINE'
+
+    async def _refresh(self, did: str) -> str:
+        eth_address = identity.tourist_mapping.get(did)
+        if not eth_address:
+            return UNKNOWN_PERMIT
+        if not self.breaker.allow():
+            return self._degraded(did)
+        try:
+            permit_data = await self.fetch_chain(eth_address)
+        except Exception as e:
+            self.stats["chain_failures"] += 1
+            was_closed = self.breaker.state == CLOSED
+            self.breaker.record_failure()
+            if was_closed and self.breaker.state == OPEN:
+                print(f"BLOCKCHAIN FAILURE: {type(e).__name__}: {e}. Permit breaker OPEN for {self.breaker.reset_timeout:.0f}s")
+            self._set_health()
+            return self._degraded(did)
+
+        self.breaker.record_success()
+        self._set_health()
+        return self._store(did, permit_data)
+
+    def _store(self, did: str, permit_data) -> str:
+        data, status = format_permit(permit_data)
+        self.cache[did] = {"data": data, "raw_status": status, "timestamp": time.time(), "fetched": time.monotonic()}
+        return data
+
+    def _degraded(self, did: str) -> str:
+        """Answer while the chain is unavailable (cache with grace labelling)."""
+        cached = self.cache.get(did)
+        if not cached:
+            return NO_CACHE_PERMIT
+        age = time.time() - cached['timestamp']
+        if age < self.grace:
+            return f"{cached['data']} (Source: Offline Cache, Age: {int(age/60)}m). Confidence: MEDIUM."
+        return f"{cached['data']} (Source: STALE CACHE). Confidence: LOW."
+
+    def _start_refresh(self, did: str) -> asyncio.Task:
+        task = self._inflight.get(did)
+        if task is None:
+            loop = asyncio.get_running_loop() # RuntimeError for sync callers, before a coroutine exists
+            task = loop.create_task(self._refresh(did))
+            self._inflight[did] = task
+            task.add_done_callback(lambda _t, d=did: self._inflight.pop(d, None))
+        else:
+            self.stats["coalesced"] += 1
+        return task
+
+    # 2. Public API
+    def peek(self, did: str):
+        """
+        Hot path (no await): the cached answer or None. A stale entry is still
+        returned and queues one background refresh (needs a running loop).
+        """
+        if identity.contract is None:
+            return MOCK_PERMIT
+        cached = self.cache.get(did)
+        if cached is None:
+            return None
+        if time.monotonic() - cached['fetched'] < self.ttl:
+            self.stats["hits"] += 1
+            return cached['data']
+        self.stats["stale_served"] += 1
+        try:
+            self._start_refresh(did)
+        except RuntimeError:
+            pass # No running loop (sync caller): served stale, refresh on next async call
+        if self.breaker.state != CLOSED:
+            return self._degraded(did)
+        return cached['data']
+
+    async def get(self, did: str) -> str:
+        result = self.peek(did)
+        if result is not None:
+            return result
+        self.stats["misses"] += 1
+        return await asyncio.shield(self._start_refresh(did))
+
+    def invalidate(self, did: str = None):
+        if did is None:
+            self.cache.clear()
+        else:
+            self.cache.pop(did, None)
+
+    # 3. Fleet sync (bulk prefetch + event invalidation)
+    def due_for_prefetch(self, horizon: float) -> list:
+        """
+        Registered DIDs that are uncached or go stale within `horizon` seconds,
+        devices currently reporting first.
+        """
+        cutoff = time.monotonic() - self.ttl + horizon
+        due = [d for d in identity.tourist_mapping
+               if d not in self.cache or self.cache[d]['fetched'] <= cutoff]
+        due.sort(key=lambda d: d not in LATEST_POSITIONS)
+        return due
+
+    async def prefetch(self, dids: list) -> int:
+        """Loads permits for `dids` in batched requests; returns the number cached."""
+        if identity.contract is None:
+            return 0
+        dids = [d for d in dids if identity.tourist_mapping.get(d)]
+        loaded = 0
+        for start in range(0, len(dids), settings.PERMIT_PREFETCH_BATCH):
+            chunk = dids[start:start + settings.PERMIT_PREFETCH_BATCH]
+            if not self.breaker.allow():
+                break # Chain down: the breaker's half-open probe decides when to resume
+            try:
+                results = await self.fetch_chain_batch([identity.tourist_mapping[d] for d in chunk])
+            except Exception as e:
+                self.stats["chain_failures"] += 1
+                self.breaker.record_failure()
+                self._set_health()
+                print(f"PERMITS: Batch prefetch failed ({type(e).__name__}: {e}); {len(dids) - start} DIDs left cold")
+                break
+            self.breaker.record_success()
+            self._set_health()
+            for did, permit_data in zip(chunk, results):
+                if isinstance(permit_data, (tuple, list)):
+                    self._store(did, permit_data)
+                    loaded += 1
+        self.stats["prefetched"] += loaded
+        return loaded
+
+    async def sync_events(self) -> list:
+        """Invalidates and re-reads the DIDs touched by permit events; returns them."""
+        if identity.contract is None or self.breaker.state != CLOSED:
+            return []
+        logs = await self.fetch_permit_logs()
+        if not logs:
+            return []
+        by_address = {a.lower(): d for d, a in identity.tourist_mapping.items()}
+        affected = set()
+        for log in logs:
+            topics = log["topics"]
+            if len(topics) < 2:
+                continue
+            did = by_address.get("0x" + bytes(topics[1])[-20:].hex())
+            if did:
+                affected.add(did)
+        self.stats["events_seen"] += len(logs)
+        for did in affected:
+            self.invalidate(did)
+        if affected:
+            print(f"PERMITS: {len(logs)} permit events -> re-reading {len(affected)} DIDs")
+            await self.prefetch(sorted(affected))
+        return sorted(affected)
+
+async def run_permit_sync_loop():
+    """
+    Background Task: Warm the permit cache for the whole registry at startup, poll
+    permit events every PERMIT_EVENT_POLL_SECONDS and re-sweep entries nearing
+    expiry every PERMIT_PREFETCH_SECONDS.
+    """
+    if identity.contract is None:
+        return
+    loaded = await PERMITS.prefetch(PERMITS.due_for_prefetch(0.0))
+    print(f"PERMITS: Prefetched {loaded}/{len(identity.tourist_mapping)} registered permits")
+    last_sweep = time.monotonic()
+    while True:
+        await asyncio.sleep(settings.PERMIT_EVENT_POLL_SECONDS)
+        try:
+            await PERMITS.sync_events()
+            if time.monotonic() - last_sweep >= settings.PERMIT_PREFETCH_SECONDS:
+                last_sweep = time.monotonic()
+                await PERMITS.prefetch(PERMITS.due_for_prefetch(settings.PERMIT_PREFETCH_SECONDS))
+        except Exception as e:
+            print(f"PERMITS: Sync loop error: {type(e).__name__}: {e}")
+
+PERMITS = PermitService(
+    ttl=settings.PERMIT_TTL_SECONDS,
+    grace=settings.PERMIT_GRACE_SECONDS,
+    call_timeout=settings.PERMIT_CALL_TIMEOUT_SECONDS,
+    breaker=CircuitBreaker(settings.PERMIT_BREAKER_FAILURES, settings.PERMIT_BREAKER_RESET_SECONDS)
+)
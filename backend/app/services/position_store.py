@@ -0,0 +1,61 @@
+# --- POSITION STORE (Dirty-Key Tracking for DR Snapshots) ---
+# Drop-in replacement for the LATEST_POSITIONS dict ({ "device_id": snapshot }).
+# Reads are plain dict reads; writes and deletes also record the key, so the DR
+# snapshotter (app/snapshots.py) ships only what changed since its last delta.
+# In-place changes to a stored entry are NOT tracked: code that updates an entry
+# later (e.g. the fleet re-score) must write it back through the store.
+
+class PositionStore(dict):
+    def __init__(self):
+        super().__init__()
+        self.dirty = set()   # Keys written since the last take_changes()
+        self.deleted = set() # Keys removed since the last take_changes()
+
+    # 1. Tracked writes
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self.dirty.add(key)
+        self.deleted.discard(key)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self.dirty.discard(key)
+        self.deleted.add(key)
+
+    def pop(self, key, *default):
+        if key in self:
+            self.dirty.discard(key)
+            self.deleted.add(key)
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        self.dirty.discard(key)
+        self.deleted.add(key)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        self.deleted.update(self.keys())
+        self.dirty.clear()
+        dict.clear(self)
+
+    # 2. Snapshot support
+    def take_changes(self) -> tuple:
+        """(dirty keys, deleted keys) since the last call; tracking restarts empty."""
+        dirty, deleted = self.dirty, self.deleted
+        self.dirty, self.deleted = set(), set()
+        return dirty, deleted
+
+    def restore(self, entries: dict):
+        """Bulk load without marking keys dirty (restoring from a snapshot)."""
+        for key, value in entries.items():
+            dict.__setitem__(self, key, value)
@@ -0,0 +1,69 @@
+import time
+from collections import OrderedDict
+
+# --- BOUNDED ANTI-DDOS TABLES ---
+# Every per-source table is a fixed-capacity LRU: a spoofed-source flood can only
+# recycle slots, never grow memory. Evicting an idle source simply resets it to
+# a full bucket / zero count, which errs on the side of letting it through.
+# All access happens on the event loop thread, so no locks are needed.
+
+class RateLimiter:
+    """
+    Token Bucket per key (IP, device_id, ...), monotonic clock, LRU-capped.
+    """
+    def __init__(self, rate=100, per=1.0, burst=None, capacity=100_000):
+        self.rate = rate / per          # Tokens per second
+        self.burst = float(burst if burst is not None else rate)
+        self.capacity = capacity
+        self.evictions = 0
+        self._buckets = OrderedDict()   # key -> [tokens, last_refill]
+
+    def check(self, key: str) -> bool:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+
+        if bucket is None:
+            if len(self._buckets) >= self.capacity:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+            self._buckets[key] = [self.burst - 1.0, now]
+            return True
+
+        self._buckets.move_to_end(key)
+        tokens = bucket[0] + (now - bucket[1]) * self.rate
+        if tokens > self.burst:
+            tokens = self.burst
+        bucket[1] = now
+
+        if tokens < 1.0:
+            bucket[0] = tokens
+            return False # Reject
+
+        bucket[0] = tokens - 1.0
+        return True
+
+    def __len__(self):
+        return len(self._buckets)
+
+class BoundedCounter:
+    """
+    LRU-capped counter (e.g. auth failures per IP).
+    """
+    def __init__(self, capacity=100_000):
+        self.capacity = capacity
+        self.evictions = 0
+        self._counts = OrderedDict()
+
+    def increment(self, key: str) -> int:
+        count = self._counts.pop(key, 0) + 1
+        if len(self._counts) >= self.capacity:
+            self._counts.popitem(last=False)
+            self.evictions += 1
+        self._counts[key] = count
+        return count
+
+    def __getitem__(self, key: str) -> int:
+        return self._counts.get(key, 0)
+
+    def __len__(self):
+        return len(self._counts)
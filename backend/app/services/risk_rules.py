@@ -0,0 +1,270 @@
+import json
+import os
+import time
+import numpy as np
+from app.core.config import settings
+from app.core.shared_state import SYSTEM_METRICS
+from app.models import AlertType
+
+# --- RISK RULES (Declarative JSON -> Compiled Plan) ---
+# The weights live in app/core/risk_rules.json instead of being hard-coded in the
+# engine. A rule set is compiled ONCE (at boot / on reload) into a flat RulePlan:
+# every condition becomes a pair of closures built from the same spec, one over a
+# scalar context (per-packet path) and one over numpy columns (batch path), so
+# calculate_risk and calculate_risk_batch cannot drift apart.
+#
+#   rules     : applied in file order ("add" or "multiply" the running score)
+#   overrides : checked after scoring, first match wins; the score is pinned and
+#               only that factor is reported (e.g. SOS)
+#   thresholds: highest min_score first; anything below is SAFE
+#   alerts    : (status [, factor]) -> AlertType, used by detect_anomalies
+#
+# The file is re-checked (mtime) at most every RISK_RULES_RELOAD_CHECK_SECONDS; an
+# invalid edit is rejected and the previous plan keeps serving.
+
+STATUSES = ("SAFE", "WARNING", "CRITICAL")
+MAX_FACTORS = 63 # Factors are bits of an int64 mask in evaluate_batch
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "core", "risk_rules.json")
+
+class RuleError(ValueError):
+    pass
+
+def _levels(arg) -> frozenset:
+    return frozenset(arg if isinstance(arg, list) else [arg])
+
+def _compile_condition(key: str, arg, night_hours: tuple) -> tuple:
+    """
+    Returns (scalar(ctx, score) -> bool, vector(cols, score) -> bool[]).
+    """
+    if key == "zone_risk":
+        levels = _levels(arg)
+        return (
+            lambda c, s: c["zone_risk"] in levels,
+            lambda c, s: np.array([z.risk_level in levels for z in c["zones"]] + [False])[c["hits"]]
+        )
+    if key == "in_zone":
+        want = bool(arg)
+        return (lambda c, s: c["in_zone"] == want, lambda c, s: (c["hits"] >= 0) == want)
+    if key == "speed_below":
+        limit = float(arg)
+        return (lambda c, s: c["speed"] < limit, lambda c, s: c["speed"] < limit)
+    if key == "speed_at_least":
+        limit = float(arg)
+        return (lambda c, s: c["speed"] >= limit, lambda c, s: c["speed"] >= limit)
+    if key == "score_above":
+        limit = float(arg)
+        return (lambda c, s: s > limit, lambda c, s: s > limit)
+    if key == "panic":
+        want = bool(arg)
+        return (lambda c, s: c["panic"] == want, lambda c, s: c["panic"] == want)
+    if key == "night":
+        want = bool(arg)
+        start, end = night_hours
+        if start > end: # Window wraps midnight
+            return (lambda c, s: (c["hour"] >= start or c["hour"] < end) == want,
+                    lambda c, s: ((c["hour"] >= start) | (c["hour"] < end)) == want)
+        return (lambda c, s: (start <= c["hour"] < end) == want,
+                lambda c, s: ((c["hour"] >= start) & (c["hour"] < end)) == want)
+    if key == "weather_in":
+        conditions = _levels(arg)
+        return (
+            lambda c, s: c["weather"] in conditions,
+            lambda c, s: np.array([w in conditions for w in c["conditions"]] + [False])[c["weather"]]
+        )
+    raise RuleError(f"Unknown condition '{key}'")
+
+def _compile_when(when: dict, night_hours: tuple) -> tuple:
+    if not isinstance(when, dict) or not when:
+        raise RuleError("'when' must be a non-empty object")
+    pairs = [_compile_condition(k, v, night_hours) for k, v in when.items()]
+    scalar, vector = pairs[0]
+    # Fold into nested short-circuit closures (no per-call generator / list)
+    for next_scalar, next_vector in pairs[1:]:
+        scalar = (lambda a, b: lambda c, s: a(c, s) and b(c, s))(scalar, next_scalar)
+        vector = (lambda a, b: lambda c, s: a(c, s) & b(c, s))(vector, next_vector)
+    return scalar, vector
+
+class RulePlan:
+    """
+    A compiled rule set. Factors are numbered in file order (bit k = factor_names[k]).
+    """
+    def __init__(self, raw: dict, source: str = "<memory>"):
+        self.version = raw.get("version", 0)
+        self.source = source
+        self.max_score = float(raw.get("max_score", 100))
+        night = raw.get("night_hours", {"start": 18, "end": 5})
+        night_hours = (int(night["start"]), int(night["end"]))
+
+        self.factor_names = []
+        self.detail = [] # Per bit: None | "weather"
+
+        def bit_for(factor, detail=None) -> int:
+            if factor is None:
+                return 0
+            if factor not in self.factor_names:
+                if len(self.factor_names) >= MAX_FACTORS:
+                    raise RuleError(f"Too many factors (max {MAX_FACTORS}: factors are an int64 bitmask)")
+                self.factor_names.append(factor)
+                self.detail.append(detail)
+            return 1 << self.factor_names.index(factor)
+
+        # 1. Overrides (first match wins)
+        self.overrides = []
+        for o in raw.get("overrides", []):
+            if "factor" not in o or "score" not in o:
+                raise RuleError("Override needs 'factor' (may be null) and 'score'")
+            scalar, vector = _compile_when(o.get("when"), night_hours)
+            self.overrides.append((scalar, vector, min(float(o["score"]), self.max_score),
+                                   bit_for(o["factor"]), o["factor"]))
+
+        # 2. Scoring steps
+        self.steps = []
+        for r in raw.get("rules", []):
+            if ("add" in r) == ("multiply" in r):
+                raise RuleError(f"Rule {r.get('factor')} needs exactly one of 'add' / 'multiply'")
+            if r.get("detail") not in (None, "weather"):
+                raise RuleError(f"Unknown detail '{r['detail']}'")
+            scalar, vector = _compile_when(r.get("when"), night_hours)
+            multiply = "multiply" in r
+            value = float(r["multiply"] if multiply else r["add"])
+            bit = bit_for(r.get("factor"), r.get("detail"))
+            self.steps.append((scalar, vector, multiply, value, bit, r.get("factor"), r.get("detail")))
+
+        # 3. Thresholds (highest first)
+        self.thresholds = []
+        for t in sorted(raw.get("thresholds", []), key=lambda t: -float(t["min_score"])):
+            if t["status"] not in STATUSES[1:]:
+                raise RuleError(f"Unknown status '{t['status']}'")
+            self.thresholds.append((float(t["min_score"]), t["status"], STATUSES.index(t["status"])))
+
+        # 4. Alert mapping
+        self.alerts = []
+        for a in raw.get("alerts", []):
+            if a["status"] not in STATUSES:
+                raise RuleError(f"Unknown status '{a['status']}'")
+            try:
+                alert_type = AlertType[a["alert"]]
+            except KeyError:
+                raise RuleError(f"Unknown alert type '{a['alert']}'")
+            factor = a.get("factor")
+            if factor is not None and factor not in self.factor_names:
+                raise RuleError(f"Alert mapping references unknown factor '{factor}'")
+            self.alerts.append((a["status"], factor, alert_type))
+
+    def status_of(self, score: float) -> str:
+        for min_score, status, _ in self.thresholds:
+            if score >= min_score:
+                return status
+        return "SAFE"
+
+    def evaluate(self, ctx: dict) -> dict:
+        """
+        ctx: zone_risk (str | None), in_zone, speed, hour, weather, panic.
+        Returns: { "score": int, "status": str, "factors": list }
+        """
+        score = 0.0
+        factors = []
+        for scalar, _, multiply, value, _, factor, detail in self.steps:
+            if scalar(ctx, score):
+                score = score * value if multiply else score + value
+                if factor is not None:
+                    factors.append(f"{factor}: {ctx['weather']}" if detail else factor)
+        score = min(score, self.max_score)
+
+        for scalar, _, pinned, _, factor in self.overrides:
+            if scalar(ctx, score):
+                return {"score": int(pinned), "status": self.status_of(pinned), "factors": [factor] if factor else []}
+        return {"score": int(score), "status": self.status_of(score), "factors": factors}
+
+    def evaluate_batch(self, cols: dict) -> tuple:
+        """
+        cols: hits/zones (zone_hits_batch), speed, hour, weather/conditions, panic.
+        Returns (score float[], status index[], factor bitmask[]).
+        """
+        n = len(cols["speed"])
+        score = np.zeros(n)
+        factors = np.zeros(n, dtype=np.int64)
+        for _, vector, multiply, value, bit, _, _ in self.steps:
+            mask = vector(cols, score)
+            score = np.where(mask, score * value if multiply else score + value, score)
+            if bit:
+                factors |= np.where(mask, bit, 0)
+        score = np.minimum(score, self.max_score)
+
+        # Overrides: apply the LAST first so the first match ends up on top
+        scored = score
+        for _, vector, pinned, bit, _ in reversed(self.overrides):
+            mask = vector(cols, scored)
+            score = np.where(mask, pinned, score)
+            factors = np.where(mask, bit, factors)
+
+        status = np.zeros(n, dtype=np.intp)
+        for min_score, _, index in reversed(self.thresholds):
+            status = np.where(score >= min_score, index, status)
+        return score, status, factors
+
+    def expand_factors(self, bits: int, condition: str) -> list:
+        return [
+            f"{name}: {condition}" if self.detail[k] else name
+            for k, name in enumerate(self.factor_names) if bits >> k & 1
+        ]
+
+    def alerts_for(self, report: dict) -> list:
+        """AlertTypes for a scalar risk report (status + factor names)."""
+        names = {f.split(":", 1)[0] for f in report["factors"]}
+        return [
+            alert_type for status, factor, alert_type in self.alerts
+            if report["status"] == status and (factor is None or factor in names)
+        ]
+
+class RuleEngine:
+    """
+    Holds the active RulePlan; re-reads the JSON when its mtime changes.
+    """
+    def __init__(self, path: str, check_interval: float):
+        self.path = path
+        self.check_interval = check_interval
+        self._mtime = None
+        self._next_check = 0.0
+        self.plan = None
+        self.status = {"version": None, "loaded_at": None, "path": path, "error": None}
+        SYSTEM_METRICS['risk_rules'] = self.status
+        self.reload(force=True)
+
+    def reload(self, force: bool = False) -> RulePlan:
+        """
+        Raises RuleError / OSError when the file is invalid; the previous plan stays active.
+        """
+        mtime = os.path.getmtime(self.path)
+        if not force and mtime == self._mtime:
+            return self.plan
+        try:
+            with open(self.path) as f:
+                plan = RulePlan(json.load(f), source=self.path)
+        except (ValueError, KeyError, TypeError) as e:
+            self._mtime = mtime # Don't retry a bad file on every check
+            self.status["error"] = f"{type(e).__name__}: {e}"
+            print(f"RULES: Rejected {self.path} ({self.status['error']}); keeping version {self.status['version']}")
+            raise RuleError(self.status["error"]) from e
+
+        self.plan = plan
+        self._mtime = mtime
+        self.status.update({"version": plan.version, "loaded_at": time.time(), "error": None})
+        print(f"RULES: Loaded risk rules v{plan.version} ({len(plan.steps)} rules, {len(plan.overrides)} overrides)")
+        return plan
+
+    def current(self) -> RulePlan:
+        """Hot path: a monotonic clock compare, plus a stat() every check_interval."""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            try:
+                self.reload()
+            except (RuleError, OSError):
+                pass # Logged in reload(); keep serving the last good plan
+        return self.plan
+
+RISK_RULES = RuleEngine(
+    settings.RISK_RULES_PATH or DEFAULT_RULES_PATH,
+    check_interval=settings.RISK_RULES_RELOAD_CHECK_SECONDS
+)
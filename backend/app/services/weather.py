@@ -0,0 +1,294 @@
+import asyncio
+import json
+import os
+import time
+import numpy as np
+from app.core.config import settings
+from app.core.shared_state import LATEST_POSITIONS, SYSTEM_METRICS
+
+# --- WEATHER CONTEXT (Geohash Tile Cache) ---
+# The risk engine runs per packet and must never wait on a weather API. Conditions
+# are cached per geohash tile (precision 6 ~ 1.2 x 0.6 km) and only ever read from
+# memory on the hot path:
+#   fresh  (age < TTL)          -> served
+#   stale  (TTL .. TTL + STALE) -> served, refresh queued (stale-while-revalidate)
+#   miss / expired              -> UNKNOWN (no risk points), fetch queued
+# A background loop prefetches tiles that have active devices before they expire.
+
+UNKNOWN = "Unknown"
+REFRESH_AHEAD = 0.8 # Prefetch active tiles once they reach 80% of TTL
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {c: i for i, c in enumerate(_BASE32)}
+
+def geohash_encode(lat: float, lng: float, precision: int) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    value = 0
+    even = True # Longitude first
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                value = (value << 1) | 1
+                lng_lo = mid
+            else:
+                value <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                value = (value << 1) | 1
+                lat_lo = mid
+            else:
+                value <<= 1
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+def geohash_encode_many(lats: np.ndarray, lngs: np.ndarray, precision: int) -> np.ndarray:
+    """
+    Vectorized geohash as integer codes (5 * precision bits, longitude first).
+    Bisecting the ranges is the same as quantizing them to 2^bits cells.
+    """
+    total = 5 * precision
+    lng_bits = (total + 1) // 2
+    lat_bits = total // 2
+    lng_q = np.clip(np.floor((np.asarray(lngs, dtype=float) + 180.0) / 360.0 * (1 << lng_bits)), 0, (1 << lng_bits) - 1).astype(np.int64)
+    lat_q = np.clip(np.floor((np.asarray(lats, dtype=float) + 90.0) / 180.0 * (1 << lat_bits)), 0, (1 << lat_bits) - 1).astype(np.int64)
+    codes = np.zeros(len(lng_q), dtype=np.int64)
+    for k in range(total):
+        if k % 2 == 0:
+            bit = (lng_q >> (lng_bits - 1 - k // 2)) & 1
+        else:
+            bit = (lat_q >> (lat_bits - 1 - k // 2)) & 1
+        codes = (codes << 1) | bit
+    return codes
+
+def geohash_from_code(code: int, precision: int) -> str:
+    return "".join(_BASE32[(code >> (5 * (precision - 1 - i))) & 31] for i in range(precision))
+
+def geohash_bbox(tile: str) -> tuple:
+    """(min_lat, min_lng, max_lat, max_lng) of a geohash tile."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    even = True
+    for c in tile:
+        v = _DECODE[c]
+        for shift in range(4, -1, -1):
+            bit = (v >> shift) & 1
+            if even:
+                mid = (lng_lo + lng_hi) / 2
+                lng_lo, lng_hi = (mid, lng_hi) if bit else (lng_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return lat_lo, lng_lo, lat_hi, lng_hi
+
+# --- PROVIDERS (blocking; always called off the event loop) ---
+
+class WeatherProvider:
+    def fetch(self, tile: str) -> str:
+        """Returns the condition for a geohash tile (e.g. 'Thunderstorm', 'Clear Sky')."""
+        raise NotImplementedError
+
+class FileWeatherProvider(WeatherProvider):
+    """
+    Local stand-in: bbox zones from a JSON file (re-read when the file changes).
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime = None
+        self._default = "Clear Sky"
+        self._zones = []
+
+    def _reload(self):
+        mtime = os.path.getmtime(self.path)
+        if mtime != self._mtime:
+            with open(self.path) as f:
+                raw = json.load(f)
+            self._default = raw.get("default", "Clear Sky")
+            self._zones = [(tuple(z["bbox"]), z["condition"]) for z in raw.get("zones", [])]
+            self._mtime = mtime
+
+    def fetch(self, tile: str) -> str:
+        self._reload()
+        lat_lo, lng_lo, lat_hi, lng_hi = geohash_bbox(tile)
+        for (z_lat_lo, z_lng_lo, z_lat_hi, z_lng_hi), condition in self._zones:
+            if z_lat_lo <= lat_hi and lat_lo <= z_lat_hi and z_lng_lo <= lng_hi and lng_lo <= z_lng_hi:
+                return condition
+        return self._default
+
+class OpenWeatherMapProvider(WeatherProvider):
+    """
+    Current conditions at the tile centre (https://openweathermap.org/current).
+    """
+    URL = "https://api.openweathermap.org/data/2.5/weather"
+    HEAVY_SNOW_CODES = (602, 622)
+
+    def __init__(self, api_key: str, timeout: float = 3.0):
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def fetch(self, tile: str) -> str:
+        import requests
+        lat_lo, lng_lo, lat_hi, lng_hi = geohash_bbox(tile)
+        res = requests.get(self.URL, timeout=self.timeout, params={
+            "lat": (lat_lo + lat_hi) / 2, "lon": (lng_lo + lng_hi) / 2, "appid": self.api_key
+        })
+        res.raise_for_status()
+        weather = res.json()["weather"][0]
+        main = weather["main"]
+        if main == "Snow":
+            return "Heavy Snow" if weather.get("id") in self.HEAVY_SNOW_CODES else "Snow"
+        if main == "Drizzle":
+            return "Rain"
+        if main in ("Mist", "Haze", "Smoke"):
+            return "Fog"
+        if main == "Clear":
+            return "Clear Sky"
+        return main
+
+def build_provider() -> WeatherProvider:
+    if settings.WEATHER_PROVIDER == "openweathermap":
+        return OpenWeatherMapProvider(settings.WEATHER_API_KEY)
+    path = settings.WEATHER_TILES_PATH or os.path.join(os.path.dirname(os.path.dirname(__file__)), "core", "weather_tiles.json")
+    return FileWeatherProvider(path)
+
+# --- TILE CACHE ---
+
+class WeatherTileCache:
+    def __init__(self, provider: WeatherProvider, precision: int, ttl: float, stale: float, concurrency: int):
+        self.provider = provider
+        self.precision = precision
+        self.ttl = ttl
+        self.stale = stale
+        self.concurrency = concurrency
+        self.tiles = {}       # tile -> [condition, fetched_at, last_used] (monotonic)
+        self.pending = set()  # Tiles to (re)fetch on the next loop tick
+        self.inflight = set()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "fetches": 0, "errors": 0, "tiles": 0}
+        SYSTEM_METRICS['weather'] = self.stats
+
+    def condition_at(self, lat: float, lng: float) -> str:
+        """Hot path: in-memory lookup only."""
+        return self._lookup(geohash_encode(lat, lng, self.precision))
+
+    def conditions_at(self, lats, lngs) -> tuple:
+        """
+        Batch lookup (one dict hit per distinct tile).
+        Returns (codes, conditions): conditions[codes[i]] is row i's condition.
+        """
+        tile_codes, inverse = np.unique(geohash_encode_many(lats, lngs, self.precision), return_inverse=True)
+        conditions = []
+        index = {}
+        per_tile = np.empty(len(tile_codes), dtype=np.intp)
+        for j, code in enumerate(tile_codes.tolist()):
+            condition = self._lookup(geohash_from_code(code, self.precision))
+            if condition not in index:
+                index[condition] = len(conditions)
+                conditions.append(condition)
+            per_tile[j] = index[condition]
+        return per_tile[inverse.reshape(-1)], conditions
+
+    def _lookup(self, tile: str) -> str:
+        entry = self.tiles.get(tile)
+        if entry is None:
+            self.stats["misses"] += 1
+            self.pending.add(tile)
+            return UNKNOWN
+
+        now = time.monotonic()
+        entry[2] = now
+        age = now - entry[1]
+        if age < self.ttl:
+            self.stats["hits"] += 1
+            return entry[0]
+
+        self.pending.add(tile)
+        if age < self.ttl + self.stale:
+            self.stats["stale_hits"] += 1
+            return entry[0]
+        self.stats["misses"] += 1
+        return UNKNOWN
+
+    def tiles_due(self, lat_lngs) -> set:
+        """Active tiles that are missing or close to expiry."""
+        now = time.monotonic()
+        due = set()
+        for lat, lng in lat_lngs:
+            tile = geohash_encode(lat, lng, self.precision)
+            entry = self.tiles.get(tile)
+            if entry is None or now - entry[1] >= self.ttl * REFRESH_AHEAD:
+                due.add(tile)
+        return due
+
+    def evict_idle(self):
+        """Drops tiles nobody has looked at for longer than TTL + STALE."""
+        cutoff = time.monotonic() - (self.ttl + self.stale)
+        for tile in [t for t, e in self.tiles.items() if e[2] < cutoff]:
+            del self.tiles[tile]
+        self.stats["tiles"] = len(self.tiles)
+
+    async def refresh(self, tiles):
+        tiles = set(tiles) - self.inflight
+        if not tiles:
+            return
+        self.inflight |= tiles
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch_one(tile):
+            async with semaphore:
+                try:
+                    condition = await asyncio.to_thread(self.provider.fetch, tile)
+                except Exception as e:
+                    self.stats["errors"] += 1 # Keep serving the stale value, retry next sweep
+                    print(f"WEATHER: Fetch failed for tile {tile}: {e}")
+                    return
+                finally:
+                    self.inflight.discard(tile)
+            now = time.monotonic()
+            previous = self.tiles.get(tile)
+            self.tiles[tile] = [condition, now, previous[2] if previous else now]
+            self.stats["fetches"] += 1
+
+        await asyncio.gather(*[fetch_one(t) for t in tiles])
+        self.stats["tiles"] = len(self.tiles)
+
+async def run_weather_prefetch_loop(tick: float = 1.0):
+    """
+    Background Task: Fetch queued tiles every tick; sweep active-device tiles every
+    WEATHER_PREFETCH_SECONDS so the hot path finds them fresh.
+    """
+    print(f"WEATHER: Tile cache online (provider={type(WEATHER.provider).__name__}, geohash-{WEATHER.precision}, TTL {WEATHER.ttl:.0f}s)")
+    last_sweep = 0.0
+    while True:
+        try:
+            now = time.monotonic()
+            if now - last_sweep >= settings.WEATHER_PREFETCH_SECONDS:
+                last_sweep = now
+                WEATHER.pending |= WEATHER.tiles_due(
+                    (s['location']['lat'], s['location']['lng']) for s in list(LATEST_POSITIONS.values())
+                )
+                WEATHER.evict_idle()
+            if WEATHER.pending:
+                batch, WEATHER.pending = WEATHER.pending, set()
+                await WEATHER.refresh(batch)
+        except Exception as e:
+            print(f"WEATHER: Prefetch loop error: {e}")
+        await asyncio.sleep(tick)
+
+WEATHER = WeatherTileCache(
+    provider=build_provider(),
+    precision=settings.WEATHER_TILE_PRECISION,
+    ttl=settings.WEATHER_TTL_SECONDS,
+    stale=settings.WEATHER_STALE_SECONDS,
+    concurrency=settings.WEATHER_FETCH_CONCURRENCY
+)
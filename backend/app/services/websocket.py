@@ -7,13 +7,40 @@ sio_app = socketio.ASGIApp(sio)
 async def notify_alert(alert_data):
     """
     Emit critical alert to all connected dashboards.
+    Goes through the alert aggregator: during an alert storm members of a zone
+    cluster are rolled up into 'incident_cluster' events instead.
     """
+    from app.services.alert_aggregator import ALERT_AGGREGATOR, EMIT
+    decision, storming = ALERT_AGGREGATOR.submit(alert_data)
     try:
-        await sio.emit('new_alert', alert_data)
-        print(f"WS EMIT: {alert_data['type']} - {alert_data['message']}")
+        if decision == EMIT:
+            await sio.emit('new_alert', alert_data)
+            print(f"WS EMIT: {alert_data['type']} - {alert_data['message']}")
+        elif storming is not None:
+            await emit_incident_cluster(ALERT_AGGREGATOR.to_event(storming))
     except Exception as e:
         print(f"WS Emit Error: {e}")
 
+async def emit_incident_cluster(event: dict):
+    await sio.emit('incident_cluster', event)
+    print(f"WS CLUSTER: {event['type']} x{event['alert_count']} ({event['device_count']} devices) in {event['zone']} [{event['severity']}]")
+
+async def run_incident_cluster_loop():
+    """
+    Background Task: One roll-up per storming cluster per ALERT_CLUSTER_FLUSH_SECONDS.
+    """
+    import asyncio
+    from app.core.config import settings
+    from app.services.alert_aggregator import ALERT_AGGREGATOR
+    while True:
+        await asyncio.sleep(settings.ALERT_CLUSTER_FLUSH_SECONDS)
+        try:
+            for event in ALERT_AGGREGATOR.drain_updates():
+                await emit_incident_cluster(event)
+            ALERT_AGGREGATOR.evict_expired()
+        except Exception as e:
+            print(f"WS Cluster Emit Error: {e}")
+
 async def broadcast_telemetry(telemetry_data):
     """
     Broadcast live tourist position to the map.
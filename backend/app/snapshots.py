@@ -1,55 +1,248 @@
-
-import boto3
+import asyncio
+import io
 import json
 import time
-import os
-from decimal import Decimal
-from app.core.shared_state import LATEST_POSITIONS
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from app.core.shared_state import LATEST_POSITIONS, SYSTEM_METRICS
 from app.core.config import settings
 
-def create_snapshot():
-    """
-    Backs up the entire In-MEMORY state to S3 (Simulated by LocalStack).
-    Standard Disaster Recovery (DR) practice.
-    """
-    if not LATEST_POSITIONS:
-        return
+# --- DR SNAPSHOTS (Compressed Base + Delta Chains, Restore on Boot) ---
+# Layout in s3://<SNAPSHOT_BUCKET>/<SNAPSHOT_PREFIX>/:
+#   <chain_id>/base.bin            full LATEST_POSITIONS
+#   <chain_id>/delta-000001.bin    keys written / deleted since the previous object
+# chain_id is the base's creation time (zero-padded), so chains sort by age.
+# A new chain starts every SNAPSHOT_FULL_EVERY deltas (and after every boot).
+#
+# Object format: MAGIC + zlib(JSON {"kind", "chain", "seq", "created", "upserts", "deletes", "events"}).
+# "events" carries the device event log (services/event_log.py): the whole log in a
+# base, the events recorded since the previous object in a delta.
+# The event loop only takes the dirty keys and shallow-copies their entries;
+# encoding, compression and the (multipart, above SNAPSHOT_MULTIPART_BYTES) upload
+# run in a worker thread. Failed deltas put their keys back so nothing is lost.
+# Restore: newest chain with a base -> base, then its deltas in order (seconds).
+# Retention keeps the newest SNAPSHOT_RETAIN_CHAINS chains.
+
+MAGIC = b"PRSNAP1\n"
 
-    try:
-        # 1. Config S3 Client (LocalStack)
-        s3 = boto3.client(
+_s3 = None
+
+def get_s3_client():
+    global _s3
+    if _s3 is None:
+        import boto3
+        from botocore.config import Config
+        _s3 = boto3.client(
             's3',
             endpoint_url=settings.DYNAMODB_ENDPOINT, # Reuse localstack endpoint
-            region_name="us-east-1",
-            aws_access_key_id="test",
-            aws_secret_access_key="test"
+            region_name=settings.AWS_REGION,
+            aws_access_key_id=settings.AWS_ACCESS_KEY,
+            aws_secret_access_key=settings.AWS_SECRET_KEY,
+            config=Config(connect_timeout=1, read_timeout=30, retries={'max_attempts': 2})
         )
-        
-        BUCKET_NAME = "prahari-dr-snapshots"
-        
-        # Ensure bucket exists
+    return _s3
+
+def encode_snapshot(doc: dict) -> bytes:
+    raw = json.dumps(doc, separators=(",", ":"), default=str).encode()
+    return MAGIC + zlib.compress(raw, settings.SNAPSHOT_COMPRESSION_LEVEL)
+
+def decode_snapshot(blob: bytes) -> dict:
+    if not blob.startswith(MAGIC):
+        raise ValueError("Not a Prahari snapshot")
+    return json.loads(zlib.decompress(blob[len(MAGIC):]))
+
+class SnapshotManager:
+    def __init__(self, bucket: str, prefix: str, full_every: int, retain_chains: int):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.full_every = full_every
+        self.retain_chains = retain_chains
+        self.chain_id = None # None -> next snapshot is a new base
+        self.seq = 0
+        self._bucket_ready = False
+        self._running = False
+        self.stats = {
+            "last_kind": None,
+            "last_key": None,
+            "last_bytes": 0,
+            "last_entries": 0,
+            "last_events": 0,
+            "last_duration_ms": 0.0,
+            "failures": 0,
+            "restored_entries": 0,
+            "restore_ms": 0.0
+        }
+        SYSTEM_METRICS['snapshots'] = self.stats
+
+    # 1. Capture (on the event loop: O(changed keys) shallow copies)
+    def _capture(self) -> dict:
+        from app.services.event_log import EVENT_LOG
+        dirty, deleted = LATEST_POSITIONS.take_changes()
+        if self.chain_id is None or self.seq >= self.full_every:
+            chain_id = f"{int(time.time() * 1000):015d}"
+            upserts = {k: dict(v) for k, v in LATEST_POSITIONS.items()}
+            return {"kind": "base", "chain": chain_id, "seq": 0, "created": time.time(),
+                    "upserts": upserts, "deletes": [], "events": EVENT_LOG.export(),
+                    "_dirty": dirty, "_deleted": deleted}
+        upserts = {k: dict(LATEST_POSITIONS[k]) for k in dirty if k in LATEST_POSITIONS}
+        return {"kind": "delta", "chain": self.chain_id, "seq": self.seq + 1, "created": time.time(),
+                "upserts": upserts, "deletes": sorted(deleted), "events": EVENT_LOG.take_changes(),
+                "_dirty": dirty, "_deleted": deleted}
+
+    def _requeue(self, doc: dict):
+        """A failed write: its changes go back into the next delta."""
+        from app.services.event_log import EVENT_LOG
+        LATEST_POSITIONS.dirty |= {k for k in doc["_dirty"] if k in LATEST_POSITIONS}
+        LATEST_POSITIONS.deleted |= {k for k in doc["_deleted"] if k not in LATEST_POSITIONS}
+        if doc["kind"] == "delta":
+            EVENT_LOG.requeue(doc["events"]) # A failed base is simply re-exported next time
+
+    # 2. Write (worker thread)
+    def _key(self, chain_id: str, seq: int) -> str:
+        name = "base.bin" if seq == 0 else f"delta-{seq:06d}.bin"
+        return f"{self.prefix}/{chain_id}/{name}"
+
+    def _write(self, doc: dict) -> tuple:
+        from boto3.s3.transfer import TransferConfig
+        s3 = get_s3_client()
+        if not self._bucket_ready:
+            try:
+                s3.create_bucket(Bucket=self.bucket)
+            except s3.exceptions.BucketAlreadyOwnedByYou:
+                pass
+            except s3.exceptions.BucketAlreadyExists:
+                pass
+            self._bucket_ready = True
+        body = encode_snapshot({k: v for k, v in doc.items() if not k.startswith("_")})
+        key = self._key(doc["chain"], doc["seq"])
+        s3.upload_fileobj(io.BytesIO(body), self.bucket, key, Config=TransferConfig(
+            multipart_threshold=settings.SNAPSHOT_MULTIPART_BYTES,
+            multipart_chunksize=settings.SNAPSHOT_MULTIPART_BYTES
+        ))
+        return key, len(body)
+
+    async def snapshot(self) -> str:
+        """Writes one base or delta; returns its key (None if nothing changed / failed)."""
+        if self._running or (not LATEST_POSITIONS and self.chain_id is None):
+            return None
+        doc = self._capture()
+        if doc["kind"] == "delta" and not doc["upserts"] and not doc["deletes"] and not doc["events"]:
+            return None
+        self._running = True
+        started = time.perf_counter()
         try:
-            s3.create_bucket(Bucket=BUCKET_NAME)
-        except:
-            pass # Exists
-            
-        # 2. Serialize State
-        # Convert Decimals if any remain (though State usually keeps floats now)
-        # Just to be safe
-        dumped_state = {}
-        for k, v in LATEST_POSITIONS.items():
-            dumped_state[k] = v
-
-        filename = f"snapshot_{int(time.time())}.json"
-        
-        # 3. Upload
-        s3.put_object(
-            Bucket=BUCKET_NAME,
-            Key=filename,
-            Body=json.dumps(dumped_state, default=str)
-        )
-        
-        print(f"SNAPSHOT: Saved state to s3://{BUCKET_NAME}/{filename}")
-        
-    except Exception as e:
-        print(f"Snapshot Failed: {e}")
+            key, size = await asyncio.to_thread(self._write, doc)
+        except Exception as e:
+            self._requeue(doc)
+            self.stats["failures"] += 1
+            print(f"Snapshot Failed: {type(e).__name__}: {e}")
+            return None
+        finally:
+            self._running = False
+        self.chain_id, self.seq = doc["chain"], doc["seq"]
+        self.stats.update(last_kind=doc["kind"], last_key=key, last_bytes=size,
+                          last_entries=len(doc["upserts"]) + len(doc["deletes"]),
+                          last_events=sum(len(part["events"]) for part in doc["events"].values()),
+                          last_duration_ms=round((time.perf_counter() - started) * 1000, 2))
+        print(f"SNAPSHOT: Saved {doc['kind']} ({self.stats['last_entries']} entries, {self.stats['last_events']} events, {size} bytes) to s3://{self.bucket}/{key}")
+        if doc["kind"] == "base":
+            await asyncio.to_thread(self._apply_retention)
+        return key
+
+    # 3. Restore + retention (blocking; run off the event loop)
+    def _list(self, prefix: str, delimiter: str = None) -> tuple:
+        s3 = get_s3_client()
+        kwargs = {"Bucket": self.bucket, "Prefix": prefix}
+        if delimiter:
+            kwargs["Delimiter"] = delimiter
+        keys, prefixes = [], []
+        for page in s3.get_paginator("list_objects_v2").paginate(**kwargs):
+            keys.extend(o["Key"] for o in page.get("Contents", []))
+            prefixes.extend(p["Prefix"] for p in page.get("CommonPrefixes", []))
+        return keys, prefixes
+
+    def _chains(self) -> list:
+        """Chain ids, newest first."""
+        _, prefixes = self._list(f"{self.prefix}/", delimiter="/")
+        return sorted((p[len(self.prefix) + 1:].strip("/") for p in prefixes), reverse=True)
+
+    def _read(self, key: str) -> dict:
+        body = get_s3_client().get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        return decode_snapshot(body)
+
+    def load_latest(self) -> tuple:
+        """(chain_id, merged state, merged event log) from the newest chain with a readable base."""
+        for chain_id in self._chains():
+            keys, _ = self._list(f"{self.prefix}/{chain_id}/")
+            base_key = self._key(chain_id, 0)
+            if base_key not in keys:
+                continue # Incomplete chain (base upload never finished)
+            base = self._read(base_key)
+            state, events = base["upserts"], base.get("events", {})
+            with ThreadPoolExecutor(max_workers=8) as pool: # Parallel GETs, applied in order
+                deltas = pool.map(self._read, sorted(k for k in keys if k != base_key))
+                for delta in deltas:
+                    state.update(delta["upserts"])
+                    for device_id in delta["deletes"]:
+                        state.pop(device_id, None)
+                    for device_id, part in delta.get("events", {}).items():
+                        merged = events.setdefault(device_id, {"events": []})
+                        merged["events"].extend(part["events"])
+                        merged.update(zone=part.get("zone"), permit=part.get("permit"))
+            return chain_id, state, events
+        return None, {}, {}
+
+    def _apply_retention(self):
+        try:
+            stale = self._chains()[self.retain_chains:]
+            s3 = get_s3_client()
+            for chain_id in stale:
+                keys, _ = self._list(f"{self.prefix}/{chain_id}/")
+                for start in range(0, len(keys), 1000):
+                    s3.delete_objects(Bucket=self.bucket, Delete={
+                        "Objects": [{"Key": k} for k in keys[start:start + 1000]], "Quiet": True})
+            if stale:
+                print(f"SNAPSHOT: Retention removed {len(stale)} old chains")
+        except Exception as e:
+            print(f"SNAPSHOT: Retention failed: {e}")
+
+    async def restore(self) -> int:
+        """
+        Boot path: loads the newest base + deltas into LATEST_POSITIONS. Entries
+        already in memory win when newer. The next snapshot starts a fresh base.
+        """
+        started = time.perf_counter()
+        try:
+            chain_id, state, events = await asyncio.wait_for(asyncio.to_thread(self.load_latest),
+                                                     settings.SNAPSHOT_RESTORE_TIMEOUT_SECONDS)
+        except Exception as e:
+            print(f"SNAPSHOT: Restore skipped ({type(e).__name__}: {e})")
+            return 0
+        fresh = {k: v for k, v in state.items()
+                 if k not in LATEST_POSITIONS or v.get('timestamp', 0) > LATEST_POSITIONS[k].get('timestamp', 0)}
+        LATEST_POSITIONS.restore(fresh)
+        from app.services.event_log import EVENT_LOG
+        EVENT_LOG.restore(events, {k: v.get('timestamp', 0) for k, v in LATEST_POSITIONS.items()})
+        self.stats["restored_entries"] = len(fresh)
+        self.stats["restore_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        if chain_id:
+            print(f"SNAPSHOT: Restored {len(fresh)} devices from chain {chain_id} in {self.stats['restore_ms']:.0f}ms")
+        return len(fresh)
+
+async def run_snapshot_loop():
+    """
+    Background Task: Delta (or base) snapshot every SNAPSHOT_INTERVAL_SECONDS.
+    """
+    while True:
+        await asyncio.sleep(settings.SNAPSHOT_INTERVAL_SECONDS)
+        try:
+            await SNAPSHOTS.snapshot()
+        except Exception as e:
+            print(f"SNAPSHOT: Loop error: {e}")
+
+SNAPSHOTS = SnapshotManager(
+    bucket=settings.SNAPSHOT_BUCKET,
+    prefix=settings.SNAPSHOT_PREFIX,
+    full_every=settings.SNAPSHOT_FULL_EVERY,
+    retain_chains=settings.SNAPSHOT_RETAIN_CHAINS
+)
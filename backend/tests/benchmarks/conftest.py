@@ -0,0 +1,114 @@
+"""
+Synthetic, offline workloads for the engine benchmarks.
+
+Every fleet / zone set is generated from a fixed seed, so two runs on the same
+machine see identical inputs. Nothing here touches DynamoDB, Ganache or IPFS.
+
+Quick matrix by default; PRAHARI_BENCH_FULL=1 adds 100k devices and 10k zones.
+Only compare baselines recorded with the same matrix.
+"""
+import os
+import random
+import sys
+from functools import lru_cache
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from app.models import GeoFence, GeoPoint, TelemetryData
+
+SEED = 1337
+FULL = os.getenv("PRAHARI_BENCH_FULL") == "1"
+
+FLEET_SIZES = (1_000, 10_000, 100_000) if FULL else (1_000, 10_000)
+ZONE_COUNTS = (10, 1_000, 10_000) if FULL else (10, 1_000)
+TIMELINE_LENGTHS = (10, 100, 1_000) if FULL else (10, 100)
+GEOFENCE_PROBES = 1_000 # Points checked per geofence round
+TRAIL_TICKS = 10        # Packets per device (fills the biometrics window)
+
+# Tawang operating box (same area as traffic_generator.py)
+BASE_LAT, BASE_LNG = 27.5861, 91.8594
+SPREAD_DEG = 0.05
+
+PROFILES = ("HUMAN_SAFE", "HUMAN_DANGER", "BOT_SPOOF", "STATIONARY")
+
+@lru_cache(maxsize=None)
+def build_fleet(size: int, ticks: int = TRAIL_TICKS) -> tuple:
+    """
+    Returns `ticks` rounds of packets (as dicts) for `size` devices.
+    fleet[t][i] is device i at tick t.
+    """
+    rng = random.Random(SEED + size)
+    t0 = 1_700_000_000.0
+    devices = []
+    for i in range(size):
+        devices.append({
+            "device_id": f"BENCH_{i:06d}",
+            "profile": PROFILES[i % len(PROFILES)],
+            "lat": BASE_LAT + rng.uniform(-SPREAD_DEG, SPREAD_DEG),
+            "lng": BASE_LNG + rng.uniform(-SPREAD_DEG, SPREAD_DEG),
+            "heading": rng.uniform(0, 360),
+        })
+
+    rounds = []
+    for t in range(ticks):
+        packets = []
+        for d in devices:
+            profile = d["profile"]
+            if profile == "BOT_SPOOF":
+                speed, heading = 5.0, d["heading"]
+            elif profile == "STATIONARY":
+                speed, heading = 0.0, d["heading"]
+            else:
+                speed = max(0.0, rng.gauss(1.4, 0.4))
+                heading = (d["heading"] + rng.gauss(0, 15)) % 360
+            d["heading"] = heading
+            d["lat"] += speed * 1e-5 * rng.uniform(0.5, 1.5)
+            d["lng"] += speed * 1e-5 * rng.uniform(0.5, 1.5)
+            packets.append({
+                "device_id": d["device_id"],
+                "did": f"did:eth:bench:{d['device_id']}",
+                "timestamp": t0 + t * 5.0,
+                "location": {"lat": d["lat"], "lng": d["lng"]},
+                "speed": speed,
+                "heading": heading,
+                "battery_level": 15.0 if profile == "HUMAN_DANGER" else 85.0,
+                "is_panic": profile == "HUMAN_DANGER" and rng.random() < 0.01,
+                "humanity_score": 100.0
+            })
+        rounds.append(packets)
+    return tuple(rounds)
+
+@lru_cache(maxsize=None)
+def build_zones(count: int) -> tuple:
+    rng = random.Random(SEED * 7 + count)
+    zones = []
+    for i in range(count):
+        zones.append(GeoFence(
+            zone_id=f"ZONE_BENCH_{i:05d}",
+            name=f"Synthetic Zone {i}",
+            risk_level="HIGH" if i % 3 == 0 else "MEDIUM",
+            center=GeoPoint(lat=BASE_LAT + rng.uniform(-SPREAD_DEG, SPREAD_DEG),
+                            lng=BASE_LNG + rng.uniform(-SPREAD_DEG, SPREAD_DEG)),
+            radius_meters=rng.uniform(100.0, 600.0),
+            priority=rng.choice((10, 50, 100)),
+            authority="BENCH"
+        ))
+    return tuple(zones)
+
+@pytest.fixture
+def use_zones(monkeypatch):
+    """use_zones(n) installs n synthetic circular zones as the live geofence cache."""
+    import app.services.geofence as geofence
+
+    def install(count: int):
+        monkeypatch.setattr(geofence, "_GEOFENCE_CACHE", list(build_zones(count)))
+    return install
+
+@pytest.fixture
+def telemetry_models():
+    """telemetry_models(size, tick) -> [TelemetryData] for one round of a fleet."""
+    def build(size: int, tick: int = TRAIL_TICKS - 1):
+        return [TelemetryData(**p) for p in build_fleet(size)[tick]]
+    return build
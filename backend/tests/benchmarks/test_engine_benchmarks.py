@@ -0,0 +1,253 @@
+"""
+In-process benchmarks for the ingestion engines (no server, no network).
+
+    pip install -r requirements-dev.txt
+    python -m pytest tests/benchmarks --benchmark-autosave --benchmark-storage=tests/benchmarks/.baselines
+    python -m pytest tests/benchmarks --benchmark-storage=tests/benchmarks/.baselines \
+        --benchmark-compare --benchmark-compare-fail=mean:10%
+
+Each benchmark covers one full pass over a synthetic fleet / probe set, so the
+reported time is per pass; divide by the parametrized size for per-packet cost.
+"""
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pytest_benchmark", reason="pip install -r requirements-dev.txt")
+
+from app.core.shared_state import BIOMETRIC_HISTORY
+from app.engine import SentinelAI
+from app.models import GeoPoint
+from app.reports import generate_efir_pdf
+from app.services.anomaly_detection import detect_anomalies
+from app.services.biometrics import analyze_humanity
+from app.services.bot_detection import score_fleet
+from app.services.fleet_history import FleetHistory
+from app.services.geofence import check_geofence_breach
+from app.services.kalman import KALMAN_BANK
+from app.services.merkle import MerkleTree
+from app.services.risk_rules import RISK_RULES, RulePlan
+from app.services.weather import WEATHER
+
+from conftest import (FLEET_SIZES, ZONE_COUNTS, TIMELINE_LENGTHS, GEOFENCE_PROBES,
+                      TRAIL_TICKS, build_fleet, build_zones)
+
+DEFAULT_ZONES = 10
+
+def heavy(benchmark, fn, *args, setup=None):
+    """Large workloads: fixed small round count instead of pytest-benchmark's calibration."""
+    if setup is None:
+        return benchmark.pedantic(fn, args=args, rounds=3, iterations=1, warmup_rounds=1)
+    return benchmark.pedantic(fn, setup=setup, rounds=3, warmup_rounds=1)
+
+# --- 1. RISK ENGINE ---
+
+@pytest.mark.parametrize("fleet_size", FLEET_SIZES)
+def test_calculate_risk(benchmark, use_zones, fleet_size):
+    use_zones(DEFAULT_ZONES)
+    packets = build_fleet(fleet_size)[-1]
+    # Hot path is an in-memory tile hit once the prefetcher has run
+    asyncio.run(WEATHER.refresh(WEATHER.tiles_due((p["location"]["lat"], p["location"]["lng"]) for p in packets)))
+
+    def run():
+        return [SentinelAI.calculate_risk(p) for p in packets]
+
+    reports = heavy(benchmark, run)
+    assert len(reports) == fleet_size
+    assert all(0 <= r["score"] <= 100 for r in reports)
+
+@pytest.mark.parametrize("fleet_size", FLEET_SIZES)
+def test_calculate_risk_batch(benchmark, use_zones, fleet_size):
+    use_zones(DEFAULT_ZONES)
+    packets = build_fleet(fleet_size)[-1]
+    columns = {
+        "lats": [p["location"]["lat"] for p in packets],
+        "lngs": [p["location"]["lng"] for p in packets],
+        "speeds": [p["speed"] for p in packets],
+        "is_panic": [p["is_panic"] for p in packets],
+        "timestamps": [p["timestamp"] for p in packets],
+    }
+    asyncio.run(WEATHER.refresh(WEATHER.tiles_due(zip(columns["lats"], columns["lngs"]))))
+
+    def run():
+        batch = SentinelAI.calculate_risk_batch(**columns)
+        return [SentinelAI.expand_risk(batch, i) for i in range(fleet_size)]
+
+    reports = heavy(benchmark, run)
+    assert len(reports) == fleet_size
+
+@pytest.mark.parametrize("fleet_size", FLEET_SIZES)
+def test_detect_anomalies(benchmark, use_zones, telemetry_models, fleet_size):
+    use_zones(DEFAULT_ZONES)
+    packets = telemetry_models(fleet_size)
+
+    def run():
+        return [detect_anomalies(p) for p in packets]
+
+    assert len(heavy(benchmark, run)) == fleet_size
+
+# Rule evaluation alone: contexts / columns are prebuilt, so geofence and weather
+# lookups are excluded and the number tracks the compiled plan itself.
+
+def rule_contexts(fleet_size: int) -> list:
+    levels = ("HIGH", "MEDIUM", "LOW", None, None, None)
+    conditions = ("Clear Sky", "Rain", "Thunderstorm", "Fog", "Clouds")
+    return [
+        {
+            "zone_risk": levels[i % len(levels)],
+            "in_zone": levels[i % len(levels)] is not None,
+            "speed": p["speed"],
+            "hour": i % 24,
+            "weather": conditions[i % len(conditions)],
+            "panic": p["is_panic"]
+        }
+        for i, p in enumerate(build_fleet(fleet_size)[-1])
+    ]
+
+@pytest.mark.parametrize("fleet_size", FLEET_SIZES)
+def test_rule_plan_evaluate(benchmark, fleet_size):
+    plan = RISK_RULES.current()
+    contexts = rule_contexts(fleet_size)
+
+    def run():
+        return [plan.evaluate(c) for c in contexts]
+
+    assert len(heavy(benchmark, run)) == fleet_size
+
+@pytest.mark.parametrize("fleet_size", FLEET_SIZES)
+def test_rule_plan_evaluate_batch(benchmark, fleet_size):
+    plan = RISK_RULES.current()
+    zones = build_zones(DEFAULT_ZONES)
+    contexts = rule_contexts(fleet_size)
+    conditions = sorted({c["weather"] for c in contexts})
+    cols = {
+        "hits": np.array([i % (len(zones) + 1) - 1 for i in range(fleet_size)], dtype=np.intp),
+        "zones": zones,
+        "speed": np.array([c["speed"] for c in contexts]),
+        "hour": np.array([c["hour"] for c in contexts], dtype=np.intp),
+        "weather": np.array([conditions.index(c["weather"]) for c in contexts], dtype=np.intp),
+        "conditions": conditions,
+        "panic": np.array([c["panic"] for c in contexts])
+    }
+
+    score, status, factors = heavy(benchmark, plan.evaluate_batch, cols)
+    assert len(score) == len(status) == len(factors) == fleet_size
+
+def test_rule_plan_compile(benchmark):
+    with open(RISK_RULES.path) as f:
+        raw = json.load(f)
+    plan = benchmark(RulePlan, raw)
+    assert plan.factor_names == RISK_RULES.current().factor_names
+
+# --- 2. GEOFENCE ---
+
+@pytest.mark.parametrize("zone_count", ZONE_COUNTS)
+def test_check_geofence_breach(benchmark, use_zones, zone_count):
+    use_zones(zone_count)
+    probes = [GeoPoint(**p["location"]) for p in build_fleet(FLEET_SIZES[0])[-1][:GEOFENCE_PROBES]]
+
+    def run():
+        return sum(1 for p in probes if check_geofence_breach(p))
+
+    hits = heavy(benchmark, run)
+    assert 0 <= hits <= len(probes)
+    assert len(build_zones(zone_count)) == zone_count
+
+# --- 3. SIGNAL PROCESSING ---
+
+@pytest.mark.parametrize("fleet_size", FLEET_SIZES)
+def test_analyze_humanity(benchmark, telemetry_models, fleet_size):
+    rounds = [telemetry_models(fleet_size, t) for t in range(TRAIL_TICKS)]
+
+    def warm():
+        # Full biometrics window per device; the timed pass re-scores the last tick
+        BIOMETRIC_HISTORY.clear()
+        for packets in rounds[:-1]:
+            for p in packets:
+                analyze_humanity(p)
+        return (), {}
+
+    def run():
+        return [analyze_humanity(p) for p in rounds[-1]]
+
+    scores = benchmark.pedantic(run, setup=warm, rounds=3, warmup_rounds=1)
+    assert len(scores) == fleet_size
+
+def warm_kalman(rounds):
+    def warm():
+        KALMAN_BANK.reset()
+        first = rounds[0]
+        KALMAN_BANK.step_batch([p["device_id"] for p in first], [p["location"]["lat"] for p in first],
+                               [p["location"]["lng"] for p in first], [p["timestamp"] for p in first])
+        return (), {}
+    return warm
+
+@pytest.mark.parametrize("fleet_size", FLEET_SIZES)
+def test_kalman_step(benchmark, fleet_size):
+    rounds = build_fleet(fleet_size)
+
+    def run():
+        out = []
+        for p in rounds[1]:
+            out.append(KALMAN_BANK.step(p["device_id"], p["location"]["lat"], p["location"]["lng"], p["timestamp"]))
+        return out
+
+    assert len(benchmark.pedantic(run, setup=warm_kalman(rounds), rounds=3, warmup_rounds=1)) == fleet_size
+
+@pytest.mark.parametrize("fleet_size", FLEET_SIZES)
+def test_kalman_step_batch(benchmark, fleet_size):
+    rounds = build_fleet(fleet_size)
+    ids = [p["device_id"] for p in rounds[1]]
+    lats = [p["location"]["lat"] for p in rounds[1]]
+    lngs = [p["location"]["lng"] for p in rounds[1]]
+    timestamps = [p["timestamp"] for p in rounds[1]]
+
+    def run():
+        return KALMAN_BANK.step_batch(ids, lats, lngs, timestamps)
+
+    out_lat, _ = benchmark.pedantic(run, setup=warm_kalman(rounds), rounds=3, warmup_rounds=1)
+    assert len(out_lat) == fleet_size
+
+@pytest.mark.parametrize("fleet_size", FLEET_SIZES)
+def test_fleet_bot_scan(benchmark, fleet_size):
+    history = FleetHistory(window=TRAIL_TICKS)
+    for packets in build_fleet(fleet_size):
+        for p in packets:
+            history.append(p["device_id"], p["timestamp"], p["location"]["lat"], p["location"]["lng"],
+                           p["speed"], p["heading"])
+    device_ids, columns = history.full_windows()
+
+    report = heavy(benchmark, score_fleet, device_ids, columns)
+    assert report["devices_scored"] == fleet_size
+
+# --- 4. EVIDENCE ---
+
+@pytest.mark.parametrize("fleet_size", FLEET_SIZES)
+def test_merkle_build(benchmark, fleet_size):
+    tree = MerkleTree()
+    for p in build_fleet(fleet_size)[-1]:
+        tree.add_leaf(f"{p['device_id']}|{p['timestamp']}|{p['location']['lat']}|{p['location']['lng']}")
+
+    root = benchmark(tree.build)
+    assert len(root) == 64
+
+@pytest.mark.parametrize("timeline_length", TIMELINE_LENGTHS)
+def test_generate_efir_pdf(benchmark, timeline_length):
+    packet = build_fleet(FLEET_SIZES[0])[-1][1]
+    incident = {
+        **packet,
+        "permit_id": "#BENCH01",
+        "blockchain_txid": "0x" + "ab" * 32,
+        "risk_score": 87,
+        "factors": ["RED_ZONE_BREACH", "NIGHT_MULTIPLIER"],
+        "timeline": [
+            {"time": packet["timestamp"] - 5.0 * i, "event": "TELEMETRY", "actor": "SYSTEM",
+             "details": f"Position fix #{i} at {packet['location']['lat']:.5f}, {packet['location']['lng']:.5f}"}
+            for i in range(timeline_length)
+        ]
+    }
+
+    pdf = benchmark(generate_efir_pdf, incident)
+    assert pdf.getvalue().startswith(b"%PDF")
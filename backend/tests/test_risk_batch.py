@@ -0,0 +1,132 @@
+"""
+Property tests: SentinelAI.calculate_risk_batch must agree with the scalar
+calculate_risk row for row (randomized fleets, zones, clocks and weather).
+
+    cd backend && python -m pytest tests/test_risk_batch.py
+"""
+import hashlib
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import app.engine as engine
+import app.services.geofence as geofence
+from app.engine import SentinelAI
+from app.models import GeoFence, GeoPoint
+from app.services.weather import WeatherProvider, WeatherTileCache, geohash_encode
+
+CONDITIONS = ("Clear Sky", "Clear Sky", "Thunderstorm", "Heavy Snow", "Blizzard", "Rain", "Fog", "Clouds")
+BASE_LAT, BASE_LNG = 27.5861, 91.8594
+
+class HashedWeather(WeatherProvider):
+    """Deterministic pseudo-random condition per tile."""
+    def fetch(self, tile: str) -> str:
+        return CONDITIONS[hashlib.sha256(tile.encode()).digest()[0] % len(CONDITIONS)]
+
+def random_zones(rng: random.Random, count: int) -> list:
+    return [
+        GeoFence(
+            zone_id=f"ZONE_PROP_{i}",
+            name=f"Zone {i}",
+            risk_level=rng.choice(("HIGH", "MEDIUM", "LOW")),
+            center=GeoPoint(lat=BASE_LAT + rng.uniform(-0.02, 0.02), lng=BASE_LNG + rng.uniform(-0.02, 0.02)),
+            radius_meters=rng.uniform(50.0, 1500.0),
+            priority=rng.choice((10, 50, 100)),
+            authority="TEST"
+        )
+        for i in range(count)
+    ]
+
+def random_fleet(rng: random.Random, n: int) -> dict:
+    lats, lngs, speeds, panic, timestamps = [], [], [], [], []
+    for _ in range(n):
+        if rng.random() < 0.2: # Around the red-zone polygon
+            lats.append(rng.uniform(27.5865, 27.5895))
+            lngs.append(rng.uniform(91.8605, 91.8635))
+        else:
+            lats.append(BASE_LAT + rng.uniform(-0.03, 0.03))
+            lngs.append(BASE_LNG + rng.uniform(-0.03, 0.03))
+        speeds.append(rng.choice((0.0, 0.05, 0.1, 0.099, rng.uniform(0, 5), rng.uniform(0, 40))))
+        panic.append(rng.random() < 0.1)
+        timestamps.append(rng.uniform(1_700_000_000, 1_700_000_000 + 365 * 86400))
+    return {"lats": lats, "lngs": lngs, "speeds": speeds, "is_panic": panic, "timestamps": timestamps}
+
+@pytest.fixture
+def world(monkeypatch):
+    """Installs random zones and a fully primed deterministic weather cache."""
+    def build(seed: int, zone_count: int, fleet_size: int):
+        rng = random.Random(seed)
+        monkeypatch.setattr(geofence, "_GEOFENCE_CACHE", random_zones(rng, zone_count))
+        fleet = random_fleet(rng, fleet_size)
+        cache = WeatherTileCache(HashedWeather(), precision=6, ttl=3600.0, stale=0.0, concurrency=1)
+        for lat, lng in zip(fleet["lats"], fleet["lngs"]):
+            tile = geohash_encode(lat, lng, cache.precision)
+            cache.tiles[tile] = [cache.provider.fetch(tile), float("inf"), 0.0] # Never expires
+        monkeypatch.setattr(engine, "WEATHER", cache)
+        return fleet
+    return build
+
+def scalar(fleet: dict, i: int, now: float) -> dict:
+    current = {
+        "location": {"lat": fleet["lats"][i], "lng": fleet["lngs"][i]},
+        "speed": fleet["speeds"][i],
+        "is_panic": fleet["is_panic"][i],
+        "timestamp": fleet["timestamps"][i]
+    }
+    return SentinelAI.calculate_risk(current, now=now)
+
+@pytest.mark.parametrize("seed", range(12))
+def test_batch_matches_scalar_at_row_timestamps(world, seed):
+    fleet = world(seed, zone_count=random.Random(seed).choice((0, 1, 5, 40)), fleet_size=400)
+    batch = SentinelAI.calculate_risk_batch(**fleet)
+    for i in range(len(fleet["lats"])):
+        assert SentinelAI.expand_risk(batch, i) == scalar(fleet, i, fleet["timestamps"][i]), i
+
+@pytest.mark.parametrize("hour", (3, 12, 18, 23))
+def test_batch_matches_scalar_with_shared_clock(world, hour):
+    fleet = world(100 + hour, zone_count=25, fleet_size=300)
+    base = 1_700_000_000
+    now = next(t for t in range(base, base + 2 * 86400, 1800) if time.localtime(t).tm_hour == hour)
+    batch = SentinelAI.calculate_risk_batch(**fleet, now=now)
+    for i in range(len(fleet["lats"])):
+        assert SentinelAI.expand_risk(batch, i) == scalar(fleet, i, now), i
+
+@pytest.mark.parametrize("seed", range(6))
+def test_zone_hits_batch_matches_check_geofence_breach(world, seed):
+    fleet = world(200 + seed, zone_count=60, fleet_size=500)
+    hits, zones = geofence.zone_hits_batch(fleet["lats"], fleet["lngs"])
+    for i, (lat, lng) in enumerate(zip(fleet["lats"], fleet["lngs"])):
+        zone = geofence.check_geofence_breach(GeoPoint(lat=lat, lng=lng))
+        expected = zone.zone_id if zone else None
+        assert (zones[hits[i]].zone_id if hits[i] >= 0 else None) == expected, i
+
+def test_empty_batch(world):
+    world(0, zone_count=3, fleet_size=0)
+    batch = SentinelAI.calculate_risk_batch([], [], [], [], [])
+    assert len(batch["score"]) == 0 and len(batch["factors"]) == 0
+
+def test_override_without_factor_reports_no_factor():
+    from app.services.risk_rules import RulePlan
+    plan = RulePlan({
+        "rules": [{"factor": "WEATHER_ADVISORY", "when": {"weather_in": ["Rain"]}, "add": 10, "detail": "weather"}],
+        "overrides": [{"factor": None, "when": {"panic": True}, "score": 100}],
+        "thresholds": [{"min_score": 80, "status": "CRITICAL"}]
+    })
+    result = plan.evaluate({"zone_risk": None, "in_zone": False, "speed": 0.0, "hour": 12,
+                            "weather": "Clear", "panic": True})
+    assert result["score"] == 100 and result["factors"] == []
+
+@pytest.mark.parametrize("raw", [
+    {"overrides": [{"when": {"panic": True}, "score": 100}]},
+    {"rules": [{"factor": f"F{i}", "when": {"panic": True}, "add": 1} for i in range(64)]},
+])
+def test_invalid_plans_raise_rule_error(raw):
+    from app.services.risk_rules import RuleError, RulePlan
+    with pytest.raises(RuleError):
+        RulePlan(raw)
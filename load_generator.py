@@ -0,0 +1,267 @@
+"""
+PRAHARI-AI CAPACITY HARNESS (asyncio)
+
+Reuses the traffic_generator.py profiles (HUMAN_SAFE, HUMAN_DANGER, BOT_SPOOF,
+DEAD_MAN) across a synthetic fleet of up to 100k+ devices, with correctly signed
+packets and per-device nonces, and reports a comparable capacity number.
+
+Simulated devices are named LOADTEST_000000.. and use keys derived from a master
+secret, so the backend must be started with the SAME master and a per-IP limit
+high enough for a single load host, e.g.:
+
+    DEVICE_KEY_MASTER=loadtest-master RATE_LIMIT_PER_IP=1000000 \
+    RATE_LIMIT_PER_DEVICE=1000 uvicorn app.main:app --workers 1
+
+    python load_generator.py --devices 100000 --rate 2000 --duration 60
+    python load_generator.py --devices 10000 --concurrency 64 --encoding proto
+    python load_generator.py --devices 100000 --rate 50 --batch-size 200 --output run.json
+
+--rate (open loop): requests are scheduled at a constant arrival rate regardless of
+how fast the server answers; latency is measured from the INTENDED send time, so
+server stalls show up in the tail instead of silently lowering the offered load.
+--concurrency (closed loop): N workers send back-to-back.
+"""
+import argparse
+import asyncio
+import hmac
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from app.core import telemetry_pb2
+from app.services.identities import derive_device_key, canonical_payload
+from traffic_generator import DEVICES as PROFILES, BASE_LAT, BASE_LNG, get_next_position
+
+DEFAULT_URL = "http://localhost:8000/api/v1"
+API_KEY = os.getenv("AUTH_API_KEY", "dev-secret")
+
+class SimulatedFleet:
+    """
+    Per-device movement state + attestation material (nonce counter, keyed HMAC).
+    """
+    def __init__(self, size: int, master_secret: str, seed: int):
+        self.rng = random.Random(seed)
+        random.seed(seed) # traffic_generator profiles use the module-level RNG
+        self.devices = []
+        nonce_base = int(time.time() * 1000)
+        for i in range(size):
+            profile = PROFILES[i % len(PROFILES)]
+            device_id = f"LOADTEST_{i:06d}"
+            self.devices.append({
+                "id": device_id,
+                "did": f"did:eth:derived:{device_id}",
+                "type": profile["type"],
+                "mac": hmac.new(derive_device_key(master_secret, device_id), digestmod=hashlib.sha256),
+                "state": {
+                    "lat": BASE_LAT + self.rng.uniform(-0.05, 0.05),
+                    "lng": BASE_LNG + self.rng.uniform(-0.05, 0.05),
+                    "heading": self.rng.uniform(0, 360),
+                    "speed": 1.5,
+                    "nonce": nonce_base,
+                    "sent_once": False
+                }
+            })
+        self.cursor = 0
+
+    def next_device(self) -> dict:
+        """Round-robin; DEAD_MAN devices go silent after their first packet."""
+        for _ in range(len(self.devices)):
+            device = self.devices[self.cursor]
+            self.cursor = (self.cursor + 1) % len(self.devices)
+            if device["type"] == "DEAD_MAN":
+                if device["state"]["sent_once"]:
+                    continue
+                device["state"]["sent_once"] = True
+            return device
+        raise RuntimeError("Every simulated device has gone silent (fleet is all DEAD_MAN).")
+
+    def build_packet(self, device: dict):
+        """Returns (payload dict, signature, nonce)."""
+        current = get_next_position(device, device["state"])
+        payload = {
+            "device_id": device["id"],
+            "did": device["did"],
+            "timestamp": time.time(),
+            "location": {"lat": current["lat"], "lng": current["lng"]},
+            "speed": current["speed"],
+            "heading": current["heading"],
+            "battery_level": 15.0 if device["type"] == "HUMAN_DANGER" else 85.0,
+            "is_panic": device["type"] == "HUMAN_DANGER" and self.rng.random() < 0.01
+        }
+        mac = device["mac"].copy()
+        mac.update(canonical_payload(payload["device_id"], payload["timestamp"],
+                                     payload["location"]["lat"], payload["location"]["lng"]).encode())
+        return payload, mac.hexdigest(), current["nonce"]
+
+def encode_proto(payload: dict) -> bytes:
+    packet = telemetry_pb2.TelemetryPacket()
+    packet.device_id = payload["device_id"]
+    packet.did = payload["did"]
+    packet.timestamp = payload["timestamp"]
+    packet.location.lat = payload["location"]["lat"]
+    packet.location.lng = payload["location"]["lng"]
+    packet.speed = payload["speed"]
+    packet.heading = payload["heading"]
+    packet.battery_level = payload["battery_level"]
+    packet.is_panic = payload["is_panic"]
+    return packet.SerializeToString()
+
+class LoadRun:
+    def __init__(self, args):
+        self.args = args
+        self.fleet = SimulatedFleet(args.devices, args.master_secret, args.seed)
+        self.latencies_ms = []
+        self.status = Counter()
+        self.packets_sent = 0
+        self.packets_accepted = 0
+        self.client_dropped = 0 # Open loop: arrivals skipped because max in-flight was reached
+        self.inflight = 0
+
+    def build_request(self):
+        """Returns (path, kwargs, packet_count)."""
+        headers = {"x-api-key": API_KEY}
+        if self.args.batch_size > 1:
+            packets = []
+            for _ in range(self.args.batch_size):
+                payload, signature, nonce = self.fleet.build_packet(self.fleet.next_device())
+                packets.append({"packet": payload, "signature": signature, "nonce": nonce})
+            return "/telemetry/batch", {"json": {"gateway_id": "LOADGEN", "packets": packets}, "headers": headers}, len(packets)
+
+        payload, signature, nonce = self.fleet.build_packet(self.fleet.next_device())
+        headers["X-Signature"] = signature
+        headers["X-Nonce"] = str(nonce)
+        if self.args.encoding == "proto":
+            headers["Content-Type"] = "application/x-protobuf"
+            return "/telemetry/proto", {"content": encode_proto(payload), "headers": headers}, 1
+        return "/telemetry", {"json": payload, "headers": headers}, 1
+
+    async def send(self, client: httpx.AsyncClient, intended_start: float):
+        path, kwargs, count = self.build_request()
+        self.inflight += 1
+        try:
+            res = await client.post(path, **kwargs)
+            self.status[res.status_code] += 1
+            if res.status_code in (200, 202):
+                body = res.json()
+                self.packets_accepted += body.get("accepted", count) if self.args.batch_size > 1 else count
+        except httpx.HTTPError as e:
+            self.status[type(e).__name__] += 1
+        finally:
+            self.inflight -= 1
+            self.packets_sent += count
+            self.latencies_ms.append((time.perf_counter() - intended_start) * 1000)
+
+    async def run_open_loop(self, client: httpx.AsyncClient):
+        interval = 1.0 / self.args.rate
+        start = time.perf_counter()
+        end = start + self.args.duration
+        tasks = set()
+        k = 0
+        while True:
+            intended = start + k * interval
+            if intended >= end:
+                break
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            k += 1
+            if self.inflight >= self.args.max_inflight:
+                self.client_dropped += 1
+                continue
+            task = asyncio.create_task(self.send(client, intended))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def run_closed_loop(self, client: httpx.AsyncClient):
+        end = time.perf_counter() + self.args.duration
+
+        async def worker():
+            while time.perf_counter() < end:
+                await self.send(client, time.perf_counter())
+
+        await asyncio.gather(*[worker() for _ in range(self.args.concurrency)])
+
+    async def run(self) -> dict:
+        limits = httpx.Limits(max_connections=self.args.max_inflight, max_keepalive_connections=self.args.max_inflight)
+        async with httpx.AsyncClient(base_url=self.args.url, limits=limits, timeout=self.args.timeout) as client:
+            started = time.perf_counter()
+            if self.args.rate:
+                await self.run_open_loop(client)
+            else:
+                await self.run_closed_loop(client)
+            elapsed = time.perf_counter() - started
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> dict:
+        lat = sorted(self.latencies_ms)
+
+        def pct(q):
+            if not lat:
+                return None
+            return round(lat[min(len(lat) - 1, int(q * len(lat)))], 3)
+
+        return {
+            "config": {
+                "devices": self.args.devices,
+                "mode": "open" if self.args.rate else "closed",
+                "rate": self.args.rate,
+                "concurrency": None if self.args.rate else self.args.concurrency,
+                "encoding": self.args.encoding,
+                "batch_size": self.args.batch_size,
+                "duration_s": self.args.duration,
+                "seed": self.args.seed
+            },
+            "elapsed_s": round(elapsed, 3),
+            "requests": len(lat),
+            "packets_sent": self.packets_sent,
+            "packets_accepted": self.packets_accepted,
+            "client_dropped": self.client_dropped,
+            "throughput_rps": round(len(lat) / elapsed, 2) if elapsed else 0.0,
+            "throughput_pps": round(self.packets_accepted / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": {"p50": pct(0.50), "p90": pct(0.90), "p99": pct(0.99), "p999": pct(0.999),
+                           "max": round(lat[-1], 3) if lat else None},
+            "status": {str(k): v for k, v in sorted(self.status.items(), key=lambda kv: str(kv[0]))}
+        }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Prahari-AI asyncio load generator")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--rate", type=float, help="Open loop: requests/sec (constant arrival rate)")
+    mode.add_argument("--concurrency", type=int, default=32, help="Closed loop: concurrent workers")
+    parser.add_argument("--encoding", choices=["json", "proto"], default="json")
+    parser.add_argument("--batch-size", type=int, default=1, help=">1 uses /telemetry/batch (JSON only)")
+    parser.add_argument("--max-inflight", type=int, default=1024)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--master-secret", default=os.getenv("DEVICE_KEY_MASTER", "loadtest-master"))
+    parser.add_argument("--seed", type=int, default=1337)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+    if args.batch_size > 1 and args.encoding == "proto":
+        parser.error("--batch-size > 1 is only supported with --encoding json")
+    return args
+
+def main():
+    args = parse_args()
+    print(f"--- PRAHARI-AI LOAD TEST: {args.devices} devices, "
+          f"{'open loop @ %.0f req/s' % args.rate if args.rate else 'closed loop x%d' % args.concurrency}, "
+          f"{args.encoding}, batch={args.batch_size}, {args.duration:.0f}s ---")
+    result = asyncio.run(LoadRun(args).run())
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
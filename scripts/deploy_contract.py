@@ -91,7 +91,7 @@ for i, suffix in enumerate(["SAFE", "BREACH", "FALL", "LOST", "SOS"]):
     
     # Store mapping for the backend to look up? 
     # Or purely rely on the fact that existing code passes "did" string.
-    # The Identity Service `get_permit_info(did)` takes the `did` string.
+    # The permit service `PERMITS.get(did)` (app/services/permits.py) takes the `did` string.
     # It needs to map `did string` -> `eth address` to Query the Chain.
     # We will save this mapping in the config too.
     